@@ -0,0 +1,268 @@
+# benchmarks/run_benchmarks.py
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic_corpus import write_kjv_corpus, write_josephus_corpus
+
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+CASES = ['process_kjv_bible', 'process_josephus', 'reconstruct_text', 'validate_corpus', 'generate_manifest']
+
+# The content file each processor case leaves in processed_corpus.
+PROCESSED_CONTENT = {'process_kjv_bible': 'pg10_content.jsonl', 'process_josephus': 'pg2850_content.jsonl'}
+
+# generate_manifest reads one header per work, so its corpus is this many
+# copies of the two headers per scale step.
+MANIFEST_WORKS_PER_SCALE = 50
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None # Not available on Windows.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _stub_tracker():
+    # The benchmarks measure parsing and writing, not Firestore: every file
+    # is reported as new and status updates go nowhere.
+    from scripts import gutenberg_engine
+    gutenberg_engine.check_if_processed = lambda source_filename, file_hash: False
+    gutenberg_engine.update_processed_status = lambda source_filename, file_hash: None
+
+def run_case(case, input_path, output_dir):
+    """
+    Runs one benchmark case. It is called in a fresh worker process so that
+    the peak RSS it reports belongs to this case alone.
+    """
+    _stub_tracker()
+    baseline_rss = _peak_rss_bytes()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        if case == 'process_kjv_bible':
+            from scripts.process_kjv import process_kjv_bible
+            records = process_kjv_bible(input_path, output_dir)
+        elif case == 'process_josephus':
+            from scripts.process_josephus import process_josephus
+            records = process_josephus(input_path, output_dir)
+        elif case == 'reconstruct_text':
+            from reconstruct_from_jsonl import reconstruct_text
+            reconstruct_text(input_path, os.path.join(output_dir, 'reconstructed.txt'))
+            records = _count_lines(input_path)
+        elif case == 'validate_corpus':
+            from scripts.validation import validate_corpus
+            reports = validate_corpus(os.path.join(os.path.dirname(input_path), 'source_material'), input_path)
+            failed = [report['source_filename'] for report in reports if not report['ok']]
+            if failed:
+                raise RuntimeError(f"Validation failed for {', '.join(failed)}")
+            records = sum(report['records'] for report in reports)
+        elif case == 'generate_manifest':
+            import generate_manifest
+            generate_manifest.PROCESSED_DIR = input_path
+            generate_manifest.generate_manifest()
+            records = len([name for name in os.listdir(input_path) if name.endswith('_header.json')])
+        else:
+            raise ValueError(f"Unknown benchmark case '{case}'")
+
+    return {
+        'wall_seconds': time.perf_counter() - wall_start,
+        'cpu_seconds': time.process_time() - cpu_start,
+        'records': records,
+        'baseline_rss_mb': baseline_rss / 2 ** 20 if baseline_rss else None,
+        'peak_rss_mb': _peak_rss_bytes() / 2 ** 20 if baseline_rss else None,
+    }
+
+def _count_lines(path):
+    from scripts.blocked_jsonl import open_content
+    with open_content(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+def _run_isolated(case, input_path, output_dir):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, case, input_path, output_dir).result()
+
+def _build_manifest_corpus(processed_dir, manifest_dir, works):
+    from scripts.catalog import rebuild_catalog
+    os.makedirs(manifest_dir, exist_ok=True)
+    headers = sorted(name for name in os.listdir(processed_dir) if name.endswith('_header.json'))
+    for i in range(works):
+        source = headers[i % len(headers)]
+        shutil.copy(os.path.join(processed_dir, source), os.path.join(manifest_dir, f"work{i:06d}_header.json"))
+    # The processors keep the catalog current, so the timed run only reads it.
+    rebuild_catalog(manifest_dir)
+
+def run_benchmarks(scales, cases, work_dir):
+    """Generates the synthetic corpora for every scale and runs each case on them."""
+    results = []
+    for scale in scales:
+        scale_dir = os.path.join(work_dir, f'{scale}x')
+        source_dir = os.path.join(scale_dir, 'source_material')
+        processed_dir = os.path.join(scale_dir, 'processed_corpus')
+        os.makedirs(source_dir)
+        os.makedirs(processed_dir)
+
+        print(f"Generating {scale}x synthetic corpus...")
+        kjv_path = os.path.join(source_dir, 'pg10.txt')
+        josephus_path = os.path.join(source_dir, 'pg2850.txt')
+        source_lines = {
+            'process_kjv_bible': write_kjv_corpus(kjv_path, scale),
+            'process_josephus': write_josephus_corpus(josephus_path, scale),
+        }
+        inputs = {
+            'process_kjv_bible': kjv_path,
+            'process_josephus': josephus_path,
+            'reconstruct_text': os.path.join(processed_dir, 'pg2850_content.jsonl'),
+            'validate_corpus': processed_dir,
+            'generate_manifest': os.path.join(scale_dir, 'manifest_corpus'),
+        }
+
+        for case in CASES:
+            if case not in cases:
+                continue
+            if case == 'reconstruct_text' and not os.path.exists(inputs[case]):
+                _run_isolated('process_josephus', josephus_path, processed_dir)
+            if case == 'validate_corpus':
+                # Both works are checked, so both have to be processed first.
+                for processor_case in ('process_kjv_bible', 'process_josephus'):
+                    if not os.path.exists(os.path.join(processed_dir, PROCESSED_CONTENT[processor_case])):
+                        _run_isolated(processor_case, inputs[processor_case], processed_dir)
+            if case == 'generate_manifest':
+                if not any(name.endswith('_header.json') for name in os.listdir(processed_dir)):
+                    _run_isolated('process_josephus', josephus_path, processed_dir)
+                _build_manifest_corpus(processed_dir, inputs[case], MANIFEST_WORKS_PER_SCALE * scale)
+
+            measured = _run_isolated(case, inputs[case], processed_dir)
+            if case in source_lines:
+                lines = source_lines[case]
+            elif case == 'validate_corpus':
+                lines = sum(source_lines.values())
+            elif case == 'reconstruct_text':
+                lines = _count_lines(inputs[case])
+            else:
+                lines = measured['records']
+            input_bytes = (
+                sum(os.path.getsize(os.path.join(inputs[case], name)) for name in os.listdir(inputs[case]))
+                if os.path.isdir(inputs[case]) else os.path.getsize(inputs[case])
+            )
+
+            wall = measured['wall_seconds']
+            result = {
+                'case': case,
+                'scale': scale,
+                'input_bytes': input_bytes,
+                'lines': lines,
+                'records': measured['records'],
+                'wall_seconds': round(wall, 4),
+                'cpu_seconds': round(measured['cpu_seconds'], 4),
+                'lines_per_second': round(lines / wall) if wall else None,
+                'records_per_second': round(measured['records'] / wall) if wall and measured['records'] else None,
+                'baseline_rss_mb': measured['baseline_rss_mb'] and round(measured['baseline_rss_mb'], 1),
+                'peak_rss_mb': measured['peak_rss_mb'] and round(measured['peak_rss_mb'], 1),
+            }
+            results.append(result)
+            print(
+                f"  {case:<20} {scale:>4}x  {wall:8.3f}s  {result['lines_per_second'] or 0:>10,} lines/s  "
+                f"{result['records_per_second'] or 0:>9,} records/s  peak RSS {result['peak_rss_mb']} MB"
+            )
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_results(current, previous, threshold):
+    """
+    Prints the wall-time ratio of every case present in both runs and returns
+    the (case, scale) pairs that got slower by more than 'threshold'.
+    """
+    earlier = {(r['case'], r['scale']): r for r in previous['results']}
+    regressions = []
+    print(f"\n--- Comparison with run of {previous.get('created_utc', '?')} ({previous.get('git_commit')}) ---")
+    for result in current['results']:
+        key = (result['case'], result['scale'])
+        if key not in earlier or not earlier[key]['wall_seconds']:
+            continue
+        ratio = result['wall_seconds'] / earlier[key]['wall_seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  <-- REGRESSION'
+            regressions.append(key)
+        print(f"  {key[0]:<20} {key[1]:>4}x  {earlier[key]['wall_seconds']:8.3f}s -> {result['wall_seconds']:8.3f}s  ({ratio:.2f}x){flag}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SCRIBE v2 pipeline on synthetic Gutenberg corpora.")
+    parser.add_argument('--scales', default='1,10,100', help="Comma-separated corpus sizes (default: 1,10,100).")
+    parser.add_argument('--cases', default=','.join(CASES), help=f"Comma-separated cases (default: all of {CASES}).")
+    parser.add_argument('--output', default=None, help="Where to save the results JSON (default: benchmarks/results/<timestamp>.json).")
+    parser.add_argument('--compare', default=None, help="A previous results JSON to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Slowdown that counts as a regression (default: 0.10).")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated corpora and outputs.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    scales = [int(scale) for scale in args.scales.split(',')]
+    cases = [case.strip() for case in args.cases.split(',')]
+
+    work_dir = tempfile.mkdtemp(prefix='scribe-bench-')
+    # Worker processes inherit these: a private hash cache, and no optional
+    # output formats or compression unless they are asked for explicitly.
+    os.environ['SCRIBE_HASH_CACHE'] = os.path.join(work_dir, 'hash_cache.sqlite')
+    os.environ.setdefault('SCRIBE_OUTPUT_FORMATS', '')
+    os.environ.setdefault('SCRIBE_COMPRESS_CONTENT', '')
+
+    print("--- SCRIBE v2 Benchmarks ---")
+    try:
+        results = run_benchmarks(scales, cases, work_dir)
+    finally:
+        if args.keep:
+            print(f"Corpora kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    created = datetime.now(timezone.utc)
+    report = {
+        'created_utc': created.isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'output_formats': os.environ['SCRIBE_OUTPUT_FORMATS'],
+        'compress_content': os.environ['SCRIBE_COMPRESS_CONTENT'],
+        'results': results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, created.strftime('%Y%m%dT%H%M%SZ') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare_results(report, previous, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+# benchmarks/synthetic_corpus.py
+import random
+
+from scripts.process_kjv import KJV_BOOKS
+
+# Words used to fill verses and paragraphs. The mix of short and long words
+# gives line lengths close to those of the real Gutenberg texts.
+VOCABULARY = (
+    "and the of to that in he shall unto for his a they be is him them not it with all thou was "
+    "lord which my their have will were said from this are ye as by jerusalem israel people king "
+    "house children land against city army romans jews temple caesar herod multitude moreover "
+    "therefore whereupon commanded delivered inhabitants accordingly notwithstanding"
+).split()
+
+GUTENBERG_LICENSE = (
+    "This ebook is for the use of anyone anywhere in the United States and\n"
+    "most other parts of the world at no cost and with almost no restrictions\n"
+    "whatsoever. You may copy it, give it away or re-use it under the terms\n"
+    "of the Project Gutenberg License included with this ebook or online\n"
+    "at www.gutenberg.org. If you are not located in the United States,\n"
+    "you will have to check the laws of the country where you are located\n"
+    "before using this eBook.\n"
+)
+
+TRAILER = (
+    "\n\n*** END OF THE PROJECT GUTENBERG EBOOK {title} ***\n\n"
+    "Updated editions will replace the previous one--the old editions will\n"
+    "be renamed.\n\n"
+    "Section 1. General Terms of Use and Redistributing Project Gutenberg-tm\n"
+    "electronic works\n"
+)
+
+# Shape of the 1x corpora, roughly that of pg10 and pg2850.
+KJV_CHAPTERS_PER_BOOK = 18
+KJV_VERSES_PER_CHAPTER = 26
+JOSEPHUS_BOOKS = ["I", "II", "III", "IV", "V", "VI", "VII"]
+JOSEPHUS_CHAPTERS_PER_BOOK = 4
+JOSEPHUS_PARAGRAPHS_PER_CHAPTER = 24
+JOSEPHUS_FOOTNOTES_PER_BOOK = 30
+
+def _sentence(rng, low, high):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(low, high)))
+
+def _wrap(text, width=72):
+    """Wraps text the way Gutenberg files do, returning the lines."""
+    lines = []
+    line = ''
+    for word in text.split(' '):
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+def _gutenberg_header(title, extra_fields):
+    fields = ''.join(f"{name}: {value}\n\n" for name, value in extra_fields)
+    return (
+        f"The Project Gutenberg eBook of {title}\n\n"
+        f"{GUTENBERG_LICENSE}\n"
+        f"Title: {title}\n\n"
+        f"{fields}"
+        f"\n\n*** START OF THE PROJECT GUTENBERG EBOOK {title.upper()} ***\n\n\n"
+    )
+
+def write_kjv_corpus(path, scale=1, seed=10):
+    """
+    Writes a pg10-shaped file: Gutenberg header, every KJV book title with
+    'c:v text' verses wrapped over several lines, END marker and license.
+    Each scale step adds chapters, so the size grows linearly with 'scale'.
+    Returns the number of lines written.
+    """
+    rng = random.Random(seed)
+    title = "The King James Version of the Bible"
+    line_count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        header = _gutenberg_header(title, [("Release date", "August 1, 1989 [eBook #10]"), ("Language", "English")])
+        f.write(header)
+        line_count += header.count('\n')
+
+        for book in sorted(KJV_BOOKS):
+            lines = ['', '', book, '']
+            for chapter in range(1, KJV_CHAPTERS_PER_BOOK * scale + 1):
+                for verse in range(1, KJV_VERSES_PER_CHAPTER + 1):
+                    lines.extend(_wrap(f"{chapter}:{verse} {_sentence(rng, 8, 45)}"))
+                    lines.append('')
+            f.write('\n'.join(lines) + '\n')
+            line_count += len(lines)
+
+        trailer = TRAILER.format(title=title.upper())
+        f.write(trailer)
+        line_count += trailer.count('\n')
+    return line_count
+
+def write_josephus_corpus(path, scale=1, seed=2850):
+    """
+    Writes a pg2850-shaped file: Gutenberg header, a Contents section, a
+    PREFACE and BOOK I.-VII. with 'CHAPTER n.' headings, numbered paragraphs
+    and a FOOTNOTES block per book, then the END marker and license.
+    Each scale step adds chapters to every book. Returns the number of lines written.
+    """
+    rng = random.Random(seed)
+    title = "The Wars of the Jews; Or, The History of the Destruction of Jerusalem"
+    chapters = JOSEPHUS_CHAPTERS_PER_BOOK * scale
+    line_count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        header = _gutenberg_header(title, [("Author", "Flavius Josephus"), ("Language", "English")])
+        f.write(header)
+        line_count += header.count('\n')
+
+        contents = ['Contents', '', ' PREFACE', '', '']
+        for book in JOSEPHUS_BOOKS:
+            contents.extend([f" BOOK {book}.", ''])
+            contents.extend(line for chapter in range(1, chapters + 1) for line in (f" CHAPTER {chapter}.", ''))
+        contents.extend(['', ''])
+        f.write('\n'.join(contents) + '\n')
+        line_count += len(contents)
+
+        def paragraphs(count):
+            lines = []
+            for number in range(1, count + 1):
+                lines.extend(_wrap(f"{number}. {_sentence(rng, 40, 180)}"))
+                lines.append('')
+            return lines
+
+        body = ['PREFACE', '']
+        body.extend(paragraphs(12))
+        body.extend(['', 'WAR PREFACE FOOTNOTES', ''])
+        body.extend(paragraphs(5))
+        for number, book in enumerate(JOSEPHUS_BOOKS, start=1):
+            body.extend(['', '', f'BOOK {book}.', '', f"     {_sentence(rng, 6, 12).title()}.", ''])
+            for chapter in range(1, chapters + 1):
+                body.extend(['', f'CHAPTER {chapter}.', '', f"     {_sentence(rng, 6, 20).title()}.", ''])
+                body.extend(paragraphs(JOSEPHUS_PARAGRAPHS_PER_CHAPTER))
+            body.extend(['', f'WAR BOOK {number} FOOTNOTES', ''])
+            body.extend(paragraphs(JOSEPHUS_FOOTNOTES_PER_BOOK * scale))
+            # Flush every book so memory stays bounded at 100x.
+            f.write('\n'.join(body) + '\n')
+            line_count += len(body)
+            body = []
+
+        trailer = TRAILER.format(title=title.upper())
+        f.write(trailer)
+        line_count += trailer.count('\n')
+    return line_count
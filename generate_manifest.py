@@ -1,33 +1,34 @@
 import os
-import json
+
+from scripts.catalog import load_catalog, rebuild_catalog, catalog_entries, CATALOG_FILENAME
 
 PROCESSED_DIR = 'processed_corpus'
 
 def generate_manifest():
     """
-    Scans the processed corpus directory for header files and prints a manifest.
+    Reads the corpus catalog and prints a manifest. The catalog is one small
+    file kept up to date by the processors, so no header file is opened.
     """
     print("--- SCRIBE v2 Corpus Manifest ---")
     print(f"Reading from: ./{PROCESSED_DIR}/\n")
 
-    try:
-        all_files = os.listdir(PROCESSED_DIR)
-    except FileNotFoundError:
+    if not os.path.isdir(PROCESSED_DIR):
         print(f"Error: Processed directory not found at '{PROCESSED_DIR}'.")
         print("Please run the main processing script first.")
         return
 
-    header_files = sorted([f for f in all_files if f.endswith('_header.json')])
+    catalog = load_catalog(PROCESSED_DIR)
+    if catalog is None:
+        # A corpus processed before the catalog existed: build it once from the headers.
+        print(f"No {CATALOG_FILENAME} found. Building it from the header files...\n")
+        catalog = rebuild_catalog(PROCESSED_DIR)
 
-    if not header_files:
+    entries = catalog_entries(catalog)
+    if not entries:
         print("No header files found. The corpus appears to be empty.")
         return
 
-    for i, filename in enumerate(header_files):
-        path = os.path.join(PROCESSED_DIR, filename)
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
+    for i, data in enumerate(entries):
         print(f"Entry {i+1}: {data.get('title', 'N/A')}")
         print(f"  Author: {data.get('author', 'N/A')}")
         print(f"  Source File: {data.get('source_filename', 'N/A')}")
@@ -38,4 +39,4 @@ def generate_manifest():
 
 
 if __name__ == '__main__':
-    generate_manifest()
\ No newline at end of file
+    generate_manifest()
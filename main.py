@@ -1,52 +1,352 @@
 import os
+import sys
+import time
+import argparse
 
-# Import the specific processing functions from our scripts module
-from scripts.process_kjv import process_kjv_bible
-from scripts.process_josephus import process_josephus
+from scripts import firestore_tracker, hash_cache, instrumentation, job_journal
+from scripts.processor_registry import ProcessorRegistry, load_target
 
 # Define the directories we'll be working with
 SOURCE_DIR = 'source_material'
 PROCESSED_DIR = 'processed_corpus'
 
-# This dictionary is the core of our controller. It maps a
-# specific filename to the function that knows how to process it.
-PROCESSOR_MAP = {
-    'pg10.txt': process_kjv_bible,
-    'pg2850.txt': process_josephus,
-    # When you create a processor for Philo, you'll add it here:
-    # 'philo_on_creation.txt': process_philo,
-}
+# The registry is the core of our controller. It maps source filenames (or
+# file hashes) to the processor that knows how to handle them, by module
+# path: a processor's module is only imported once a file for it turns up.
+# Built-in processors are listed in scripts/processor_registry.py.
+REGISTRY = ProcessorRegistry()
 
-def main():
+def _unchanged(filename, source_path):
     """
-    Main function to orchestrate the processing of all source files.
+    True when the hash cache still vouches for the file and the tracker has
+    that hash as processed. Such a file is skipped without importing its
+    processor; a new or changed file is left to the processor to hash.
     """
-    print("--- Starting SCRIBE v2 Corpus Processing ---")
+    with instrumentation.phase('hash'):
+        file_hash = hash_cache.cached_file_hash(source_path)
+    if file_hash is None:
+        return False
+    with instrumentation.phase('tracker_check'):
+        return firestore_tracker.check_if_processed(filename, file_hash)
 
-    # Create the output directory if it doesn't exist
-    if not os.path.exists(PROCESSED_DIR):
-        os.makedirs(PROCESSED_DIR)
-        print(f"Created directory: {PROCESSED_DIR}")
+def process_file(filename, target, run_id=None):
+    """
+    Runs a processor, given as a 'module:function' target, on a single source
+    file and reports the outcome. Any exception is caught and returned as part
+    of the result so that one bad file never stops the rest of the batch.
+    With a run_id, the file's progress is recorded in the job journal.
+    """
+    source_path = os.path.join(SOURCE_DIR, filename)
+    result = {'filename': filename, 'status': 'processed', 'records': None, 'error': None}
+    journal = job_journal.get_journal() if run_id is not None else None
 
+    start = time.perf_counter()
+    metrics = None
     try:
-        source_files = os.listdir(SOURCE_DIR)
+        if journal is not None:
+            journal.set_state(run_id, filename, job_journal.PARSING)
+        # Tracker updates are handed back to the caller, which commits the
+        # whole batch at once instead of making one round trip per file.
+        with instrumentation.collect(instrumentation.metrics_path() is not None) as metrics, \
+                instrumentation.quiet(instrumentation.quiet_mode()), \
+                firestore_tracker.deferred_updates() as updates:
+            if _unchanged(filename, source_path):
+                record_count = None
+            else:
+                record_count = load_target(target)(source_path, PROCESSED_DIR)
+        result['updates'] = updates
+        if record_count is None:
+            result['status'] = 'skipped'
+        else:
+            result['records'] = record_count
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        print(f"--> ERROR: '{filename}' failed: {result['error']}")
+    result['seconds'] = time.perf_counter() - start
+    result.setdefault('updates', [])
+
+    # Once every output is in place the file is 'written': if the run dies
+    # before the tracker commit, --resume only has to commit it.
+    if journal is not None:
+        if result['status'] == 'failed':
+            journal.set_state(run_id, filename, job_journal.FAILED, error=result['error'])
+        elif result['updates']:
+            journal.set_state(run_id, filename, job_journal.WRITTEN, content_hash=result['updates'][-1]['content_hash'])
+        else:
+            journal.set_state(run_id, filename, job_journal.COMMITTED)
+    # Plain dicts, so they travel back from worker processes.
+    result['metrics'] = metrics.as_dict() if metrics is not None else None
+    return result
+
+def print_summary(results):
+    """Prints one line per source file, in source order, followed by totals."""
+    print("\n--- Processing Summary ---")
+    for result in results:
+        line = f"  {result['filename']}: {result['status']} ({result['seconds']:.2f}s)"
+        if result['records'] is not None:
+            line += f", {result['records']} records"
+        if result['error']:
+            line += f" - {result['error']}"
+        print(line)
+
+    failed = sum(1 for r in results if r['status'] == 'failed')
+    print(f"  {len(results)} file(s), {failed} failure(s)")
+
+def select_files(only=None):
+    """
+    Returns the source files to process, with the 'module:function' target
+    of each, or None if the source directory is missing. Files without a
+    processor, and any not named in 'only', are left out.
+    """
+    try:
+        source_files = sorted(os.listdir(SOURCE_DIR))
     except FileNotFoundError:
         print(f"Error: Source directory not found at '{SOURCE_DIR}'. Please create it.")
-        return
+        return None
+
+    if only:
+        for filename in sorted(set(only) - set(source_files)):
+            print(f"--> WARNING: '{filename}' was not found in '{SOURCE_DIR}'. Skipping.")
+        source_files = [filename for filename in source_files if filename in only]
 
-    # Loop through every file in the source directory
+    # Work out which files have a processor before handing anything out.
+    # Nothing is imported yet: workers import the processors they run.
+    jobs = []
     for filename in source_files:
-        if filename in PROCESSOR_MAP:
-            # Find the correct processing function from our map
-            processor_function = PROCESSOR_MAP[filename]
-            source_path = os.path.join(SOURCE_DIR, filename)
-            
-            # Call the mapped function
-            processor_function(source_path, PROCESSED_DIR)
+        processor = REGISTRY.resolve(filename, os.path.join(SOURCE_DIR, filename))
+        if processor is not None:
+            jobs.append((filename, processor.target))
         else:
             print(f"--> WARNING: No processor defined for '{filename}'. Skipping.")
-    
+    return jobs
+
+def resume_jobs(journal, run_id):
+    """
+    Sorts the files of an interrupted run. Committed files are done. Written
+    files whose source is unchanged only need their tracker update, and come
+    back as results. Everything else is returned as jobs to process again.
+    """
+    jobs = []
+    recovered = []
+    done = 0
+    for job in journal.jobs(run_id):
+        filename = job['source_filename']
+        source_path = os.path.join(SOURCE_DIR, filename)
+        if job['state'] == job_journal.COMMITTED:
+            done += 1
+        elif not os.path.exists(source_path):
+            print(f"--> WARNING: '{filename}' is no longer in '{SOURCE_DIR}'. Skipping.")
+        elif job['state'] == job_journal.WRITTEN and job['content_hash'] == hash_cache.get_file_hash(source_path):
+            with firestore_tracker.deferred_updates() as updates:
+                firestore_tracker.update_processed_status(filename, job['content_hash'])
+            recovered.append({
+                'filename': filename, 'status': 'recovered', 'records': None, 'error': None,
+                'seconds': 0.0, 'updates': updates, 'metrics': None,
+            })
+        else:
+            jobs.append((filename, job['target']))
+    print(
+        f"Resuming run {run_id}: {done} file(s) already committed, {len(recovered)} written but not committed, "
+        f"{len(jobs)} to process."
+    )
+    return jobs, recovered
+
+def main(workers=1, only=None, resume=False):
+    """
+    Main function to orchestrate the processing of all source files, or of
+    just the filenames in 'only'. With workers > 1 each source file is sent
+    to its own worker process. With resume, the last run is picked up where
+    it stopped if it didn't finish.
+    """
+    print("--- Starting SCRIBE v2 Corpus Processing ---")
+
+    # Create the output directory if it doesn't exist
+    if not os.path.exists(PROCESSED_DIR):
+        os.makedirs(PROCESSED_DIR)
+        print(f"Created directory: {PROCESSED_DIR}")
+
+    # --- CHOOSE THE FILES: A NEW RUN, OR WHAT AN INTERRUPTED ONE LEFT ---
+    journal = job_journal.get_journal()
+    latest = journal.latest_run()
+    interrupted = latest is not None and not latest[1]
+    recovered = []
+    if resume and interrupted:
+        run_id = latest[0]
+        jobs, recovered = resume_jobs(journal, run_id)
+    else:
+        if resume:
+            print("No interrupted run to resume. Starting a new run.")
+        elif interrupted:
+            print("--> NOTE: The previous run did not finish. Use --resume to pick up where it stopped.")
+        jobs = select_files(only)
+        if jobs is None:
+            return
+        run_id = journal.start_run(jobs)
+    to_process = [filename for filename, target in jobs]
+    targets = [target for filename, target in jobs]
+
+    # Run-level metrics cover the tracker round trips made by this process;
+    # each file's phases are collected in whichever process handles it.
+    with instrumentation.collect(instrumentation.metrics_path() is not None) as run_metrics:
+        # One tracker read covers every file in the batch.
+        with instrumentation.phase('tracker_prefetch'):
+            known_hashes = firestore_tracker.prefetch_statuses(to_process)
+
+        if workers > 1 and len(to_process) > 1:
+            # Only a parallel run pays for importing the process pool.
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # 'spawn' gives every worker a fresh interpreter, which keeps gRPC
+            # (used by the Firestore client) away from fork-related deadlocks.
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=firestore_tracker.seed_statuses, initargs=(known_hashes, to_process)
+            ) as executor:
+                # map() hands results back in submission order, so the summary
+                # stays ordered no matter which file finishes first.
+                results = list(executor.map(process_file, to_process, targets, [run_id] * len(to_process)))
+        else:
+            results = [process_file(filename, target, run_id) for filename, target in jobs]
+        if recovered:
+            results = sorted(recovered + results, key=lambda result: result['filename'])
+
+        # Record every successfully processed file in batched tracker writes.
+        with instrumentation.phase('tracker_commit'), instrumentation.quiet(instrumentation.quiet_mode()):
+            firestore_tracker.commit_updates([u for r in results for u in r['updates']])
+        journal.set_state(run_id, [r['filename'] for r in results if r['updates']], job_journal.COMMITTED)
+        journal.finish_run(run_id)
+
+    print_summary(results)
+    if run_metrics is not None:
+        instrumentation.write_metrics(instrumentation.metrics_path(), run_metrics, results, workers)
+        print(f"Metrics saved to {instrumentation.metrics_path()}")
     print("\n--- Corpus Processing Complete ---")
+    return results
+
+def validate(results, workers=1):
+    """
+    Checks the files a run processed against their sources (see
+    scripts/validation.py) and prints the reports. Returns True if every
+    one of them is a faithful copy.
+    """
+    from scripts.validation import validate_corpus, print_summary
+
+    processed = [result['filename'] for result in results if result['status'] == 'processed']
+    if not processed:
+        print("\nNothing was processed, so there is nothing to validate.")
+        return True
+    reports = validate_corpus(SOURCE_DIR, PROCESSED_DIR, only=processed, workers=workers, registry=REGISTRY)
+    print_summary(reports)
+    return all(report['ok'] for report in reports)
+
+def watch(workers=1, only=None, debounce=None, poll=False, check=False):
+    """
+    Processes whatever needs it, then keeps running and processes new or
+    changed source files as they appear. Changes are handled in this process,
+    so the processors, the tracker client and the hash cache stay loaded
+    between files. With check, every run is validated. Stop it with Ctrl+C.
+    """
+    from scripts.source_watcher import SourceWatcher, DEBOUNCE_SECONDS
+
+    # The snapshot is taken before the catch-up run, so a file that changes
+    # while that run is busy is still picked up afterwards.
+    with SourceWatcher(SOURCE_DIR, DEBOUNCE_SECONDS if debounce is None else debounce, poll) as watcher:
+        results = main(workers=workers, only=only)
+        if check and results is not None:
+            validate(results, workers=workers)
+        print(f"\nWatching '{SOURCE_DIR}' for new or changed files ({watcher.mode}). Press Ctrl+C to stop.")
+        try:
+            for changed in watcher.batches():
+                if only:
+                    changed = [filename for filename in changed if filename in only]
+                if changed:
+                    print(f"\nChanged: {', '.join(changed)}")
+                    results = main(only=changed)
+                    if check and results is not None:
+                        validate(results)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Process the SCRIBE v2 source corpus.")
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Number of worker processes to use (default: 1, processes files one after another)."
+    )
+    parser.add_argument(
+        '--only', action='append', default=None, metavar='FILE[,FILE...]',
+        help="Only process these source files (comma-separated; may be repeated)."
+    )
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Pick up the last run where it stopped if it was interrupted (its file list replaces --only)."
+    )
+    parser.add_argument(
+        '--watch', action='store_true',
+        help="Keep running and process new or changed source files as they appear."
+    )
+    parser.add_argument(
+        '--debounce', type=float, default=None, metavar='SECONDS',
+        help="With --watch, how long a file must stay unchanged before it is processed (default: 0.5)."
+    )
+    parser.add_argument(
+        '--poll', action='store_true',
+        help="With --watch, scan the directory for changes instead of using inotify."
+    )
+    parser.add_argument(
+        '--validate', action='store_true',
+        help="Check every file processed in this run against its source; the exit status is 1 on a mismatch."
+    )
+    parser.add_argument(
+        '--metrics', default=None, metavar='PATH',
+        help="Save per-phase timings and counters for the run as JSON (overrides SCRIBE_METRICS)."
+    )
+    parser.add_argument(
+        '--quiet', action='store_true',
+        help="Only print warnings, errors and the summary (same as SCRIBE_QUIET=1)."
+    )
+    parser.add_argument(
+        '--compress', action='store_true',
+        help="Write _content.jsonl as independently compressed gzip blocks (same as SCRIBE_COMPRESS_CONTENT=1)."
+    )
+    parser.add_argument(
+        '--formats', default=None,
+        help="Comma-separated extra output formats: 'columnar', 'search', 'shards', 'stats' (overrides SCRIBE_OUTPUT_FORMATS)."
+    )
+    parser.add_argument(
+        '--shard-records', type=int, default=None, metavar='N',
+        help="With the 'shards' format, close a shard at the next chapter after N records (overrides SCRIBE_SHARD_RECORDS)."
+    )
+    parser.add_argument(
+        '--shard-bytes', type=int, default=None, metavar='BYTES',
+        help="With the 'shards' format, close a shard at the next chapter after this many bytes "
+             "(default: 1048576; overrides SCRIBE_SHARD_BYTES)."
+    )
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.formats is not None:
+        # Set through the environment so that worker processes see it too.
+        os.environ['SCRIBE_OUTPUT_FORMATS'] = args.formats
+    if args.compress:
+        os.environ['SCRIBE_COMPRESS_CONTENT'] = '1'
+    if args.shard_records is not None:
+        os.environ['SCRIBE_SHARD_RECORDS'] = str(args.shard_records)
+    if args.shard_bytes is not None:
+        os.environ['SCRIBE_SHARD_BYTES'] = str(args.shard_bytes)
+    if args.metrics is not None:
+        os.environ['SCRIBE_METRICS'] = args.metrics
+    if args.quiet:
+        os.environ['SCRIBE_QUIET'] = '1'
+    only = [name.strip() for value in args.only for name in value.split(',') if name.strip()] if args.only else None
+    if args.watch:
+        if args.resume:
+            main(workers=args.workers, resume=True)
+        watch(workers=args.workers, only=only, debounce=args.debounce, poll=args.poll, check=args.validate)
+    else:
+        results = main(workers=args.workers, only=only, resume=args.resume)
+        if args.validate and results is not None and not validate(results, workers=args.workers):
+            sys.exit(1)
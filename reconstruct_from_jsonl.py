@@ -1,6 +1,8 @@
 import os
 import json
 
+from scripts.blocked_jsonl import open_content
+
 def roman_to_int(s: str) -> int:
     """Converts a Roman numeral string to an integer."""
     s = s.upper()
@@ -36,7 +38,8 @@ def reconstruct_text(jsonl_path, output_path):
     last_book = None
     last_chapter = None
 
-    with open(jsonl_path, 'r', encoding='utf-8') as infile, \
+    # The content file may be plain or blocked-gzip JSONL; open_content reads both.
+    with open_content(jsonl_path) as infile, \
          open(output_path, 'w', encoding='utf-8') as outfile:
 
         for line in infile:
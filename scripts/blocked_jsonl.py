@@ -0,0 +1,236 @@
+# scripts/blocked_jsonl.py
+import os
+import json
+import zlib
+import bisect
+
+# A block ends after this many records, or sooner once it holds this many
+# uncompressed bytes. Reading one record decompresses its whole block, so
+# this trades compression ratio against random-access latency: about 16 KB
+# keeps a lookup well under 0.1 ms for both short verses and long paragraphs.
+BLOCK_RECORDS = 128
+BLOCK_BYTES = 16 * 1024
+COMPRESSION_LEVEL = 6
+
+GZIP_MAGIC = b'\x1f\x8b'
+# zlib wbits value that reads and writes the gzip wrapper.
+GZIP_WBITS = 31
+
+def block_index_path(content_path):
+    """The block index sits next to the content file: pg10_content.jsonl -> pg10_blocks.json."""
+    if content_path.endswith('_content.jsonl'):
+        return content_path[:-len('_content.jsonl')] + '_blocks.json'
+    return content_path + '.blocks.json'
+
+def is_compressed(path):
+    """True if the content file at 'path' is blocked gzip rather than plain JSON lines."""
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+def open_content(path, mode='r'):
+    """
+    Opens a content file for reading its JSON lines from start to end, plain
+    or compressed alike. 'r' gives text lines and 'rb' bytes lines; either
+    way the result supports iteration, readline() and 'with'.
+    """
+    if is_compressed(path):
+        return BlockLineReader(path, binary=(mode == 'rb'))
+    return open(path, mode, encoding=None if mode == 'rb' else 'utf-8')
+
+class BlockWriter:
+    """
+    Writes JSON lines to a binary file as a run of gzip members of up to
+    block_records lines (fewer if they reach block_bytes). Together they are an ordinary gzip file (zcat
+    and gzip.open read it whole), and since every member starts a fresh
+    deflate stream, any block can also be decompressed on its own.
+    """
+
+    def __init__(self, f, block_records=BLOCK_RECORDS, block_bytes=BLOCK_BYTES):
+        self._file = f
+        self.block_records = block_records
+        self.block_bytes = block_bytes
+        self._lines = []
+        self._pending_size = 0
+        self.compressed_offsets = []
+        self.uncompressed_offsets = []
+        self.compressed_size = 0
+        self.uncompressed_size = 0
+
+    def write(self, line):
+        self._lines.append(line)
+        self._pending_size += len(line)
+        if len(self._lines) >= self.block_records or self._pending_size >= self.block_bytes:
+            self._flush()
+
+    def _flush(self):
+        if not self._lines:
+            return
+        data = ''.join(self._lines).encode('utf-8')
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+        block = compressor.compress(data) + compressor.flush()
+        self._file.write(block)
+        self.compressed_offsets.append(self.compressed_size)
+        self.uncompressed_offsets.append(self.uncompressed_size)
+        self.compressed_size += len(block)
+        self.uncompressed_size += len(data)
+        self._lines = []
+        self._pending_size = 0
+
+    def close(self):
+        """Writes the last block and returns the block index to save next to the file."""
+        self._flush()
+        return {
+            'block_records': self.block_records,
+            'block_bytes': self.block_bytes,
+            'compressed_size': self.compressed_size,
+            'uncompressed_size': self.uncompressed_size,
+            'compressed_offsets': self.compressed_offsets,
+            'uncompressed_offsets': self.uncompressed_offsets,
+        }
+
+def scan_blocks(path):
+    """
+    Rebuilds the block index of a compressed content file by decompressing
+    it once, for when the saved index is missing or doesn't match the file.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    view = memoryview(data)
+    compressed_offsets = []
+    uncompressed_offsets = []
+    position = 0
+    uncompressed_size = 0
+    while position < len(data):
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        uncompressed_size_before = uncompressed_size
+        uncompressed_size += len(decompressor.decompress(view[position:]))
+        compressed_offsets.append(position)
+        uncompressed_offsets.append(uncompressed_size_before)
+        position = len(data) - len(decompressor.unused_data)
+    return {
+        'block_records': None,
+        'block_bytes': None,
+        'compressed_size': len(data),
+        'uncompressed_size': uncompressed_size,
+        'compressed_offsets': compressed_offsets,
+        'uncompressed_offsets': uncompressed_offsets,
+    }
+
+def load_block_index(path):
+    """Returns the block index of a compressed content file, rebuilding it if the saved one is stale."""
+    try:
+        with open(block_index_path(path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = None
+    if index is None or index['compressed_size'] != os.path.getsize(path):
+        index = scan_blocks(path)
+    return index
+
+class BlockLineReader:
+    """
+    Reads the lines of a compressed content file in order. Each block is
+    decompressed in a single call and split into lines, which is several
+    times faster than reading lines through gzip.open().
+    """
+
+    def __init__(self, path, binary=False):
+        self._file = open(path, 'rb')
+        index = load_block_index(path)
+        self._compressed_offsets = index['compressed_offsets'] + [index['compressed_size']]
+        self._binary = binary
+        self._next_block = 0
+        self._lines = []
+        self._position = 0
+
+    def _load_next_block(self):
+        while self._next_block < len(self._compressed_offsets) - 1:
+            start = self._compressed_offsets[self._next_block]
+            self._file.seek(start)
+            data = zlib.decompress(self._file.read(self._compressed_offsets[self._next_block + 1] - start), GZIP_WBITS)
+            self._next_block += 1
+            # json.dumps escapes every line break inside a string, so splitting
+            # the whole block only breaks it between records.
+            self._lines = (data if self._binary else data.decode('utf-8')).splitlines(keepends=True)
+            self._position = 0
+            if self._lines:
+                return True
+        return False
+
+    def readline(self):
+        if self._position >= len(self._lines) and not self._load_next_block():
+            return b'' if self._binary else ''
+        line = self._lines[self._position]
+        self._position += 1
+        return line
+
+    def __iter__(self):
+        return iter(self.readline, b'' if self._binary else '')
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class ContentReader:
+    """
+    Reads byte ranges of a content file's JSON lines by their offsets in the
+    uncompressed text (the offsets write_records() hands its sinks), so the
+    reference and search indexes work the same on plain and compressed files.
+    A compressed range only decompresses the blocks it overlaps, and the last
+    block read is kept for the next call.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self.compressed = self._file.read(2) == GZIP_MAGIC
+        self._block_number = None
+        self._block = b''
+        if self.compressed:
+            index = load_block_index(path)
+            self._compressed_offsets = index['compressed_offsets'] + [index['compressed_size']]
+            self._uncompressed_offsets = index['uncompressed_offsets']
+
+    def read(self, offset, length):
+        if not self.compressed:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+        # Blocks end on record boundaries, so a single record sits in one
+        # block; a longer range is stitched together from consecutive blocks.
+        end = offset + length
+        number = bisect.bisect_right(self._uncompressed_offsets, offset) - 1
+        pieces = []
+        while offset < end:
+            if number < 0 or number >= len(self._uncompressed_offsets):
+                raise ValueError(f"Offset {offset} is outside the content file.")
+            block_start = self._uncompressed_offsets[number]
+            piece = self._read_block(number)[offset - block_start:end - block_start]
+            if not piece:
+                raise ValueError(f"Offset {offset} is outside the content file.")
+            pieces.append(piece)
+            offset += len(piece)
+            number += 1
+        return b''.join(pieces)
+
+    def _read_block(self, number):
+        if number != self._block_number:
+            start = self._compressed_offsets[number]
+            self._file.seek(start)
+            compressed = self._file.read(self._compressed_offsets[number + 1] - start)
+            self._block = zlib.decompress(compressed, GZIP_WBITS)
+            self._block_number = number
+        return self._block
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
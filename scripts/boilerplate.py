@@ -0,0 +1,90 @@
+# scripts/boilerplate.py
+import re
+
+LICENSE_START = "This ebook is for the use of anyone anywhere"
+START_MARKER = "*** START OF THE PROJECT GUTENBERG EBOOK"
+END_MARKER = "*** END OF THE PROJECT GUTENBERG EBOOK"
+
+class GutenbergLayout:
+    """
+    Byte offsets of the parts of a Project Gutenberg file. Every offset is the
+    start of a line.
+
+    header_end      just past the START marker line (the end of the file if
+                    there is no START marker)
+    body_end        the END marker line (the end of the file if there isn't one)
+    license_start   the line where the license paragraph begins, or None
+    contents_start  just past the table of contents heading, or None
+    """
+
+    def __init__(self, header_end, body_end, license_start=None, contents_start=None):
+        self.header_end = header_end
+        self.body_end = body_end
+        self.license_start = license_start
+        self.contents_start = contents_start
+
+def _line_start(data, offset):
+    return data.rfind(b'\n', 0, offset) + 1
+
+def _next_line(data, offset, limit):
+    newline = data.find(b'\n', offset, limit)
+    return limit if newline < 0 else newline + 1
+
+def locate_boilerplate(data, end_marker=END_MARKER, contents_heading=None):
+    """
+    Finds the Gutenberg header, body and trailer of a source with byte searches
+    over 'data' (a memory map or bytes), without decoding any line. The header
+    ends with the START marker line, and the body ends at the first line that
+    contains 'end_marker' (pass None to run to the end of the file).
+    If 'contents_heading' is given, the first body line that consists of just
+    that heading marks the table of contents.
+    """
+    size = len(data)
+    start = data.find(START_MARKER.encode('utf-8'))
+    if start < 0:
+        # Without a START marker, everything is header and there is no body.
+        header_end = size
+    else:
+        header_end = _next_line(data, start, size)
+
+    license_start = data.find(LICENSE_START.encode('utf-8'), 0, header_end)
+    license_start = _line_start(data, license_start) if license_start >= 0 else None
+
+    body_end = size
+    if end_marker is not None and header_end < size:
+        end = data.find(end_marker.encode('utf-8'), header_end)
+        if end >= 0:
+            body_end = _line_start(data, end)
+
+    contents_start = None
+    if contents_heading is not None:
+        heading = re.compile(rb'^[ \t]*' + re.escape(contents_heading.encode('utf-8')) + rb'[ \t\r]*$', re.MULTILINE)
+        match = heading.search(data, header_end, body_end)
+        if match:
+            contents_start = _next_line(data, match.end(), body_end)
+
+    return GutenbergLayout(header_end, body_end, license_start, contents_start)
+
+def read_header(data, layout, header_fields, header_metadata, license_text):
+    """
+    Pulls the 'Label: value' fields named by header_fields, as (label, key,
+    transform) tuples, out of the header slice only, into 'header_metadata' in
+    the order they appear. The license lines, from the start of the license
+    paragraph through the START marker line, are added to 'license_text'.
+    """
+    header = data[:layout.header_end].decode('utf-8')
+    if header_fields:
+        labels = {label: (key, transform) for label, key, transform in header_fields}
+        field_pattern = re.compile(
+            r'^[^\S\n]*(' + '|'.join(re.escape(label) for label in labels) + r'):(.*)$', re.MULTILINE
+        )
+        for match in field_pattern.finditer(header):
+            key, transform = labels[match.group(1)]
+            value = match.group(2).strip()
+            header_metadata[key] = transform(value) if transform else value
+
+    if layout.license_start is not None:
+        license_lines = data[layout.license_start:layout.header_end].decode('utf-8').split('\n')
+        if license_lines[-1] == '':
+            license_lines.pop()
+        license_text.extend(line.strip() for line in license_lines)
@@ -0,0 +1,170 @@
+# scripts/catalog.py
+import os
+import sys
+import json
+import hashlib
+from contextlib import contextmanager
+
+from scripts.blocked_jsonl import open_content
+from scripts.record_pipeline import atomic_output
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# One file in processed_corpus/ describes every processed work, so listing
+# the corpus is a single small read instead of opening every _header.json.
+CATALOG_FILENAME = '_catalog.json'
+CATALOG_VERSION = 1
+
+# Header fields that stay out of the catalog because of their size.
+EXCLUDED_HEADER_FIELDS = {'license'}
+
+def catalog_path(processed_dir):
+    return os.path.join(processed_dir, CATALOG_FILENAME)
+
+class CatalogStats:
+    """
+    A write_records() sink that counts records per book and per chapter and,
+    once the content file is in place, records its size and SHA-256.
+    """
+
+    def __init__(self, content_path):
+        self.content_path = content_path
+        # book -> chapter -> record count; dicts keep reading order.
+        self.books = {}
+        self.content_size = 0
+        self.content_sha256 = None
+
+    def add(self, record, offset, length):
+        chapters = self.books.setdefault(record.get('book'), {})
+        chapter = record.get('chapter')
+        chapters[chapter] = chapters.get(chapter, 0) + 1
+
+    def finish(self):
+        # The file was only just written, so this read comes from the page cache.
+        sha256_hash = hashlib.sha256()
+        with open(self.content_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha256_hash.update(block)
+        self.content_size = os.path.getsize(self.content_path)
+        self.content_sha256 = sha256_hash.hexdigest()
+
+    def entry_fields(self):
+        """The content part of a catalog entry. Chapters are [chapter, count] pairs so numbers stay numbers."""
+        return {
+            'content_size': self.content_size,
+            'content_sha256': self.content_sha256,
+            'books': [
+                {
+                    'book': book,
+                    'record_count': sum(chapters.values()),
+                    'chapters': [[chapter, count] for chapter, count in chapters.items()],
+                }
+                for book, chapters in self.books.items()
+            ],
+        }
+
+def make_entry(header_metadata, header_filename, source_sha256, stats):
+    """Builds a work's catalog entry from its header metadata and the CatalogStats of its content file."""
+    entry = {key: value for key, value in header_metadata.items() if key not in EXCLUDED_HEADER_FIELDS}
+    entry['header_filename'] = header_filename
+    entry['source_sha256'] = source_sha256
+    entry.update(stats.entry_fields())
+    return entry
+
+@contextmanager
+def _locked(processed_dir):
+    # Worker processes may finish works at the same moment; the lock makes
+    # each read-modify-write of the catalog happen one at a time.
+    with open(catalog_path(processed_dir) + '.lock', 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def load_catalog(processed_dir):
+    """Returns the catalog of processed_dir, or None if there isn't one yet."""
+    try:
+        with open(catalog_path(processed_dir), 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    except FileNotFoundError:
+        return None
+    if catalog.get('version') != CATALOG_VERSION:
+        return None
+    return catalog
+
+def _save_catalog(processed_dir, catalog):
+    # Written to a temporary file and swapped in, so readers never see a partial catalog.
+    with atomic_output(catalog_path(processed_dir)) as f:
+        json.dump(catalog, f, indent=2)
+
+def update_catalog(processed_dir, work_id, entry):
+    """
+    Adds or replaces one work's entry in the catalog. If there is no catalog
+    yet, it is first built from the header files already in processed_dir,
+    so works processed before the catalog existed stay in it.
+    """
+    with _locked(processed_dir):
+        catalog = load_catalog(processed_dir)
+        if catalog is None:
+            catalog = {'version': CATALOG_VERSION, 'works': _scan_works(processed_dir, skip=work_id)}
+        catalog['works'][work_id] = entry
+        _save_catalog(processed_dir, catalog)
+
+def catalog_entries(catalog):
+    """The catalog's entries in the order of their header filenames, the order the manifest has always used."""
+    return sorted(catalog['works'].values(), key=lambda entry: entry.get('header_filename', ''))
+
+def _scan_works(processed_dir, skip=None):
+    # Catalog entries for every _header.json in processed_dir but 'skip'.
+    # Content files are streamed once to count their records.
+    works = {}
+    for filename in sorted(os.listdir(processed_dir)):
+        if not filename.endswith('_header.json'):
+            continue
+        work_id = filename[:-len('_header.json')]
+        if work_id == skip:
+            continue
+        with open(os.path.join(processed_dir, filename), 'r', encoding='utf-8') as f:
+            header_metadata = json.load(f)
+        content_path = os.path.join(processed_dir, header_metadata.get('content_filename', f'{work_id}_content.jsonl'))
+        stats = CatalogStats(content_path)
+        if os.path.exists(content_path):
+            with open_content(content_path) as f:
+                for line in f:
+                    stats.add(json.loads(line), None, None)
+            stats.finish()
+        # The source hash isn't stored in the header, so it stays unknown until the work is processed again.
+        works[work_id] = make_entry(header_metadata, filename, None, stats)
+    return works
+
+def rebuild_catalog(processed_dir):
+    """
+    Builds the catalog from the header and content files already in
+    processed_dir, for corpora processed before the catalog existed.
+    Returns the catalog.
+    """
+    with _locked(processed_dir):
+        catalog = {'version': CATALOG_VERSION, 'works': _scan_works(processed_dir)}
+        _save_catalog(processed_dir, catalog)
+    return catalog
+
+if __name__ == '__main__':
+    # Example: python -m scripts.catalog rebuild processed_corpus
+    if len(sys.argv) < 2 or sys.argv[1] != 'rebuild':
+        print("Usage: python -m scripts.catalog rebuild [processed_dir]")
+        sys.exit(1)
+    processed_dir = sys.argv[2] if len(sys.argv) > 2 else 'processed_corpus'
+    catalog = rebuild_catalog(processed_dir)
+    print(f"Catalog of {len(catalog['works'])} work(s) saved to {catalog_path(processed_dir)}")
@@ -0,0 +1,302 @@
+# scripts/columnar.py
+import os
+import sys
+import json
+from array import array
+
+from scripts.container import map_container, padding, write_container
+from scripts.record_pipeline import atomic_output
+
+# The file is a container (see scripts/container.py) whose data area holds
+# one int32 array per non-text field, the uint64 text offsets array and the
+# UTF-8 text blob, each viewed in place with memoryview.cast().
+MAGIC = b'SCRIBEC\x01'
+TEXT_FIELD = 'text'
+
+def columnar_path(content_path):
+    """The columnar file sits next to the content file: pg10_content.jsonl -> pg10_content.col."""
+    return content_path.replace('_content.jsonl', '_content.col')
+
+def content_path_for(path):
+    """The content file a columnar file mirrors: pg10_content.col -> pg10_content.jsonl."""
+    return path.replace('_content.col', '_content.jsonl')
+
+class ColumnarWriter:
+    """
+    A write_records() sink that stores the same records in a compact columnar
+    file. Every field except 'text' becomes an int32 column: integers (chapter,
+    verse and paragraph numbers) are stored as they are, and any other value
+    (work, book, 'Preface', 'Footnotes', None...) is dictionary-encoded as a
+    negative id. The text of all records is kept in one contiguous UTF-8 blob
+    with an offsets array. Text is spooled to a temp file while records
+    arrive, so memory use stays small.
+    """
+
+    def __init__(self, content_path):
+        self.content_path = content_path
+        self.path = columnar_path(content_path)
+        self.fields = None
+        self.columns = {}
+        self.dictionaries = {}
+        self._dictionary_ids = {}
+        self.text_offsets = array('Q', [0])
+        self._blob_path = self.path + '.blob.tmp'
+        # Opened with the first record, so a run that fails before writing
+        # anything leaves no spool file behind.
+        self._blob = None
+
+    def _encode(self, field, value):
+        if type(value) is int and 0 <= value < 2 ** 31:
+            return value
+        # Dictionary ids are keyed on the JSON form so that 1 and "1" stay distinct.
+        key = json.dumps(value)
+        ids = self._dictionary_ids[field]
+        if key not in ids:
+            ids[key] = len(ids)
+            self.dictionaries[field].append(value)
+        return -(ids[key] + 1)
+
+    def add(self, record, offset, length):
+        if self.fields is None:
+            self.fields = list(record)
+            for field in self.fields:
+                if field != TEXT_FIELD:
+                    self.columns[field] = array('i')
+                    self.dictionaries[field] = []
+                    self._dictionary_ids[field] = {}
+        elif list(record) != self.fields:
+            raise ValueError(f"Record fields {list(record)} differ from {self.fields}; cannot write columnar output.")
+
+        if self._blob is None:
+            self._blob = open(self._blob_path, 'wb')
+        for field in self.fields:
+            if field == TEXT_FIELD:
+                encoded = record[field].encode('utf-8')
+                self._blob.write(encoded)
+                self.text_offsets.append(self.text_offsets[-1] + len(encoded))
+            else:
+                self.columns[field].append(self._encode(field, record[field]))
+
+    def abort(self):
+        """Called by write_records() when the content file could not be written: drops the spooled text."""
+        if self._blob is not None:
+            self._blob.close()
+            self._blob = None
+        if os.path.exists(self._blob_path):
+            os.remove(self._blob_path)
+
+    def finish(self):
+        try:
+            self._write()
+        finally:
+            self.abort()
+
+    def _write(self):
+        if self._blob is not None:
+            self._blob.close()
+        record_count = len(self.text_offsets) - 1
+        fields = self.fields or []
+
+        # Lay out the data area: one int32 column per field, then text offsets, then the blob.
+        layout = {}
+        position = 0
+        for field in fields:
+            if field != TEXT_FIELD:
+                layout[field] = position
+                position += len(self.columns[field]) * 4 + padding(len(self.columns[field]) * 4)
+        offsets_at = position
+        position += len(self.text_offsets) * 8
+        blob_at = position
+
+        # The content file this mirrors, so a reader can tell when a later
+        # run (without --formats columnar) has left this file behind.
+        stat = os.stat(self.content_path)
+        header = {
+            'content_filename': os.path.basename(self.content_path),
+            'content_size': stat.st_size,
+            'content_mtime_ns': stat.st_mtime_ns,
+            'record_count': record_count,
+            'fields': fields,
+            'columns': layout,
+            'dictionaries': self.dictionaries,
+            'text_offsets_at': offsets_at,
+            'text_blob_at': blob_at,
+            'text_blob_size': self.text_offsets[-1],
+            'book_runs': self._book_runs(),
+        }
+        columns = dict(self.columns)
+        text_offsets = self.text_offsets
+        if sys.byteorder != 'little':
+            # The file is always little-endian.
+            columns = {field: array('i', column) for field, column in columns.items()}
+            for column in columns.values():
+                column.byteswap()
+            text_offsets = array('Q', text_offsets)
+            text_offsets.byteswap()
+
+        chunks = [columns[field] for field in fields if field != TEXT_FIELD] + [text_offsets]
+        with atomic_output(self.path, 'wb') as f:
+            if self._blob is None:
+                write_container(f, MAGIC, header, chunks)
+            else:
+                with open(self._blob_path, 'rb') as blob:
+                    write_container(f, MAGIC, header, chunks + [blob])
+
+    def _book_runs(self):
+        # [book, start, end) for every run of consecutive records from one book.
+        if 'book' not in self.columns:
+            return []
+        runs = []
+        column = self.columns['book']
+        start = 0
+        for i in range(1, len(column) + 1):
+            if i == len(column) or column[i] != column[start]:
+                runs.append([self._decode_book(column[start]), start, i])
+                start = i
+        return runs
+
+    def _decode_book(self, code):
+        return code if code >= 0 else self.dictionaries['book'][-code - 1]
+
+def _is_current(header, content_path):
+    try:
+        stat = os.stat(content_path)
+    except FileNotFoundError:
+        return False
+    return (stat.st_size, stat.st_mtime_ns) == (header.get('content_size'), header.get('content_mtime_ns'))
+
+class ColumnarCorpus:
+    """
+    Memory-mapped reader for a columnar corpus file. Opening it reads only the
+    small JSON header; columns are memoryviews over the mapping, and records
+    are decoded one at a time on request. Records come back exactly as they
+    are in _content.jsonl, with the same fields in the same order.
+
+    The file is refused if the _content.jsonl next to it has changed since it
+    was written (a later run without --formats columnar doesn't update it);
+    check=False opens a file that has no content file beside it.
+
+        with ColumnarCorpus('processed_corpus/pg10_content.col') as corpus:
+            genesis = corpus.book('The First Book of Moses: Called Genesis')
+            chapters = genesis.column('chapter')
+    """
+
+    def __init__(self, path, check=True):
+        if sys.byteorder != 'little':
+            raise ValueError("ColumnarCorpus maps the file in place and needs a little-endian machine.")
+        self.path = path
+        self._map, header, data_start = map_container(path, MAGIC, "SCRIBE columnar corpus file")
+        if check and not _is_current(header, content_path_for(path)):
+            self.close()
+            raise ValueError(
+                f"Columnar file '{path}' is out of date. Re-run the processor with --formats columnar to rebuild it."
+            )
+
+        self.record_count = header['record_count']
+        self.fields = header['fields']
+        self.dictionaries = header['dictionaries']
+        self.book_runs = header['book_runs']
+
+        self._view = memoryview(self._map)
+        self._columns = {}
+        for field, at in header['columns'].items():
+            start = data_start + at
+            self._columns[field] = self._view[start:start + self.record_count * 4].cast('i')
+        offsets_start = data_start + header['text_offsets_at']
+        self._text_offsets = self._view[offsets_start:offsets_start + (self.record_count + 1) * 8].cast('Q')
+        blob_start = data_start + header['text_blob_at']
+        self._blob = self._view[blob_start:blob_start + header['text_blob_size']]
+
+    def close(self):
+        # Views must be released before the mapping can be closed.
+        for column in getattr(self, '_columns', {}).values():
+            column.release()
+        for name in ('_text_offsets', '_blob', '_view'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.record_count
+
+    def value(self, field, i):
+        """Decodes one field of one record."""
+        if field == TEXT_FIELD:
+            return self.text(i)
+        code = self._columns[field][i]
+        return code if code >= 0 else self.dictionaries[field][-code - 1]
+
+    def text(self, i):
+        return str(self._blob[self._text_offsets[i]:self._text_offsets[i + 1]], 'utf-8')
+
+    def record(self, i):
+        """Rebuilds record i exactly as it appears in _content.jsonl."""
+        return {field: self.value(field, i) for field in self.fields}
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.record(j) for j in range(*i.indices(self.record_count))]
+        if i < 0:
+            i += self.record_count
+        if not 0 <= i < self.record_count:
+            raise IndexError(i)
+        return self.record(i)
+
+    def __iter__(self):
+        for i in range(self.record_count):
+            yield self.record(i)
+
+    def column(self, field, start=0, end=None):
+        """
+        A zero-copy view of a field's raw int32 codes: the value itself for
+        integers, or -(id + 1) into self.dictionaries[field] for anything else.
+        """
+        return self._columns[field][start:self.record_count if end is None else end]
+
+    def book_ranges(self, book):
+        """The (start, end) record ranges that belong to a book."""
+        return [(start, end) for name, start, end in self.book_runs if name == book]
+
+    def book(self, book):
+        """A zero-copy slice over a book's records (its first run, for books that are split)."""
+        ranges = self.book_ranges(book)
+        if not ranges:
+            raise KeyError(f"No book named '{book}'")
+        return CorpusSlice(self, *ranges[0])
+
+class CorpusSlice:
+    """A contiguous range of records in a ColumnarCorpus. Nothing is copied until records are decoded."""
+
+    def __init__(self, corpus, start, end):
+        self.corpus = corpus
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __iter__(self):
+        for i in range(self.start, self.end):
+            yield self.corpus.record(i)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.corpus.record(self.start + i)
+
+    def column(self, field):
+        return self.corpus.column(field, self.start, self.end)
+
+    def texts(self):
+        """A zero-copy view of the UTF-8 text of every record in the slice."""
+        offsets = self.corpus._text_offsets
+        return self.corpus._blob[offsets[self.start]:offsets[self.end]]
@@ -0,0 +1,56 @@
+# scripts/container.py
+import json
+import mmap
+import shutil
+import struct
+
+# The binary outputs (columnar corpus, search segments, term statistics)
+# share one file layout:
+#   MAGIC | uint64 header length | JSON header | padding to 8 bytes | data
+# MAGIC is 8 bytes that name the kind of file and its version. The data area
+# is a run of chunks, each padded to 8 bytes, so every chunk starts on an
+# 8-byte boundary and can be viewed in place. The header says where each
+# chunk is, relative to the start of the data area.
+
+def padding(size):
+    """The zero bytes that bring 'size' up to a multiple of 8."""
+    return -size % 8
+
+def write_container(f, magic, header, chunks):
+    """
+    Writes a container to the binary file 'f': the magic, the header as
+    compact JSON and then every chunk, each followed by its padding. A chunk
+    is a bytes-like object (bytes, array, NumPy array) or a binary file,
+    which is copied from its current position to its end. The caller lays
+    the chunks out in the header with padding().
+    """
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    f.write(magic)
+    f.write(struct.pack('<Q', len(header_bytes)))
+    f.write(header_bytes)
+    f.write(b'\0' * padding(len(magic) + 8 + len(header_bytes)))
+    for chunk in chunks:
+        if hasattr(chunk, 'read'):
+            start = f.tell()
+            shutil.copyfileobj(chunk, f)
+            size = f.tell() - start
+        else:
+            size = memoryview(chunk).nbytes
+            f.write(chunk)
+        f.write(b'\0' * padding(size))
+
+def map_container(path, magic, description):
+    """
+    Memory-maps a container and returns (mapping, header, data_start).
+    Raises ValueError, naming the file a 'description', if it doesn't start
+    with 'magic'.
+    """
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapping[:len(magic)] != magic:
+        mapping.close()
+        raise ValueError(f"'{path}' is not a {description}.")
+    (header_size,) = struct.unpack_from('<Q', mapping, len(magic))
+    header_start = len(magic) + 8
+    header = json.loads(mapping[header_start:header_start + header_size])
+    return mapping, header, header_start + header_size + padding(header_start + header_size)
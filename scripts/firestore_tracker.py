@@ -1,49 +1,120 @@
 # scripts/firestore_tracker.py
 import os
-import hashlib
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from google.cloud import firestore
 
-# Initialize the Firestore client.
-# When running on Google Cloud services (like Cloud Functions or Cloud Run),
-# authentication is handled automatically. For local development, it uses
-# the credentials you set up with 'gcloud auth application-default login'.
-db = firestore.Client()
+from scripts.tracker_backends import create_backend
+from scripts import hash_cache
 
 # The name of the collection we'll use in Firestore.
 COLLECTION_NAME = os.getenv('FIRESTORE_COLLECTION_NAME', 'processed_files_tracker')
 
+# Which backend stores the processing status: 'firestore' (the default) or
+# 'sqlite' for a local database that needs no network access.
+TRACKER_BACKEND = os.getenv('SCRIBE_TRACKER_BACKEND', 'firestore')
+TRACKER_DB_PATH = os.getenv('SCRIBE_TRACKER_DB', '.scribe_tracker.sqlite')
+
+# The backend is created on first use, not at import time.
+_tracker = None
+
+# Hashes we already know about, either prefetched in bulk or written by this process.
+_known_hashes = {}
+
+# When not None, updates are collected here instead of being written right away.
+_deferred_updates = None
+
+def get_tracker():
+    """Returns the configured tracker backend, creating it on first use."""
+    global _tracker
+    if _tracker is None:
+        _tracker = create_backend(TRACKER_BACKEND, COLLECTION_NAME, TRACKER_DB_PATH)
+    return _tracker
+
+def use_tracker(backend, db_path):
+    """
+    Switches to another tracker backend and SQLite database path, dropping
+    the current backend and every hash remembered from it. The new backend
+    is created on next use.
+    """
+    global TRACKER_BACKEND, TRACKER_DB_PATH, _tracker
+    TRACKER_BACKEND, TRACKER_DB_PATH = backend, db_path
+    _tracker = None
+    _known_hashes.clear()
+
 def get_file_hash(file_path):
-    """Calculates the SHA-256 hash of a file's content."""
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+    """
+    Calculates the SHA-256 hash of a file's content. Files whose stat signature
+    is unchanged since the last run are answered from the hash cache unread.
+    """
+    return hash_cache.get_file_hash(file_path)
+
+def prefetch_statuses(source_filenames):
+    """
+    Fetches the stored hash of every given file in one backend call and keeps
+    them, so later check_if_processed() calls need no round trip.
+    """
+    hashes = get_tracker().get_hashes(list(source_filenames))
+    for source_filename in source_filenames:
+        _known_hashes[source_filename] = hashes.get(source_filename)
+    return hashes
+
+def seed_statuses(hashes, source_filenames):
+    """Loads hashes fetched by another process (e.g. a worker pool's parent)."""
+    for source_filename in source_filenames:
+        _known_hashes[source_filename] = hashes.get(source_filename)
 
 def check_if_processed(source_filename, file_hash):
     """
-    Checks Firestore to see if a file with the same hash has already been processed.
-    The source_filename will be the ID of our document in Firestore.
+    Checks the tracker to see if a file with the same hash has already been processed.
+    The source_filename is the key of the file's record.
     """
-    doc_ref = db.collection(COLLECTION_NAME).document(source_filename)
-    doc = doc_ref.get()
+    if source_filename in _known_hashes:
+        stored_hash = _known_hashes[source_filename]
+    else:
+        stored_hash = get_tracker().get_hashes([source_filename]).get(source_filename)
+        _known_hashes[source_filename] = stored_hash
 
-    if doc.exists:
-        # The file has been processed before, check if the content has changed.
-        if doc.to_dict().get('content_hash') == file_hash:
-            print(f"'{source_filename}' is already processed and unchanged. Skipping.")
-            return True # File is processed and up-to-date.
+    if stored_hash == file_hash:
+        print(f"'{source_filename}' is already processed and unchanged. Skipping.")
+        return True # File is processed and up-to-date.
     return False # File is new or has been modified.
 
 def update_processed_status(source_filename, file_hash):
     """
-    Adds or updates a file's record in Firestore after it has been processed.
+    Adds or updates a file's record in the tracker after it has been processed.
+    Inside deferred_updates() the write is queued instead of sent.
     """
-    doc_ref = db.collection(COLLECTION_NAME).document(source_filename)
-    doc_ref.set({
+    update = {
         'source_filename': source_filename,
         'content_hash': file_hash,
         'processed_at': datetime.now(timezone.utc)
-    })
-    print(f"Updated tracking status for '{source_filename}' in Firestore.")
\ No newline at end of file
+    }
+    _known_hashes[source_filename] = file_hash
+
+    if _deferred_updates is not None:
+        _deferred_updates.append(update)
+        return
+    commit_updates([update])
+
+@contextmanager
+def deferred_updates():
+    """
+    Collects the updates made inside the block into the yielded list instead
+    of writing them, so the caller can commit many of them in one batch.
+    """
+    global _deferred_updates
+    previous = _deferred_updates
+    _deferred_updates = []
+    try:
+        yield _deferred_updates
+    finally:
+        _deferred_updates = previous
+
+def commit_updates(updates):
+    """Writes a list of queued updates to the tracker backend in batches."""
+    if not updates:
+        return
+    tracker = get_tracker()
+    tracker.set_statuses(updates)
+    for update in updates:
+        print(f"Updated tracking status for '{update['source_filename']}' in {tracker.name}.")
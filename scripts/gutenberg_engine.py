@@ -0,0 +1,292 @@
+# scripts/gutenberg_engine.py
+import os
+import re
+import json
+from datetime import datetime, timezone
+
+from scripts import instrumentation
+from scripts.boilerplate import END_MARKER, locate_boilerplate, read_header
+from scripts.catalog import CatalogStats, make_entry, update_catalog
+from scripts.firestore_tracker import check_if_processed, update_processed_status
+from scripts.hash_cache import open_source
+from scripts.record_pipeline import write_records, output_sinks, atomic_output
+from scripts.sections import split_sections, splice_sections, load_section_index, save_section_index
+
+class Rule:
+    """
+    A structural line that changes the parse state without producing a record,
+    such as a CHAPTER heading or a FOOTNOTES marker. 'pattern' is a regex
+    matched at the start of the stripped line, and action(state, line) updates
+    the state. A rule with 'unless' is passed over while state[unless] is true.
+    """
+
+    def __init__(self, pattern, action, unless=None):
+        self.pattern = pattern
+        self.action = action
+        self.unless = unless
+
+class RecordRule:
+    """
+    The line that starts a record. 'pattern' must have a named group 'text'
+    for the record's first line of text, and build(match, state) returns the
+    record's other fields, in output order. Use named groups: the pattern is
+    combined with the spec's rules, which shifts group numbers.
+    """
+
+    def __init__(self, pattern, build):
+        self.pattern = pattern
+        self.build = build
+
+class ContentsRule:
+    """
+    Learns a work's section headers from its table of contents: every line
+    after 'heading' that matches 'entry_pattern' is a header, and the body
+    begins where the first of them appears again.
+    """
+
+    def __init__(self, heading, entry_pattern):
+        self.heading = heading
+        self.entry_pattern = re.compile(entry_pattern)
+
+class WorkSpec:
+    """
+    Everything the engine needs to know to parse one kind of Gutenberg text.
+
+    header_fields    (label, key, transform) for the 'Label: value' lines of
+                     the Gutenberg header; transform may be None.
+    section_headers  exact lines that open a section (a book). Leave it out
+                     and give 'contents' to learn them from the text instead.
+    on_section       on_section(state, line) is called on every section header.
+    rules            Rules for the other structural lines, tried in order.
+    record           the RecordRule; any other non-blank line continues the
+                     current record.
+    initial_state    the parse state before the first line; the engine adds
+                     'work', the title from the header.
+    context_state    state keys whose starting values end up in every record
+                     (e.g. 'work'); when one changes, nothing can be reused.
+    end_marker       the body ends at the first line containing it; None
+                     runs it to the end of the file.
+    """
+
+    def __init__(self, name, parser_version, header_fields, record, section_headers=None, contents=None,
+                 on_section=None, rules=(), initial_state=None, context_state=(), end_marker=END_MARKER,
+                 record_noun='record'):
+        if (section_headers is None) == (contents is None):
+            raise ValueError(f"Spec '{name}' needs exactly one of section_headers and contents.")
+        self.name = name
+        self.parser_version = parser_version
+        self.header_fields = header_fields
+        self.record = record
+        self.section_headers = section_headers
+        self.contents = contents
+        self.on_section = on_section
+        self.rules = list(rules)
+        self.initial_state = initial_state or {}
+        self.context_state = context_state
+        self.end_marker = end_marker
+        self.record_noun = record_noun
+
+        # One regex tries every rule and then the record pattern, in order,
+        # so a line costs a single match call however many rules there are.
+        # Each rule is wrapped in a '_rule<n>' group, which match.lastgroup
+        # reports when that rule is the one that matched.
+        alternatives = [f'(?P<_rule{i}>{rule.pattern})' for i, rule in enumerate(self.rules)]
+        if alternatives:
+            alternatives.append(f'(?:{record.pattern})')
+            self.dispatch = re.compile('|'.join(alternatives), re.DOTALL).match
+        else:
+            self.dispatch = re.compile(record.pattern, re.DOTALL).match
+        # Each pattern on its own, for when a rule matches but is switched off.
+        self.fallbacks = [re.compile(rule.pattern, re.DOTALL).match for rule in self.rules]
+        self.fallbacks.append(re.compile(record.pattern, re.DOTALL).match)
+
+    def read_front_matter(self, source, header_metadata, license_text):
+        """
+        Locates the header, body and trailer of a source with byte searches,
+        collects the header fields and license lines into 'header_metadata'
+        and 'license_text', and (when the spec learns its sections from a
+        table of contents) reads the contents. Returns the section headers
+        and the byte range of the body; nothing past the END marker is read.
+        """
+        layout = locate_boilerplate(
+            source.data, self.end_marker, self.contents.heading if self.contents is not None else None
+        )
+        read_header(source.data, layout, self.header_fields, header_metadata, license_text)
+        if self.contents is None:
+            return self.section_headers, layout.header_end, layout.body_end
+        if layout.contents_start is None:
+            return [], layout.body_end, layout.body_end
+
+        # The Contents section ends when we encounter the first real header
+        # that we learned from the contents list.
+        content_headers = []
+        offset = layout.contents_start
+        for line in source.lines(layout.contents_start, layout.body_end):
+            stripped_line = line.strip()
+            if content_headers and stripped_line == content_headers[0]:
+                print(f"Learned document structure: {content_headers}")
+                return content_headers, offset, layout.body_end
+            if self.contents.entry_pattern.match(stripped_line) and stripped_line not in content_headers:
+                content_headers.append(stripped_line)
+            offset += len(line.encode('utf-8'))
+        return content_headers, layout.body_end, layout.body_end
+
+class SpecParser:
+    """
+    Turns body lines into record events for splice_sections(), following a
+    WorkSpec: section headers are a set lookup, and every other line goes
+    through the spec's combined dispatch regex.
+    """
+
+    def __init__(self, spec, section_headers, work):
+        self.spec = spec
+        self.section_headers = frozenset(section_headers)
+        self.state = dict(spec.initial_state, work=work)
+        self.rules = {f'_rule{i}': (i, rule) for i, rule in enumerate(spec.rules)}
+        self.dispatch = spec.dispatch
+        self.on_section = spec.on_section
+        self.build = spec.record.build
+
+    def parse(self, lines):
+        """
+        Yields a (record, text) event for every stripped line that starts a
+        record, and (None, text) for every line that continues one. Blank and
+        structural lines only change the state.
+        """
+        # Bound once per section rather than looked up on every line.
+        section_headers = self.section_headers
+        on_section = self.on_section
+        dispatch = self.dispatch
+        build = self.build
+        rules = self.rules
+        state = self.state
+        for line in lines:
+            if not line:
+                continue
+            if line in section_headers:
+                if on_section is not None:
+                    on_section(state, line)
+                continue
+
+            match = dispatch(line)
+            if match is None:
+                yield None, line
+                continue
+            found = rules.get(match.lastgroup) if rules else None
+            if found is None:
+                yield build(match, state), match.group('text')
+                continue
+
+            index, rule = found
+            if rule.unless is not None and state[rule.unless]:
+                event = self._fall_through(line, index + 1)
+                if event is not None:
+                    yield event
+                continue
+            rule.action(state, line)
+
+    def _fall_through(self, stripped_line, start):
+        # Tries the rules after a switched-off one, and the record pattern, separately.
+        for index in range(start, len(self.spec.fallbacks)):
+            match = self.spec.fallbacks[index](stripped_line)
+            if match is None:
+                continue
+            if index == len(self.spec.rules):
+                return self.build(match, self.state), match.group('text')
+            rule = self.spec.rules[index]
+            if rule.unless is not None and self.state[rule.unless]:
+                continue
+            rule.action(self.state, stripped_line)
+            return None
+        return None, stripped_line
+
+def process_work(spec, source_path, processed_dir):
+    """
+    Parses a Project Gutenberg text with the given WorkSpec into a JSONL file
+    of records and a separate header metadata file. Records are streamed to
+    disk as they are parsed, and on a re-run only the sections whose text
+    changed are parsed again; the others are copied from the previous output.
+    Returns the number of records, or None if the file was already processed.
+    """
+    print(f"Starting processing of {source_path}...")
+
+    source_filename = os.path.basename(source_path)
+    with open_source(source_path) as source:
+        # --- IDEMPOTENCY CHECK ---
+        # An unchanged file is answered from the stat-keyed hash cache without
+        # being read; a changed one is hashed from the same memory map that
+        # the parser reads below, so it is only read from disk once.
+        with instrumentation.phase('hash'):
+            file_hash = source.hash
+        with instrumentation.phase('tracker_check'):
+            already_processed = check_if_processed(source_filename, file_hash)
+        if already_processed:
+            return
+
+        # --- PREPARE FILENAMES AND METADATA ---
+        base_filename = os.path.splitext(source_filename)[0]
+        header_output_path = os.path.join(processed_dir, f'{base_filename}_header.json')
+        content_output_path = os.path.join(processed_dir, f'{base_filename}_content.jsonl')
+
+        header_metadata = {}
+        license_text = []
+
+        with instrumentation.phase('header'):
+            section_headers, body_start, body_end = spec.read_front_matter(source, header_metadata, license_text)
+        current_work = header_metadata.get('title', "Unknown Work")
+
+        # --- PARSE CHANGED SECTIONS AND STREAM RECORDS TO DISK ---
+        # Values that end up in every record, and a structure learned from
+        # the text, make up the context: a change means a full re-parse.
+        initial_state = dict(spec.initial_state, work=current_work)
+        context = {key: initial_state[key] for key in spec.context_state}
+        if spec.contents is not None:
+            context['content_headers'] = section_headers
+        context = context or None
+        with instrumentation.phase('section_index'):
+            old_index = load_section_index(content_output_path, spec.parser_version, context)
+
+        # Only the body's byte range is decoded into lines.
+        header_set = frozenset(section_headers)
+        sections = split_sections(source.lines(body_start, body_end), is_section_header=header_set.__contains__)
+
+        section_entries = []
+        stats = CatalogStats(content_output_path)
+        record_count = write_records(
+            splice_sections(
+                sections, SpecParser(spec, section_headers, current_work),
+                old_index, content_output_path, section_entries
+            ),
+            content_output_path,
+            sinks=output_sinks(content_output_path) + [stats]
+        )
+        instrumentation.count('lines_read', source.lines_read)
+        instrumentation.count('bytes_read', source.bytes_read)
+    with instrumentation.phase('section_index'):
+        save_section_index(content_output_path, spec.parser_version, context, section_entries)
+    print(f"{record_count} {spec.record_noun} records saved to {content_output_path}")
+
+    # --- ADD NEW METADATA FIELDS ---
+    header_metadata['source_filename'] = source_filename
+    header_metadata['content_filename'] = os.path.basename(content_output_path)
+    header_metadata['processing_date_utc'] = datetime.now(timezone.utc).isoformat()
+    header_metadata['license'] = "\n".join(license_text).strip()
+    header_metadata['record_count'] = record_count
+
+    # --- WRITE THE HEADER FILE ---
+    with instrumentation.phase('header_write'), atomic_output(header_output_path) as f:
+        json.dump(header_metadata, f, indent=2)
+    instrumentation.count('bytes_written', os.path.getsize(header_output_path))
+    print(f"Header metadata saved to {header_output_path}")
+
+    # --- UPDATE THE CORPUS CATALOG ---
+    with instrumentation.phase('catalog'):
+        update_catalog(
+            processed_dir, base_filename,
+            make_entry(header_metadata, os.path.basename(header_output_path), file_hash, stats)
+        )
+
+    # --- AFTER all file writing is successful, UPDATE THE TRACKER ---
+    with instrumentation.phase('tracker_update'):
+        update_processed_status(source_filename, file_hash)
+    return record_count
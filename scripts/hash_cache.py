@@ -0,0 +1,156 @@
+# scripts/hash_cache.py
+import os
+import time
+import mmap
+import sqlite3
+import hashlib
+
+# Where file hashes are remembered between runs.
+HASH_CACHE_PATH = os.getenv('SCRIBE_HASH_CACHE', '.scribe_hash_cache.sqlite')
+
+# A file modified this recently may still change within the same mtime tick,
+# so its hash is not cached yet (the same rule git uses for "racily clean" files).
+RACY_WINDOW_NS = 2 * 1_000_000_000
+
+class HashCache:
+    """
+    Persistent map from a file's stat signature (path, size, mtime_ns, inode)
+    to its SHA-256 hash. A matching signature means the file has not changed
+    since it was last hashed, so it doesn't need to be read again.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, sha256 TEXT)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def lookup(self, path, st):
+        """Returns the cached hash if the stat signature still matches, else None."""
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, inode, sha256 FROM file_hashes WHERE path = ?",
+            (os.path.abspath(path),)
+        ).fetchone()
+        if row and tuple(row[:3]) == (st.st_size, st.st_mtime_ns, st.st_ino):
+            return row[3]
+        return None
+
+    def store(self, path, st, file_hash):
+        """Remembers a file's hash under its current stat signature."""
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, inode, sha256) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino, file_hash)
+            )
+
+_hash_cache = None
+
+def get_hash_cache():
+    """Returns the shared hash cache, opening it on first use."""
+    global _hash_cache
+    if _hash_cache is None:
+        _hash_cache = HashCache(HASH_CACHE_PATH)
+    return _hash_cache
+
+def use_hash_cache(db_path):
+    """Switches the shared hash cache to another database, opened on next use."""
+    global HASH_CACHE_PATH, _hash_cache
+    HASH_CACHE_PATH = db_path
+    _hash_cache = None
+
+class SourceFile:
+    """
+    A source file opened for both hashing and parsing. The file is memory-mapped
+    once; the hash is computed from the mapping only if the stat cache misses,
+    and lines() reads from the same mapping, so a changed file is read from
+    disk a single time and an unchanged one is not read at all.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.stat = os.fstat(self._file.fileno())
+        self._map = None
+        self.lines_read = 0
+        if self.stat.st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._hash = get_hash_cache().lookup(path, self.stat)
+
+    @property
+    def hash(self):
+        """The SHA-256 hex digest of the file, from the cache when possible."""
+        if self._hash is None:
+            sha256_hash = hashlib.sha256(self._map if self._map is not None else b'')
+            self._hash = sha256_hash.hexdigest()
+            get_hash_cache().store(self.path, self.stat, self._hash)
+        return self._hash
+
+    @property
+    def data(self):
+        """The file's bytes, as the memory map (empty bytes for an empty file). Byte searches run on it in place."""
+        return self._map if self._map is not None else b''
+
+    def lines(self, start=0, end=None):
+        """
+        Yields the file's lines decoded as UTF-8, straight from the mapping,
+        from byte offset 'start' (a line start) up to 'end' (a line start, or
+        the end of the file). lines_read counts the lines handed out so far.
+        """
+        if self._map is None:
+            return
+        self._map.seek(start)
+        readline = self._map.readline
+        if end is None:
+            for raw_line in iter(readline, b''):
+                self.lines_read += 1
+                yield raw_line.decode('utf-8')
+            return
+        tell = self._map.tell
+        while tell() < end:
+            self.lines_read += 1
+            yield readline().decode('utf-8')
+
+    @property
+    def bytes_read(self):
+        """How far into the file lines() has read."""
+        return self._map.tell() if self._map is not None else 0
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def open_source(path):
+    """Opens a source file for hashing and parsing. Use it as a context manager."""
+    return SourceFile(path)
+
+def get_file_hash(path):
+    """Returns the SHA-256 of a file, skipping the read when its stat is unchanged."""
+    with open_source(path) as source:
+        return source.hash
+
+def cached_file_hash(path):
+    """Returns the cached SHA-256 of a file whose stat is unchanged, or None. The file is never read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return get_hash_cache().lookup(path, st)
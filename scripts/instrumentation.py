@@ -0,0 +1,184 @@
+# scripts/instrumentation.py
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# Metrics are collected only while a collect() block is active. Outside of
+# one, phase() hands back a shared no-op context manager and count() returns
+# at once, so instrumented code costs next to nothing when metrics are off.
+_active = None
+_NO_PHASE = nullcontext()
+
+def metrics_path():
+    """Where main.py writes the run's metrics JSON (SCRIBE_METRICS), or None if metrics are off."""
+    return os.getenv('SCRIBE_METRICS') or None
+
+def quiet_mode():
+    """True when SCRIBE_QUIET is set: processors keep their progress messages to themselves."""
+    return os.getenv('SCRIBE_QUIET', '').lower() in ('1', 'true', 'yes')
+
+class Metrics:
+    """Wall and CPU time per named phase, plus free-form counters (lines, records, bytes...)."""
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+
+    def add_phase(self, name, wall_seconds, cpu_seconds):
+        totals = self.phases.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+        totals['wall_seconds'] += wall_seconds
+        totals['cpu_seconds'] += cpu_seconds
+        totals['calls'] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        """Adds the phases and counters of another Metrics (or its as_dict() form) to this one."""
+        other = other if isinstance(other, dict) else other.as_dict()
+        for name, totals in other['phases'].items():
+            mine = self.phases.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+            for key in mine:
+                mine[key] += totals[key]
+        for name, n in other['counters'].items():
+            self.count(name, n)
+
+    def as_dict(self):
+        phases = {
+            name: {
+                'wall_seconds': round(totals['wall_seconds'], 6),
+                'cpu_seconds': round(totals['cpu_seconds'], 6),
+                'calls': totals['calls'],
+            }
+            for name, totals in self.phases.items()
+        }
+        return {'phases': phases, 'counters': dict(self.counters)}
+
+class _Phase:
+    def __init__(self, metrics, name, exclude):
+        self.metrics = metrics
+        self.name = name
+        self.exclude = exclude
+
+    def __enter__(self):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        if isinstance(self.exclude, TimedIterator):
+            wall -= self.exclude.wall_seconds
+            cpu -= self.exclude.cpu_seconds
+        self.metrics.add_phase(self.name, wall, cpu)
+
+class TimedIterator:
+    """
+    Wraps an iterable and records the time spent producing its items under a
+    phase name. With streaming generators this separates the producer's time
+    (parsing) from the consumer's (encoding and writing).
+    """
+
+    def __init__(self, iterable, metrics, name):
+        self._iterator = iter(iterable)
+        self.metrics = metrics
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self.metrics.add_phase(self.name, self.wall_seconds, self.cpu_seconds)
+            raise
+        finally:
+            self.wall_seconds += time.perf_counter() - wall_start
+            self.cpu_seconds += time.process_time() - cpu_start
+
+@contextmanager
+def collect(enabled=True):
+    """
+    Collects metrics for the code inside the block and yields the Metrics
+    object (None when enabled is False, in which case nothing is recorded).
+    """
+    global _active
+    if not enabled:
+        yield None
+        return
+    previous = _active
+    _active = Metrics()
+    try:
+        yield _active
+    finally:
+        _active = previous
+
+def phase(name, exclude=None):
+    """
+    Times the block under 'name' in the active metrics, if any. Time spent
+    inside 'exclude' (an iterable returned by timed()) is left out.
+    """
+    if _active is None:
+        return _NO_PHASE
+    return _Phase(_active, name, exclude)
+
+def count(name, n=1):
+    """Adds n to a counter in the active metrics, if any."""
+    if _active is not None:
+        _active.count(name, n)
+
+def timed(iterable, name):
+    """Wraps an iterable in a TimedIterator, or returns it unchanged when metrics are off."""
+    if _active is None:
+        return iterable
+    return TimedIterator(iterable, _active, name)
+
+@contextmanager
+def quiet(enabled=True):
+    """Silences print() output inside the block when enabled."""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull:
+        previous = sys.stdout
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = previous
+
+def write_metrics(path, run_metrics, results, workers):
+    """
+    Saves a run's metrics as JSON: the run-level phases (tracker prefetch and
+    commit), the total over all files, and every file's own phases and counters.
+    """
+    total = Metrics()
+    files = {}
+    for result in results:
+        file_metrics = result.get('metrics')
+        if file_metrics:
+            total.merge(file_metrics)
+        files[result['filename']] = {
+            'status': result['status'],
+            'seconds': round(result['seconds'], 6),
+            'records': result['records'],
+            **(file_metrics or {'phases': {}, 'counters': {}}),
+        }
+
+    report = {
+        'workers': workers,
+        'run': run_metrics.as_dict(),
+        'total': total.as_dict(),
+        'files': files,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
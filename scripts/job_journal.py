@@ -0,0 +1,113 @@
+# scripts/job_journal.py
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+# Where main.py records the progress of its runs.
+JOURNAL_PATH = os.getenv('SCRIBE_JOURNAL', '.scribe_journal.sqlite')
+
+# The states a file goes through in a run, in order. A file is 'written' once
+# every output is in place, and 'committed' once the tracker knows about it.
+QUEUED = 'queued'
+PARSING = 'parsing'
+WRITTEN = 'written'
+COMMITTED = 'committed'
+FAILED = 'failed'
+
+# Only the most recent runs are kept; older ones are dropped as new ones start.
+KEEP_RUNS = 20
+
+class JobJournal:
+    """
+    Records the state of every file in a main.py run in a local SQLite
+    database, as it changes. After a crash the journal says which files
+    finished, which only need their tracker update, and which must be
+    processed again. Each update is its own small transaction, so worker
+    processes can write to it at the same time.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30)
+            # The journal has to survive the process being killed, not a power
+            # cut, so commits skip the fsync that would dominate a quick run.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run_id INTEGER PRIMARY KEY AUTOINCREMENT, started_at TEXT, finished_at TEXT);"
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "run_id INTEGER, position INTEGER, source_filename TEXT, target TEXT, state TEXT, "
+                "content_hash TEXT, error TEXT, updated_at TEXT, PRIMARY KEY (run_id, source_filename));"
+            )
+        return self._conn
+
+    def start_run(self, jobs):
+        """Starts a run of (source_filename, target) jobs, all queued, and returns its id."""
+        now = datetime.now(timezone.utc).isoformat()
+        with self.conn:
+            run_id = self.conn.execute("INSERT INTO runs (started_at) VALUES (?)", (now,)).lastrowid
+            self.conn.executemany(
+                "INSERT INTO jobs (run_id, position, source_filename, target, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, position, filename, target, QUEUED, now) for position, (filename, target) in enumerate(jobs)]
+            )
+            self.conn.execute("DELETE FROM jobs WHERE run_id <= ?", (run_id - KEEP_RUNS,))
+            self.conn.execute("DELETE FROM runs WHERE run_id <= ?", (run_id - KEEP_RUNS,))
+        return run_id
+
+    def latest_run(self):
+        """Returns (run_id, finished) for the most recent run, or None if there hasn't been one."""
+        row = self.conn.execute("SELECT run_id, finished_at FROM runs ORDER BY run_id DESC LIMIT 1").fetchone()
+        if row is None:
+            return None
+        return row[0], row[1] is not None
+
+    def jobs(self, run_id):
+        """The jobs of a run as dicts, in their original order."""
+        rows = self.conn.execute(
+            "SELECT source_filename, target, state, content_hash, error FROM jobs WHERE run_id = ? ORDER BY position",
+            (run_id,)
+        )
+        return [
+            {'source_filename': filename, 'target': target, 'state': state, 'content_hash': content_hash, 'error': error}
+            for filename, target, state, content_hash, error in rows
+        ]
+
+    def set_state(self, run_id, source_filenames, state, content_hash=None, error=None):
+        """Moves one file (or a list of them) to a new state."""
+        if isinstance(source_filenames, str):
+            source_filenames = [source_filenames]
+        now = datetime.now(timezone.utc).isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET state = ?, content_hash = COALESCE(?, content_hash), error = ?, updated_at = ? "
+                "WHERE run_id = ? AND source_filename = ?",
+                [(state, content_hash, error, now, run_id, filename) for filename in source_filenames]
+            )
+
+    def finish_run(self, run_id):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ?", (datetime.now(timezone.utc).isoformat(), run_id)
+            )
+
+_journal = None
+
+def get_journal():
+    """Returns the shared job journal, opening it on first use."""
+    global _journal
+    if _journal is None:
+        _journal = JobJournal(JOURNAL_PATH)
+    return _journal
+
+def use_journal(db_path):
+    """Switches the shared job journal to another database, opened on next use."""
+    global JOURNAL_PATH, _journal
+    JOURNAL_PATH = db_path
+    _journal = None
@@ -0,0 +1,430 @@
+# scripts/parallel_passages.py
+import os
+import sys
+import json
+import glob
+import time
+import zlib
+import argparse
+
+try:
+    import numpy as np
+except ImportError:  # Only this analysis stage needs NumPy.
+    np = None
+
+from scripts.blocked_jsonl import open_content
+from scripts.record_pipeline import atomic_output
+from scripts.search_index import tokenize
+
+PARALLELS_DIRNAME = 'parallels'
+SIGNATURE_SUFFIX = '.sig.npz'
+PAIR_SUFFIX = '.pairs.json'
+OUTPUT_FILENAME = 'cross_references.jsonl'
+
+# Passages are compared as sets of shingles, runs of SHINGLE_WORDS tokens.
+# Records longer than WINDOW_WORDS are cut into overlapping windows
+# WINDOW_STEP words apart, so a short verse is compared with the part of a
+# long paragraph that echoes it rather than with the whole paragraph.
+SHINGLE_WORDS = 3
+WINDOW_WORDS = 40
+WINDOW_STEP = 20
+
+# MinHash signatures of NUM_PERMUTATIONS values, split into BANDS bands of
+# ROWS values for LSH. Two passages become a candidate pair when all rows
+# of one band agree, which happens with probability 1 - (1 - J**ROWS)**BANDS
+# for Jaccard similarity J: about 27% at 0.2, 66% at 0.3 and 93% at 0.4.
+NUM_PERMUTATIONS = 120
+BANDS = 40
+ROWS = 3
+SEED = 1
+# Multiplier that folds the token hashes of a shingle into one value.
+SHINGLE_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Pairs reported in the output need at least this exact Jaccard similarity.
+MIN_JACCARD = 0.3
+# A candidate is only checked exactly if its signature estimate reaches
+# this fraction of the threshold.
+ESTIMATE_SLACK = 0.5
+# An LSH bucket shared by more passages than this is a boilerplate phrase,
+# not a parallel, and is skipped.
+MAX_BUCKET = 100
+# Shingles hashed per NumPy batch. The batch takes NUM_PERMUTATIONS * 8
+# bytes per shingle; about 4 MB stays in cache and is reused batch to batch.
+BATCH_SHINGLES = 4096
+
+# The settings a cached signature or pair file must have been built with.
+PARAMETERS = {
+    'shingle_words': SHINGLE_WORDS, 'window_words': WINDOW_WORDS, 'window_step': WINDOW_STEP,
+    'num_permutations': NUM_PERMUTATIONS, 'bands': BANDS, 'rows': ROWS, 'seed': SEED,
+}
+
+def parallels_dir_for(processed_dir):
+    return os.path.join(processed_dir, PARALLELS_DIRNAME)
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Parallel passage detection needs NumPy. Install it with 'pip install numpy'.")
+
+def _content_version(content_path):
+    stat = os.stat(content_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _permutations():
+    # Multiply-shift hashing: h(x) = (a*x + b) >> 32 with odd 64-bit a, in
+    # wrapping uint64 arithmetic, so no division is needed.
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+    return a, b
+
+def shingle_hashes(token_hashes, record_offsets):
+    """
+    Hashes every run of SHINGLE_WORDS tokens in one pass over the tokens of a
+    whole work. Position i gets the hash of the shingle that starts there; a
+    record shorter than a shingle gets one hash of all its tokens at its
+    first position. Returns 32-bit hashes, one per token position.
+    """
+    count = len(token_hashes)
+    combined = token_hashes.copy()
+    multiplier = np.uint64(SHINGLE_MULTIPLIER)
+    for offset in range(1, SHINGLE_WORDS):
+        combined[:count - offset] = combined[:count - offset] * multiplier + token_hashes[offset:]
+    lengths = np.diff(record_offsets)
+    for record in np.nonzero((lengths > 0) & (lengths < SHINGLE_WORDS))[0].tolist():
+        start, end = record_offsets[record], record_offsets[record + 1]
+        # Python ints, masked to 64 bits, wrap the way the uint64 arrays do.
+        value = int(token_hashes[start])
+        for position in range(start + 1, end):
+            value = (value * SHINGLE_MULTIPLIER + int(token_hashes[position])) & 0xFFFFFFFFFFFFFFFF
+        combined[start] = value
+    return (combined >> np.uint64(32)).astype(np.uint32)
+
+def minhash_signatures(shingles, offsets):
+    """
+    Computes the MinHash signature of every passage at once. 'shingles' holds
+    the shingle hashes of all passages back to back and passage i owns
+    shingles[offsets[i]:offsets[i + 1]]; none may be empty. Passages are
+    hashed in batches of about BATCH_SHINGLES shingles, each one a single
+    (shingles x permutations) array reduced per passage with minimum.reduceat.
+    """
+    a, b = _permutations()
+    shift = np.uint64(32)
+    count = len(offsets) - 1
+    signatures = np.empty((count, NUM_PERMUTATIONS), dtype=np.uint32)
+    buffer = np.empty((BATCH_SHINGLES, NUM_PERMUTATIONS), dtype=np.uint64)
+    start = 0
+    while start < count:
+        end = int(np.searchsorted(offsets, offsets[start] + BATCH_SHINGLES, side='right')) - 1
+        end = min(max(end, start + 1), count)
+        low, high = offsets[start], offsets[end]
+        # A single passage longer than a batch gets an array of its own.
+        hashed = buffer[:high - low] if high - low <= BATCH_SHINGLES else None
+        hashed = np.multiply(shingles[low:high, None].astype(np.uint64), a, out=hashed)
+        hashed += b
+        hashed >>= shift
+        signatures[start:end] = np.minimum.reduceat(hashed, offsets[start:end] - low, axis=0)
+        start = end
+    return signatures
+
+class WorkSignatures:
+    """
+    The passages of one work and their MinHash signatures, as saved in
+    parallels/<work>.sig.npz. 'records' holds each record's fields without
+    its text; passage i is words [starts[i], starts[i] + lengths[i]) of
+    record passage_records[i], and owns shingles[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, work, meta, arrays):
+        self.work = work
+        self.meta = meta
+        self.records = meta['records']
+        self.passage_records = arrays['passage_records']
+        self.starts = arrays['starts']
+        self.lengths = arrays['lengths']
+        self.offsets = arrays['offsets']
+        self.shingles = arrays['shingles']
+        self.signatures = arrays['signatures']
+        self._shingle_sets = {}
+
+    @property
+    def version(self):
+        return self.meta['content_version']
+
+    def shingle_set(self, passage):
+        shingles = self._shingle_sets.get(passage)
+        if shingles is None:
+            shingles = self._shingle_sets[passage] = frozenset(
+                self.shingles[self.offsets[passage]:self.offsets[passage + 1]].tolist()
+            )
+        return shingles
+
+    def passage(self, passage):
+        """The reference of a passage for the output: its record's fields and word range."""
+        start = int(self.starts[passage])
+        return dict(
+            self.records[self.passage_records[passage]], work_id=self.work,
+            words=[start, start + int(self.lengths[passage])]
+        )
+
+    @classmethod
+    def build(cls, content_path):
+        """Reads a content file (plain or compressed) and computes its passages and signatures."""
+        work = os.path.basename(content_path).replace('_content.jsonl', '')
+        version = _content_version(content_path)
+        records = []
+        # Every distinct token is hashed once; the shingles are combined from
+        # these hashes with NumPy, for all records together.
+        token_ids = {}
+        tokens = []
+        record_offsets = [0]
+        with open_content(content_path) as f:
+            for line in f:
+                record = json.loads(line)
+                for token in tokenize(record.pop('text', '')):
+                    token_id = token_ids.get(token)
+                    if token_id is None:
+                        token_id = token_ids[token] = zlib.crc32(token.encode('utf-8'))
+                    tokens.append(token_id)
+                record_offsets.append(len(tokens))
+                records.append(record)
+        record_offsets = np.array(record_offsets, dtype=np.int64)
+        hashes = shingle_hashes(np.array(tokens, dtype=np.uint64), record_offsets)
+
+        # Window w of a record covers its words [w, w + WINDOW_WORDS), so it
+        # owns the shingles that start at w up to the last one that fits.
+        passage_records = []
+        starts = []
+        lengths = []
+        for record, (first, end) in enumerate(zip(record_offsets[:-1].tolist(), record_offsets[1:].tolist())):
+            size = end - first
+            if not size:
+                continue
+            last_start = max(size - WINDOW_WORDS, 0)
+            window_starts = list(range(0, last_start + 1, WINDOW_STEP))
+            if window_starts[-1] != last_start:
+                window_starts.append(last_start)
+            for start in window_starts:
+                passage_records.append(record)
+                starts.append(start)
+                lengths.append(min(WINDOW_WORDS, size - start))
+        passage_records = np.array(passage_records, dtype=np.int32)
+        starts = np.array(starts, dtype=np.int32)
+        lengths = np.array(lengths, dtype=np.int32)
+
+        # Gather each passage's shingles into one flat array.
+        counts = np.maximum(lengths - SHINGLE_WORDS + 1, 1).astype(np.int64)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        first_positions = record_offsets[passage_records] + starts
+        positions = np.arange(offsets[-1], dtype=np.int64) + np.repeat(first_positions - offsets[:-1], counts)
+
+        arrays = {
+            'passage_records': passage_records,
+            'starts': starts,
+            'lengths': lengths,
+            'offsets': offsets,
+            'shingles': hashes[positions],
+        }
+        arrays['signatures'] = minhash_signatures(arrays['shingles'], arrays['offsets'])
+        meta = {
+            'parameters': PARAMETERS, 'content_filename': os.path.basename(content_path),
+            'content_version': version, 'records': records,
+        }
+        return cls(work, meta, arrays)
+
+    def save(self, path):
+        arrays = {
+            'passage_records': self.passage_records, 'starts': self.starts, 'lengths': self.lengths,
+            'offsets': self.offsets, 'shingles': self.shingles, 'signatures': self.signatures,
+            'meta': np.frombuffer(json.dumps(self.meta).encode('utf-8'), dtype=np.uint8),
+        }
+        with atomic_output(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        meta = json.loads(arrays.pop('meta').tobytes().decode('utf-8'))
+        work = os.path.basename(path)[:-len(SIGNATURE_SUFFIX)]
+        return cls(work, meta, arrays)
+
+def _band_keys(signatures):
+    """Folds each band of ROWS signature values into one uint64 key: (passages x BANDS)."""
+    bands = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    keys = np.zeros((len(signatures), BANDS), dtype=np.uint64)
+    for row in range(ROWS):
+        keys = keys * np.uint64(0x100000001B3) ^ bands[:, :, row]
+    return keys
+
+def candidate_pairs(left, right):
+    """
+    Returns (left passages, right passages) that share at least one LSH
+    bucket, as two index arrays. For every band the right-hand keys are
+    sorted once and every left-hand key is looked up with searchsorted; the
+    matching ranges are expanded into pairs without a Python loop.
+    """
+    left_keys = _band_keys(left.signatures)
+    right_keys = _band_keys(right.signatures)
+    right_count = np.int64(len(right_keys))
+    found = []
+    for band in range(BANDS):
+        order = np.argsort(right_keys[:, band], kind='stable')
+        sorted_keys = right_keys[order, band]
+        low = np.searchsorted(sorted_keys, left_keys[:, band], side='left')
+        high = np.searchsorted(sorted_keys, left_keys[:, band], side='right')
+        counts = high - low
+        counts[counts > MAX_BUCKET] = 0
+        total = int(counts.sum())
+        if not total:
+            continue
+        left_passages = np.repeat(np.arange(len(left_keys), dtype=np.int64), counts)
+        # Position within each range, plus the range's start in sorted order.
+        first = np.repeat(low - (np.cumsum(counts) - counts), counts)
+        right_passages = order[np.arange(total) + first]
+        found.append(left_passages * right_count + right_passages)
+    if not found:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.unique(np.concatenate(found))
+    return pairs // right_count, pairs % right_count
+
+def compare_works(left, right, min_jaccard=MIN_JACCARD):
+    """
+    Finds the parallel passages of two works: LSH candidates whose signature
+    estimate is close enough are checked with the exact Jaccard similarity of
+    their shingle sets. Of several matching windows of the same two records
+    only the best is kept. Returns the matches, best first.
+    """
+    left_passages, right_passages = candidate_pairs(left, right)
+
+    # The estimate is the share of signature values two passages have in common.
+    keep = []
+    batch = max(1, (1 << 24) // NUM_PERMUTATIONS)
+    for start in range(0, len(left_passages), batch):
+        lp = left_passages[start:start + batch]
+        rp = right_passages[start:start + batch]
+        estimate = (left.signatures[lp] == right.signatures[rp]).mean(axis=1)
+        keep.append(np.nonzero(estimate >= min_jaccard * ESTIMATE_SLACK)[0] + start)
+    keep = np.concatenate(keep) if keep else np.empty(0, dtype=np.int64)
+
+    best = {}
+    for lp, rp in zip(left_passages[keep].tolist(), right_passages[keep].tolist()):
+        left_set = left.shingle_set(lp)
+        right_set = right.shingle_set(rp)
+        shared = len(left_set & right_set)
+        if not shared:
+            continue
+        jaccard = shared / (len(left_set) + len(right_set) - shared)
+        if jaccard < min_jaccard:
+            continue
+        key = (int(left.passage_records[lp]), int(right.passage_records[rp]))
+        if key not in best or jaccard > best[key][0]:
+            best[key] = (jaccard, shared, lp, rp)
+
+    matches = [
+        {'jaccard': round(jaccard, 4), 'shared_shingles': shared,
+         'a': left.passage(lp), 'b': right.passage(rp)}
+        for jaccard, shared, lp, rp in best.values()
+    ]
+    matches.sort(key=lambda match: -match['jaccard'])
+    return matches
+
+def update_parallels(processed_dir, min_jaccard=MIN_JACCARD):
+    """
+    Brings the cross-references of processed_dir up to date and writes them,
+    best first, to parallels/cross_references.jsonl. Every work's signatures
+    and every pair of works' matches are cached under parallels/; a work is
+    only re-read if its content file changed, and only the pairs that involve
+    a new or changed work are compared again. Returns the list of work pairs
+    that were compared.
+    """
+    _require_numpy()
+    parallels_dir = parallels_dir_for(processed_dir)
+    os.makedirs(parallels_dir, exist_ok=True)
+
+    content_paths = sorted(glob.glob(os.path.join(processed_dir, '*_content.jsonl')))
+    works = [os.path.basename(path).replace('_content.jsonl', '') for path in content_paths]
+    versions = {work: _content_version(path) for work, path in zip(works, content_paths)}
+
+    loaded = {}
+    def signatures(work):
+        # Signatures are loaded (or built) only for works that take part in a comparison.
+        if work not in loaded:
+            path = os.path.join(parallels_dir, work + SIGNATURE_SUFFIX)
+            cached = WorkSignatures.load(path) if os.path.exists(path) else None
+            if cached is None or cached.meta['parameters'] != PARAMETERS or cached.version != versions[work]:
+                print(f"  Computing signatures: {work}")
+                cached = WorkSignatures.build(os.path.join(processed_dir, f'{work}_content.jsonl'))
+                cached.save(path)
+            loaded[work] = cached
+        return loaded[work]
+
+    compared = []
+    wanted = set()
+    all_matches = []
+    for i, left_work in enumerate(works):
+        for right_work in works[i + 1:]:
+            path = os.path.join(parallels_dir, f'{left_work}__{right_work}{PAIR_SUFFIX}')
+            wanted.add(path)
+            cached = None
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+            current = (
+                cached is not None and cached['parameters'] == PARAMETERS and cached['min_jaccard'] == min_jaccard
+                and cached['versions'] == [versions[left_work], versions[right_work]]
+            )
+            if not current:
+                print(f"  Comparing {left_work} with {right_work}...")
+                cached = {
+                    'parameters': PARAMETERS, 'min_jaccard': min_jaccard,
+                    'versions': [versions[left_work], versions[right_work]],
+                    'matches': compare_works(signatures(left_work), signatures(right_work), min_jaccard),
+                }
+                with atomic_output(path) as f:
+                    json.dump(cached, f)
+                compared.append((left_work, right_work))
+            all_matches.extend(cached['matches'])
+
+    # Drop the cache files of works that are gone.
+    for path in glob.glob(os.path.join(parallels_dir, '*' + PAIR_SUFFIX)):
+        if path not in wanted:
+            os.remove(path)
+    for path in glob.glob(os.path.join(parallels_dir, '*' + SIGNATURE_SUFFIX)):
+        if os.path.basename(path)[:-len(SIGNATURE_SUFFIX)] not in versions:
+            os.remove(path)
+
+    all_matches.sort(key=lambda match: -match['jaccard'])
+    with atomic_output(os.path.join(parallels_dir, OUTPUT_FILENAME)) as f:
+        for match in all_matches:
+            f.write(json.dumps(match) + '\n')
+    return compared
+
+def _label(passage):
+    number = passage.get('verse', passage.get('paragraph'))
+    return f"{passage['work_id']}: {passage.get('book')} {passage.get('chapter')}:{number} words {passage['words'][0]}-{passage['words'][1]}"
+
+if __name__ == '__main__':
+    # Example: python -m scripts.parallel_passages --show 20
+    parser = argparse.ArgumentParser(description="Find parallel passages between the processed works.")
+    parser.add_argument('--processed-dir', default='processed_corpus')
+    parser.add_argument(
+        '--min-jaccard', type=float, default=MIN_JACCARD,
+        help=f"Lowest Jaccard similarity to report (default: {MIN_JACCARD})."
+    )
+    parser.add_argument('--show', type=int, default=10, metavar='N', help="Print the N best matches (default: 10).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        compared = update_parallels(args.processed_dir, args.min_jaccard)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    output_path = os.path.join(parallels_dir_for(args.processed_dir), OUTPUT_FILENAME)
+    with open(output_path, 'r', encoding='utf-8') as f:
+        matches = [json.loads(line) for line in f]
+    print(f"{len(compared)} pair(s) of works compared, {len(matches)} match(es) in {time.perf_counter() - start:.2f}s")
+    for match in matches[:args.show]:
+        print(f"  {match['jaccard']:.2f}  {_label(match['a'])}  <->  {_label(match['b'])}")
+    print(f"Cross-references saved to {output_path}")
@@ -0,0 +1,126 @@
+# scripts/processor_registry.py
+import os
+import fnmatch
+import importlib
+
+# Installed packages can add processors under this entry point group. The
+# entry point's name is a filename pattern, or 'sha256:<digest>' to claim one
+# exact source file, and its value is the processor function:
+#
+#   [project.entry-points."scribe.processors"]
+#   "philo_*.txt" = "scribe_philo.process:process_philo"
+ENTRY_POINT_GROUP = 'scribe.processors'
+HASH_PREFIX = 'sha256:'
+
+# Processor functions already imported by this process, by target.
+_loaded = {}
+
+def load_target(target):
+    """Imports a 'package.module:function' target and returns the function."""
+    function = _loaded.get(target)
+    if function is None:
+        module_name, _, function_name = target.partition(':')
+        function = getattr(importlib.import_module(module_name), function_name)
+        _loaded[target] = function
+    return function
+
+class Processor:
+    """
+    A processor known only by its module path, so registering it imports
+    nothing. 'patterns' are filename patterns (fnmatch syntax) and 'hashes'
+    the SHA-256 digests of source files it handles whatever their name.
+    'spec' is the 'package.module:NAME' target of the WorkSpec the processor
+    parses with, which scripts/validation.py checks its output against.
+    """
+
+    def __init__(self, target, patterns=(), hashes=(), spec=None):
+        module_name, _, function_name = target.partition(':')
+        if not module_name or not function_name:
+            raise ValueError(f"Processor target '{target}' must look like 'package.module:function'.")
+        self.target = target
+        self.patterns = tuple(patterns)
+        self.hashes = frozenset(hashes)
+        self.spec = spec
+
+    def matches(self, filename):
+        return any(fnmatch.fnmatchcase(filename, pattern) for pattern in self.patterns)
+
+    def load(self):
+        """Imports the processor's module (once per process) and returns the function."""
+        return load_target(self.target)
+
+BUILTIN_PROCESSORS = [
+    Processor('scripts.process_kjv:process_kjv_bible', patterns=['pg10.txt'], spec='scripts.process_kjv:KJV_SPEC'),
+    Processor(
+        'scripts.process_josephus:process_josephus', patterns=['pg2850.txt'],
+        spec='scripts.process_josephus:JOSEPHUS_SPEC'
+    ),
+    # When you create a processor for Philo, you'll add it here:
+    # Processor('scripts.process_philo:process_philo', patterns=['philo_on_creation.txt'],
+    #           spec='scripts.process_philo:PHILO_SPEC'),
+]
+
+def _group_entry_points(group):
+    """The entry points of one group, on every Python the project supports."""
+    from importlib.metadata import entry_points
+    found = entry_points()
+    if hasattr(found, 'select'):
+        return found.select(group=group)
+    # Python 3.8 and 3.9 return a dict of group -> entry points, and their
+    # entry_points() takes no 'group' argument.
+    return found.get(group, [])
+
+class ProcessorRegistry:
+    """
+    Maps source files to processors by filename pattern or content hash.
+    Built-in and register()ed processors are tried first; entry point
+    plugins are only looked up for a file that none of them claims.
+    """
+
+    def __init__(self, processors=None, discover=True):
+        self.processors = list(BUILTIN_PROCESSORS if processors is None else processors)
+        self.discover = discover
+        self._plugins = None
+
+    def register(self, target, patterns=(), hashes=(), spec=None):
+        processor = Processor(target, patterns, hashes, spec)
+        self.processors.append(processor)
+        return processor
+
+    def plugins(self):
+        """The processors advertised under ENTRY_POINT_GROUP by installed packages."""
+        if self._plugins is None:
+            self._plugins = []
+            if self.discover:
+                # Importing importlib.metadata and scanning every installed
+                # distribution costs more than the rest of startup together.
+                for entry_point in _group_entry_points(ENTRY_POINT_GROUP):
+                    if entry_point.name.startswith(HASH_PREFIX):
+                        processor = Processor(entry_point.value, hashes=[entry_point.name[len(HASH_PREFIX):]])
+                    else:
+                        processor = Processor(entry_point.value, patterns=[entry_point.name])
+                    self._plugins.append(processor)
+        return self._plugins
+
+    def resolve(self, filename, source_path=None):
+        """
+        Returns the Processor for a source file, or None if nothing claims it.
+        Filename patterns are tried before content hashes, and the file is
+        only hashed (through the stat-keyed hash cache) when some processor
+        lists hashes. No processor module is imported.
+        """
+        for processor in self.processors:
+            if processor.matches(filename):
+                return processor
+        for processor in self.plugins():
+            if processor.matches(filename):
+                return processor
+
+        by_hash = [processor for processor in self.processors + self.plugins() if processor.hashes]
+        if by_hash and source_path is not None and os.path.isfile(source_path):
+            from scripts.hash_cache import get_file_hash
+            file_hash = get_file_hash(source_path)
+            for processor in by_hash:
+                if file_hash in processor.hashes:
+                    return processor
+        return None
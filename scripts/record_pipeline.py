@@ -0,0 +1,174 @@
+# scripts/record_pipeline.py
+import os
+import json
+from contextlib import contextmanager
+
+from scripts import instrumentation
+from scripts.blocked_jsonl import BlockWriter, block_index_path
+
+# Records are written through a large buffer so that the output file sees a
+# few big writes instead of one small write per record.
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+class PendingRecord:
+    """
+    Holds the record currently being parsed while its continuation lines are
+    collected. The text is kept as a list of parts and joined once, when the
+    record is finished, instead of growing a string with repeated '+='.
+    """
+
+    def __init__(self):
+        self.record = None
+        self.parts = []
+
+    def start(self, record, text):
+        """Begins a new record and returns the previous one, if it was finished."""
+        finished = self.finish()
+        self.record = record
+        self.parts = [text]
+        return finished
+
+    def append(self, text):
+        """Adds a continuation line to the current record. Returns False if there is none."""
+        if self.record is None:
+            return False
+        self.parts.append(text)
+        return True
+
+    def finish(self):
+        """Returns the current record with its text joined, or None if there isn't one."""
+        record = self.record
+        if record is not None:
+            record['text'] = ' '.join(self.parts)
+            self.record = None
+            self.parts = []
+        return record
+
+@contextmanager
+def atomic_output(path, mode='w', **open_kwargs):
+    """
+    Opens a temporary file next to 'path' for writing and renames it over
+    'path' when the block completes. If the block fails (or the process is
+    killed) 'path' keeps its previous contents and the temporary file is
+    left out of the way, so a reader never sees a half-written output.
+    """
+    temp_path = path + '.tmp'
+    if 'b' not in mode:
+        open_kwargs.setdefault('encoding', 'utf-8')
+    try:
+        with open(temp_path, mode, **open_kwargs) as f:
+            yield f
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+
+def write_records(records, output_path, sinks=(), compress=None):
+    """
+    Streams records from any iterable straight to a JSONL file, one record per
+    line, and returns the number of records written. Nothing is kept in memory
+    beyond the write buffer, so peak memory does not depend on the input size.
+
+    A record may also be a str holding an already-encoded JSON line (for
+    example one copied from a previous run); it is written unchanged. Output
+    goes to a temporary file that replaces output_path only once it is
+    complete, so the old file can be read while the new one is written.
+
+    With compress (by default, when compress_content() says so) the lines are
+    written as independently compressed gzip blocks (see blocked_jsonl.py)
+    and a block index is saved next to the file.
+
+    Each sink gets add(record, offset, length) for every record, with the
+    byte offset and length of its line in the uncompressed text, and finish()
+    once the file is in place. If writing fails, sinks that have an abort()
+    method get that instead, to clean up what they spooled.
+    """
+    if compress is None:
+        compress = compress_content()
+    record_count = 0
+    offset = 0
+    # With metrics on, time spent inside the records generator (parsing) is
+    # recorded as 'parse' and the rest of the loop as 'write'.
+    records = instrumentation.timed(records, 'parse')
+    try:
+        with instrumentation.phase('write', exclude=records), \
+                atomic_output(output_path, 'wb' if compress else 'w', buffering=WRITE_BUFFER_SIZE) as f:
+            if compress:
+                f = BlockWriter(f)
+            for record in records:
+                if isinstance(record, str):
+                    line = record
+                    if sinks:
+                        record = json.loads(line)
+                else:
+                    line = json.dumps(record) + '\n'
+                f.write(line)
+                # json.dumps escapes everything outside ASCII, so characters == bytes.
+                length = len(line)
+                for sink in sinks:
+                    sink.add(record, offset, length)
+                offset += length
+                record_count += 1
+            block_index = f.close() if compress else None
+    except BaseException:
+        for sink in sinks:
+            if hasattr(sink, 'abort'):
+                sink.abort()
+        raise
+
+    # The block index goes with the compressed file; a plain file has none.
+    index_path = block_index_path(output_path)
+    if block_index is not None:
+        with atomic_output(index_path) as f:
+            json.dump(block_index, f, separators=(',', ':'))
+    elif os.path.exists(index_path):
+        os.remove(index_path)
+    instrumentation.count('records_written', record_count)
+    instrumentation.count('bytes_written', block_index['compressed_size'] if block_index else offset)
+
+    with instrumentation.phase('sinks'):
+        for sink in sinks:
+            sink.finish()
+    return record_count
+
+def output_formats():
+    """
+    The extra formats to write next to every _content.jsonl, read from the
+    comma-separated SCRIBE_OUTPUT_FORMATS variable (e.g. "columnar,search,shards"). It is
+    read on every call so main.py can set it from the command line.
+    """
+    return {name.strip() for name in os.getenv('SCRIBE_OUTPUT_FORMATS', '').split(',') if name.strip()}
+
+def compress_content():
+    """
+    True when SCRIBE_COMPRESS_CONTENT is set: _content.jsonl files are then
+    written as blocked gzip. Every reader in the pipeline accepts both kinds.
+    """
+    return os.getenv('SCRIBE_COMPRESS_CONTENT', '').lower() in ('1', 'true', 'yes')
+
+def output_sinks(content_path):
+    """
+    Returns the write_records() sinks every processor attaches to its content
+    file: the reference index, plus whatever output_formats() asks for.
+    """
+    # Imported here so the sink modules can use this one without a cycle,
+    # and each format's module only when it is asked for: term_stats alone
+    # pulls in NumPy, which costs more than parsing a small work.
+    from scripts.reference_index import ReferenceIndexBuilder
+
+    sinks = [ReferenceIndexBuilder(content_path)]
+    formats = output_formats()
+    if 'columnar' in formats:
+        from scripts.columnar import ColumnarWriter
+        sinks.append(ColumnarWriter(content_path))
+    if 'search' in formats:
+        from scripts.search_index import SegmentBuilder
+        sinks.append(SegmentBuilder(content_path))
+    if 'shards' in formats:
+        from scripts.shards import ShardWriter
+        sinks.append(ShardWriter(content_path))
+    if 'stats' in formats:
+        from scripts.term_stats import StatsBuilder
+        sinks.append(StatsBuilder(content_path))
+    return sinks
@@ -0,0 +1,201 @@
+# scripts/reference_index.py
+import os
+import sys
+import json
+import bisect
+from array import array
+
+from scripts.blocked_jsonl import ContentReader
+from scripts.record_pipeline import atomic_output
+
+def reference_index_path(content_path):
+    """The reference index sits next to the content file: pg10_content.jsonl -> pg10_refindex.json."""
+    return content_path.replace('_content.jsonl', '_refindex.json')
+
+def record_number(record):
+    """The number that identifies a record within its chapter: its verse or paragraph."""
+    return record.get('verse', record.get('paragraph'))
+
+class ReferenceIndexBuilder:
+    """
+    A write_records() sink that remembers the byte offset and length of every
+    record under its (book, chapter, verse/paragraph) reference and saves them
+    as a sidecar index once the content file is complete.
+    """
+
+    def __init__(self, content_path):
+        self.content_path = content_path
+        # book -> chapter -> [numbers, offsets, lengths] columns; dicts keep
+        # reading order. Flat arrays keep this at a few bytes per record.
+        self.books = {}
+
+    def add(self, record, offset, length):
+        chapters = self.books.setdefault(record.get('book'), {})
+        columns = chapters.get(record.get('chapter'))
+        if columns is None:
+            columns = chapters[record.get('chapter')] = [array('i'), array('Q'), array('I')]
+        number = record_number(record)
+        if type(columns[0]) is array and not (type(number) is int and -2 ** 31 <= number < 2 ** 31):
+            # A number that doesn't fit the array turns this chapter's column into a list.
+            columns[0] = list(columns[0])
+        columns[0].append(number)
+        columns[1].append(offset)
+        columns[2].append(length)
+
+    def finish(self):
+        # The index is written one chapter at a time, so finishing never
+        # holds more than a chapter's worth of Python lists.
+        compact = json.JSONEncoder(separators=(',', ':')).encode
+        stat = os.stat(self.content_path)
+        with atomic_output(reference_index_path(self.content_path)) as f:
+            f.write(
+                '{"content_filename":' + compact(os.path.basename(self.content_path)) +
+                ',"content_size":' + compact(stat.st_size) +
+                ',"content_mtime_ns":' + compact(stat.st_mtime_ns) + ',"books":['
+            )
+            for book_number, (book, chapters) in enumerate(self.books.items()):
+                f.write((',' if book_number else '') + '{"book":' + compact(book) + ',"chapters":[')
+                for chapter_number, (chapter, (numbers, offsets, lengths)) in enumerate(chapters.items()):
+                    # Sorted by number so lookups can bisect; the sort is stable, so
+                    # repeated numbers keep their file order.
+                    order = sorted(range(len(numbers)), key=numbers.__getitem__)
+                    f.write((',' if chapter_number else '') + compact({
+                        'chapter': chapter,
+                        'numbers': [numbers[i] for i in order],
+                        'offsets': [offsets[i] for i in order],
+                        'lengths': [lengths[i] for i in order],
+                    }))
+                f.write(']}')
+            f.write(']}')
+
+class ReferenceReader:
+    """
+    Random access to the records of one _content.jsonl through its reference
+    index. Only the requested records are read from disk and decoded; a verse
+    or paragraph lookup is a dictionary lookup plus a binary search. On a
+    compressed content file only the blocks holding them are decompressed.
+
+        with ReferenceReader('processed_corpus/pg2850_content.jsonl') as reader:
+            reader.get('II', 8, 3)
+            reader.chapter('II', 8)
+    """
+
+    def __init__(self, content_path):
+        self.content_path = content_path
+        with open(reference_index_path(content_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        # Size and modification time together, so a rewrite of the same
+        # length (one changed letter) is caught too.
+        stat = os.stat(content_path)
+        if (index['content_size'], index.get('content_mtime_ns')) != (stat.st_size, stat.st_mtime_ns):
+            raise ValueError(
+                f"Reference index for '{content_path}' is out of date. Re-run the processor to rebuild it."
+            )
+
+        self._books = {}
+        for book_entry in index['books']:
+            chapters = {}
+            for chapter_entry in book_entry['chapters']:
+                chapters[chapter_entry['chapter']] = (
+                    chapter_entry['numbers'], chapter_entry['offsets'], chapter_entry['lengths']
+                )
+            self._books[book_entry['book']] = chapters
+        self._content = ContentReader(content_path)
+
+    def close(self):
+        self._content.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def books(self):
+        """Lists the books in the order they appear in the content file."""
+        return list(self._books)
+
+    def chapters(self, book):
+        """Lists the chapters of a book in the order they appear."""
+        return list(self._books[self.find_book(book)])
+
+    def find_book(self, name):
+        """
+        Resolves a book name to the name used in the records. Exact names win;
+        otherwise a unique case-insensitive match on the last words of the name
+        is accepted, so 'Genesis' finds 'The First Book of Moses: Called Genesis'.
+        """
+        if name in self._books:
+            return name
+        wanted = str(name).lower()
+        matches = [
+            book for book in self._books
+            if book is not None and (book.lower() == wanted or book.lower().endswith(' ' + wanted))
+        ]
+        if len(matches) == 1:
+            return matches[0]
+        if not matches:
+            raise KeyError(f"No book named '{name}'")
+        raise KeyError(f"'{name}' matches several books: {matches}")
+
+    def get(self, book, chapter, number):
+        """Returns the records with this exact reference (normally exactly one)."""
+        return self.get_range(book, chapter, number, number)
+
+    def get_range(self, book, chapter, first=None, last=None):
+        """
+        Returns the records of a chapter whose verse/paragraph number lies
+        between first and last (inclusive). Leaving both out returns the
+        whole chapter.
+        """
+        chapters = self._books[self.find_book(book)]
+        if chapter not in chapters:
+            raise KeyError(f"Book '{book}' has no chapter {chapter!r}")
+        numbers, offsets, lengths = chapters[chapter]
+
+        start = 0 if first is None else bisect.bisect_left(numbers, first)
+        end = len(numbers) if last is None else bisect.bisect_right(numbers, last)
+        return self._read(sorted(zip(offsets[start:end], lengths[start:end])))
+
+    def chapter(self, book, chapter):
+        """Returns every record of one chapter."""
+        return self.get_range(book, chapter)
+
+    def _read(self, spans):
+        # Neighbouring records are merged into one read, so a whole chapter is
+        # usually a single seek.
+        records = []
+        i = 0
+        while i < len(spans):
+            start, length = spans[i]
+            end = start + length
+            j = i + 1
+            while j < len(spans) and spans[j][0] == end:
+                end += spans[j][1]
+                j += 1
+            for line in self._content.read(start, end - start).splitlines():
+                records.append(json.loads(line))
+            i = j
+        return records
+
+def parse_reference_part(value):
+    """Command-line helper: numbers become ints, anything else stays a string."""
+    return int(value) if value.isdigit() else value
+
+if __name__ == '__main__':
+    # Example: python -m scripts.reference_index processed_corpus/pg2850_content.jsonl II 8 3
+    if len(sys.argv) < 4:
+        print("Usage: python -m scripts.reference_index <content.jsonl> <book> <chapter> [number]")
+        sys.exit(1)
+    with ReferenceReader(sys.argv[1]) as reader:
+        chapter = parse_reference_part(sys.argv[3])
+        try:
+            if len(sys.argv) > 4:
+                found = reader.get(sys.argv[2], chapter, parse_reference_part(sys.argv[4]))
+            else:
+                found = reader.chapter(sys.argv[2], chapter)
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            sys.exit(1)
+        for record in found:
+            print(json.dumps(record))
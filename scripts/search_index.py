@@ -0,0 +1,439 @@
+# scripts/search_index.py
+import os
+import re
+import json
+import glob
+import bisect
+from array import array
+
+from scripts.blocked_jsonl import ContentReader, open_content
+from scripts.container import map_container, padding, write_container
+from scripts.record_pipeline import atomic_output
+from scripts.reference_index import record_number
+
+# A segment is a container (see scripts/container.py) whose JSON header
+# names each array in the data area with its offset and size.
+MAGIC = b'SCRIBEI\x01'
+SEGMENT_SUFFIX = '.idx'
+INDEX_DIRNAME = 'search_index'
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    """Splits text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def encode_varints(values, out):
+    """Appends each non-negative integer to the bytearray 'out' as a LEB128 varint."""
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+def decode_varints(data):
+    """Decodes a run of LEB128 varints back into a list of integers."""
+    values = []
+    value = 0
+    shift = 0
+    for byte in data:
+        if byte < 0x80:
+            values.append(value | (byte << shift))
+            value = 0
+            shift = 0
+        else:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+    return values
+
+def index_dir_for(processed_dir):
+    return os.path.join(processed_dir, INDEX_DIRNAME)
+
+def segment_path(content_path, index_dir=None):
+    """pg10_content.jsonl -> <index_dir>/pg10.idx"""
+    if index_dir is None:
+        index_dir = index_dir_for(os.path.dirname(content_path))
+    work_id = os.path.basename(content_path).replace('_content.jsonl', '')
+    return os.path.join(index_dir, work_id + SEGMENT_SUFFIX)
+
+class SegmentBuilder:
+    """
+    Builds the search segment of one work. It can be used as a write_records()
+    sink, so the index is refreshed whenever the work is reprocessed, or fed
+    from an existing _content.jsonl by build_segment().
+
+    For every term, the postings are stored as varint-encoded
+    (doc delta, term frequency) pairs followed by the delta-encoded token
+    positions within each doc. Term queries only decode the first part;
+    phrase queries decode the positions too.
+    """
+
+    def __init__(self, content_path, index_dir=None):
+        self.content_path = content_path
+        self.path = segment_path(content_path, index_dir)
+        # term -> (doc ids, term frequencies, positions), as compact arrays
+        self.postings = {}
+        self.books = {}
+        self.chapters = {}
+        self.doc_books = array('i')
+        self.doc_chapters = array('i')
+        self.doc_numbers = array('i')
+        self.doc_offsets = array('Q')
+        self.doc_lengths = array('I')
+
+    def _code(self, dictionary, value):
+        # Integers are kept as they are; anything else becomes a negative id.
+        if type(value) is int and 0 <= value < 2 ** 31:
+            return value
+        key = json.dumps(value)
+        if key not in dictionary:
+            dictionary[key] = len(dictionary)
+        return -(dictionary[key] + 1)
+
+    def add(self, record, offset, length):
+        doc = len(self.doc_offsets)
+        self.doc_books.append(self._code(self.books, record.get('book')))
+        self.doc_chapters.append(self._code(self.chapters, record.get('chapter')))
+        self.doc_numbers.append(record_number(record) or 0)
+        self.doc_offsets.append(offset)
+        self.doc_lengths.append(length)
+
+        positions_by_term = {}
+        for position, token in enumerate(tokenize(record.get('text', ''))):
+            positions_by_term.setdefault(token, []).append(position)
+        for token, positions in positions_by_term.items():
+            entry = self.postings.get(token)
+            if entry is None:
+                entry = self.postings[token] = (array('I'), array('I'), array('I'))
+            entry[0].append(doc)
+            entry[1].append(len(positions))
+            entry[2].extend(positions)
+
+    def finish(self):
+        terms = sorted(self.postings)
+        blob = bytearray()
+        term_offsets = array('Q')
+        doc_sizes = array('I')
+        position_sizes = array('I')
+        doc_freqs = array('I')
+
+        for term in terms:
+            docs, freqs, positions = self.postings[term]
+            term_offsets.append(len(blob))
+            doc_freqs.append(len(docs))
+
+            start = len(blob)
+            previous = 0
+            pairs = []
+            for doc, freq in zip(docs, freqs):
+                pairs.append(doc - previous)
+                pairs.append(freq)
+                previous = doc
+            encode_varints(pairs, blob)
+            doc_sizes.append(len(blob) - start)
+
+            start = len(blob)
+            deltas = []
+            i = 0
+            for freq in freqs:
+                previous = 0
+                for position in positions[i:i + freq]:
+                    deltas.append(position - previous)
+                    previous = position
+                i += freq
+            encode_varints(deltas, blob)
+            position_sizes.append(len(blob) - start)
+
+        stat = os.stat(self.content_path)
+        arrays = [
+            ('terms', '\n'.join(terms).encode('utf-8')),
+            ('term_offsets', term_offsets.tobytes()),
+            ('doc_freqs', doc_freqs.tobytes()),
+            ('doc_sizes', doc_sizes.tobytes()),
+            ('position_sizes', position_sizes.tobytes()),
+            ('doc_books', self.doc_books.tobytes()),
+            ('doc_chapters', self.doc_chapters.tobytes()),
+            ('doc_numbers', self.doc_numbers.tobytes()),
+            ('doc_offsets', self.doc_offsets.tobytes()),
+            ('doc_lengths', self.doc_lengths.tobytes()),
+            ('postings', bytes(blob)),
+        ]
+        layout = {}
+        position = 0
+        for name, data in arrays:
+            layout[name] = [position, len(data)]
+            position += len(data) + padding(len(data))
+
+        header = {
+            'work': os.path.basename(self.content_path).replace('_content.jsonl', ''),
+            'content_filename': os.path.basename(self.content_path),
+            'content_size': stat.st_size,
+            'content_mtime_ns': stat.st_mtime_ns,
+            'doc_count': len(self.doc_offsets),
+            'term_count': len(terms),
+            'books': [json.loads(key) for key in self.books],
+            'chapters': [json.loads(key) for key in self.chapters],
+            'layout': layout,
+        }
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_output(self.path, 'wb') as f:
+            write_container(f, MAGIC, header, [data for _, data in arrays])
+
+class Segment:
+    """The memory-mapped search segment of one work."""
+
+    def __init__(self, path):
+        self.path = path
+        self._map, self.header, self._data_start = map_container(path, MAGIC, "SCRIBE search segment")
+
+        self.work = self.header['work']
+        self.doc_count = self.header['doc_count']
+        terms = self._bytes('terms').decode('utf-8')
+        self.terms = terms.split('\n') if terms else []
+        self.term_offsets = self._array('term_offsets', 'Q')
+        self.doc_freqs = self._array('doc_freqs', 'I')
+        self.doc_sizes = self._array('doc_sizes', 'I')
+        self.position_sizes = self._array('position_sizes', 'I')
+
+    def _bytes(self, name):
+        at, size = self.header['layout'][name]
+        start = self._data_start + at
+        return self._map[start:start + size]
+
+    def _array(self, name, typecode):
+        values = array(typecode)
+        values.frombytes(self._bytes(name))
+        return values
+
+    def is_current(self, content_path):
+        """True if the segment was built from the content file as it is now."""
+        try:
+            stat = os.stat(content_path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (self.header['content_size'], self.header['content_mtime_ns'])
+
+    def _term_id(self, term):
+        i = bisect.bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return None
+
+    def docs(self, term):
+        """The sorted doc ids that contain a term."""
+        term_id = self._term_id(term)
+        if term_id is None:
+            return []
+        start = self._data_start + self.header['layout']['postings'][0] + self.term_offsets[term_id]
+        pairs = decode_varints(self._map[start:start + self.doc_sizes[term_id]])
+        docs = []
+        doc = 0
+        for delta in pairs[::2]:
+            doc += delta
+            docs.append(doc)
+        return docs
+
+    def positions(self, term):
+        """{doc id: [token positions]} for every doc that contains a term."""
+        term_id = self._term_id(term)
+        if term_id is None:
+            return {}
+        start = self._data_start + self.header['layout']['postings'][0] + self.term_offsets[term_id]
+        doc_end = start + self.doc_sizes[term_id]
+        pairs = decode_varints(self._map[start:doc_end])
+        deltas = decode_varints(self._map[doc_end:doc_end + self.position_sizes[term_id]])
+
+        result = {}
+        doc = 0
+        i = 0
+        for delta, freq in zip(pairs[::2], pairs[1::2]):
+            doc += delta
+            positions = []
+            position = 0
+            for step in deltas[i:i + freq]:
+                position += step
+                positions.append(position)
+            result[doc] = positions
+            i += freq
+        return result
+
+    def reference(self, doc):
+        """(book, chapter, verse/paragraph) of a doc."""
+        if not hasattr(self, '_doc_books'):
+            self._doc_books = self._array('doc_books', 'i')
+            self._doc_chapters = self._array('doc_chapters', 'i')
+            self._doc_numbers = self._array('doc_numbers', 'i')
+        book = self._doc_books[doc]
+        chapter = self._doc_chapters[doc]
+        return (
+            book if book >= 0 else self.header['books'][-book - 1],
+            chapter if chapter >= 0 else self.header['chapters'][-chapter - 1],
+            self._doc_numbers[doc],
+        )
+
+    def span(self, doc):
+        """(byte offset, length) of a doc's line in the content file."""
+        if not hasattr(self, '_doc_offsets'):
+            self._doc_offsets = self._array('doc_offsets', 'Q')
+            self._doc_lengths = self._array('doc_lengths', 'I')
+        return self._doc_offsets[doc], self._doc_lengths[doc]
+
+    def close(self):
+        self._map.close()
+
+def parse_query(query):
+    """
+    Parses a query into OR-groups of (negated, tokens, is_phrase) clauses.
+    Words are ANDed ('AND' may be written out); 'OR' separates alternatives;
+    '-word' or 'NOT word' excludes; "double quotes" ask for an exact phrase.
+    """
+    groups = [[]]
+    negate_next = False
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if word == 'AND':
+            continue
+        if word == 'OR':
+            groups.append([])
+            continue
+        if word == 'NOT':
+            negate_next = True
+            continue
+        negated = negate_next
+        negate_next = False
+        if word.startswith('-') and len(word) > 1:
+            negated = True
+            word = word[1:]
+        tokens = tokenize(phrase if phrase else word)
+        if tokens:
+            groups[-1].append((negated, tokens, bool(phrase) or len(tokens) > 1))
+    return [group for group in groups if group]
+
+def _phrase_docs(segment, tokens):
+    postings = [segment.positions(token) for token in tokens]
+    if not all(postings):
+        return set()
+    candidates = set(postings[0])
+    for entry in postings[1:]:
+        candidates &= entry.keys()
+    matches = set()
+    for doc in candidates:
+        following = [set(entry[doc]) for entry in postings[1:]]
+        for start in postings[0][doc]:
+            if all(start + i + 1 in positions for i, positions in enumerate(following)):
+                matches.add(doc)
+                break
+    return matches
+
+def _clause_docs(segment, tokens, is_phrase):
+    if is_phrase:
+        return _phrase_docs(segment, tokens)
+    return set(segment.docs(tokens[0]))
+
+class SearchIndex:
+    """
+    Queries the search segments of every work in an index directory.
+
+        index = SearchIndex('processed_corpus/search_index')
+        for hit in index.search('"kingdom of heaven" OR jerusalem -rome'):
+            print(hit.reference_string())
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.segments = [Segment(path) for path in sorted(glob.glob(os.path.join(index_dir, '*' + SEGMENT_SUFFIX)))]
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+    def search(self, query, limit=None):
+        """Returns SearchHits in corpus order for a term, boolean or phrase query."""
+        groups = parse_query(query)
+        hits = []
+        for segment in self.segments:
+            matched = set()
+            for group in groups:
+                positive = [clause for clause in group if not clause[0]]
+                negative = [clause for clause in group if clause[0]]
+                if positive:
+                    # Start with the rarest clause so the sets shrink quickly.
+                    clause_sets = sorted(
+                        (_clause_docs(segment, tokens, is_phrase) for _, tokens, is_phrase in positive), key=len
+                    )
+                    docs = clause_sets[0]
+                    for other in clause_sets[1:]:
+                        docs &= other
+                else:
+                    docs = set(range(segment.doc_count))
+                for _, tokens, is_phrase in negative:
+                    docs -= _clause_docs(segment, tokens, is_phrase)
+                matched |= docs
+            hits.extend(SearchHit(segment, doc) for doc in sorted(matched))
+            if limit is not None and len(hits) >= limit:
+                return hits[:limit]
+        return hits
+
+class SearchHit:
+    def __init__(self, segment, doc):
+        self.segment = segment
+        self.doc = doc
+
+    @property
+    def work(self):
+        return self.segment.work
+
+    @property
+    def reference(self):
+        return self.segment.reference(self.doc)
+
+    def reference_string(self):
+        book, chapter, number = self.reference
+        return f"{self.work}: {book}/{chapter}/{number}"
+
+    def record(self, processed_dir):
+        """Reads the full record of the hit from its content file."""
+        offset, length = self.segment.span(self.doc)
+        with ContentReader(os.path.join(processed_dir, self.segment.header['content_filename'])) as content:
+            return json.loads(content.read(offset, length))
+
+def build_segment(content_path, index_dir=None):
+    """Builds the search segment of one work from its existing _content.jsonl."""
+    builder = SegmentBuilder(content_path, index_dir)
+    offset = 0
+    with open_content(content_path, 'rb') as f:
+        for line in f:
+            builder.add(json.loads(line), offset, len(line))
+            offset += len(line)
+    builder.finish()
+    return builder.path
+
+def update_index(processed_dir, index_dir=None):
+    """
+    Brings the index up to date with processed_dir: segments are rebuilt only
+    for works whose content file changed since the segment was built, and
+    segments of works that no longer exist are removed. Returns the list of
+    rebuilt work ids.
+    """
+    if index_dir is None:
+        index_dir = index_dir_for(processed_dir)
+    os.makedirs(index_dir, exist_ok=True)
+
+    content_paths = sorted(glob.glob(os.path.join(processed_dir, '*_content.jsonl')))
+    wanted = {segment_path(path, index_dir): path for path in content_paths}
+
+    rebuilt = []
+    for path, content_path in wanted.items():
+        current = False
+        if os.path.exists(path):
+            segment = Segment(path)
+            current = segment.is_current(content_path)
+            segment.close()
+        if not current:
+            build_segment(content_path, index_dir)
+            rebuilt.append(os.path.basename(path)[:-len(SEGMENT_SUFFIX)])
+
+    for path in glob.glob(os.path.join(index_dir, '*' + SEGMENT_SUFFIX)):
+        if path not in wanted:
+            os.remove(path)
+    return rebuilt
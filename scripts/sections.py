@@ -0,0 +1,203 @@
+# scripts/sections.py
+import os
+import json
+import hashlib
+from collections import deque
+
+from scripts import instrumentation
+from scripts.blocked_jsonl import open_content
+from scripts.record_pipeline import PendingRecord, atomic_output
+
+class Section:
+    """
+    One structural section of a source body (a KJV book, a Josephus BOOK or
+    PREFACE): its header line, every line up to the next header, and a hash
+    of those lines. The hash covers the raw lines; 'lines' keeps them
+    stripped, the form the parsers read, so each line is stripped only once.
+    """
+
+    def __init__(self, key, raw_lines, lines):
+        self.key = key
+        self.lines = lines
+        # One hash over the joined lines gives the same digest as hashing
+        # them one by one, at a fraction of the calls.
+        self.hash = hashlib.sha256(''.join(raw_lines).encode('utf-8')).hexdigest()
+
+def split_sections(lines, is_section_header):
+    """
+    Groups body lines into Sections, each starting at a line for which
+    is_section_header(stripped_line) is true. Lines before the first header are
+    dropped. A header that appears more than once gets a '#n' suffix so keys
+    stay unique.
+    """
+    occurrences = {}
+    key = None
+    raw_lines = stripped_lines = None
+    for line in lines:
+        stripped_line = line.strip()
+        if is_section_header(stripped_line):
+            if key is not None:
+                yield Section(key, raw_lines, stripped_lines)
+            occurrences[stripped_line] = occurrences.get(stripped_line, 0) + 1
+            key = stripped_line
+            if occurrences[stripped_line] > 1:
+                key = f"{stripped_line} #{occurrences[stripped_line]}"
+            raw_lines = [line]
+            stripped_lines = [stripped_line]
+        elif key is not None:
+            raw_lines.append(line)
+            stripped_lines.append(stripped_line)
+    if key is not None:
+        yield Section(key, raw_lines, stripped_lines)
+
+def sections_index_path(content_path):
+    """The section index sits next to the content file: pg10_content.jsonl -> pg10_sections.json."""
+    return content_path.replace('_content.jsonl', '_sections.json')
+
+def load_section_index(content_path, parser_version, context):
+    """
+    Loads the section index written by the previous run, or returns None if
+    there isn't one we can splice into: the content file is missing or no
+    longer matches the index, the parser has changed, or the work-level
+    context (title, structure) differs.
+    """
+    index_path = sections_index_path(content_path)
+    if not (os.path.exists(index_path) and os.path.exists(content_path)):
+        return None
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if index.get('parser_version') != parser_version or index.get('context') != context:
+        return None
+    if index.get('content_size') != os.path.getsize(content_path):
+        return None
+    return index
+
+def save_section_index(content_path, parser_version, context, entries):
+    """Writes the section hashes and record counts for the next run to compare against."""
+    index = {
+        'parser_version': parser_version,
+        'context': context,
+        'content_size': os.path.getsize(content_path),
+        'sections': entries
+    }
+    with atomic_output(sections_index_path(content_path)) as f:
+        json.dump(index, f, indent=2)
+
+def splice_sections(sections, parser, old_index, old_content_path, new_entries):
+    """
+    Generator that yields the records of every section, in order. Sections
+    whose hash matches the previous run are copied from the old content file
+    as raw JSON lines; only the rest are fed to parser.parse(). The hash and
+    record count of every section is appended to new_entries.
+
+    parser.parse(stripped_lines) yields (record, text) for every line that
+    starts a record and (None, text) for every continuation line.
+    A continuation line at the start of a section extends the last record of
+    the section before it, so a section is also re-parsed when the section
+    after it (or any record-less run of sections after it) has changed.
+    """
+    old_entries = old_index['sections'] if old_index else []
+    old_file = open_content(old_content_path) if old_entries else None
+    aligned = bool(old_entries)
+
+    pending = PendingRecord()
+    upcoming = deque()
+    sections = iter(sections)
+
+    def peek(offset):
+        # Pull sections from the source only as far as we need to look ahead.
+        while len(upcoming) <= offset:
+            section = next(sections, None)
+            if section is None:
+                return None
+            upcoming.append(section)
+        return upcoming[offset]
+
+    def differs(position, offset):
+        # True if the section at upcoming[offset] (old position 'position') changed.
+        section = peek(offset)
+        old = old_entries[position] if position < len(old_entries) else None
+        if section is None or old is None:
+            return section is not old
+        return section.key != old['key'] or section.hash != old['hash']
+
+    try:
+        position = 0
+        while peek(0) is not None:
+            section = upcoming.popleft()
+
+            # Old and new sections are compared position by position; after
+            # the first structural difference nothing more can be copied.
+            old = old_entries[position] if aligned and position < len(old_entries) else None
+            if old is None or old['key'] != section.key:
+                aligned = False
+                old = None
+
+            dirty = old is None or old['hash'] != section.hash
+            offset = 0
+            while not dirty:
+                dirty = differs(position + 1 + offset, offset)
+                following = old_entries[position + 1 + offset] if position + 1 + offset < len(old_entries) else None
+                if following is None or following['record_count'] > 0:
+                    break
+                offset += 1
+
+            if not dirty:
+                print(f"  Reusing unchanged section: {section.key}")
+                for _ in range(old['record_count']):
+                    yield old_file.readline()
+                instrumentation.count('sections_reused')
+                instrumentation.count('records_reused', old['record_count'])
+                new_entries.append({'key': section.key, 'hash': section.hash, 'record_count': old['record_count']})
+                position += 1
+                continue
+
+            print(f"  Processing section: {section.key}")
+            if old is not None:
+                for _ in range(old['record_count']):
+                    old_file.readline()
+
+            # A record-starting event means the parser's record pattern
+            # matched; a continuation line means it was tried and missed.
+            record_count = 0
+            continuations = 0
+            for record, text in parser.parse(section.lines):
+                if record is not None:
+                    finished = pending.start(record, text)
+                    if finished is not None:
+                        yield finished
+                    record_count += 1
+                else:
+                    continuations += 1
+                    if record_count:
+                        # Leading continuation lines belong to the previous
+                        # section's last record, which has already been handled.
+                        pending.append(text)
+            instrumentation.count('sections_parsed')
+            instrumentation.count('lines_parsed', len(section.lines))
+            instrumentation.count('pattern_hits', record_count)
+            instrumentation.count('pattern_misses', continuations)
+
+            # Let the last record collect the continuation lines that open
+            # the following sections, up to the next record.
+            if pending.record is not None:
+                offset = 0
+                while peek(offset) is not None:
+                    starts_record = False
+                    for record, text in parser.parse(upcoming[offset].lines):
+                        if record is not None:
+                            starts_record = True
+                            break
+                        pending.append(text)
+                    if starts_record:
+                        break
+                    offset += 1
+                finished = pending.finish()
+                if finished is not None:
+                    yield finished
+
+            new_entries.append({'key': section.key, 'hash': section.hash, 'record_count': record_count})
+            position += 1
+    finally:
+        if old_file is not None:
+            old_file.close()
@@ -0,0 +1,241 @@
+# scripts/shards.py
+import os
+import sys
+import json
+import hashlib
+
+from scripts import instrumentation
+from scripts.blocked_jsonl import BlockWriter
+from scripts.record_pipeline import atomic_output, compress_content
+from scripts.reference_index import record_number
+
+# A shard is closed at the first chapter boundary after it reaches either
+# limit; 0 turns a limit off. Every book starts a new shard regardless.
+DEFAULT_SHARD_RECORDS = 0
+DEFAULT_SHARD_BYTES = 1024 * 1024
+
+def shard_limits():
+    """
+    The (records, bytes) a shard aims for, from SCRIBE_SHARD_RECORDS and
+    SCRIBE_SHARD_BYTES. They are read on every call so main.py can set them
+    from the command line.
+    """
+    records = int(os.getenv('SCRIBE_SHARD_RECORDS') or DEFAULT_SHARD_RECORDS)
+    size = int(os.getenv('SCRIBE_SHARD_BYTES') or DEFAULT_SHARD_BYTES)
+    return records, size
+
+def shard_manifest_path(content_path):
+    """The shard manifest sits next to the content file: pg10_content.jsonl -> pg10_shards.json."""
+    return content_path.replace('_content.jsonl', '_shards.json')
+
+def shard_dir(content_path):
+    """Shards go in a directory next to the content file: pg10_content.jsonl -> pg10_shards/."""
+    return content_path.replace('_content.jsonl', '_shards')
+
+def load_shard_manifest(content_path, check=True):
+    """
+    Returns the shard manifest of a content file, or None if it has none.
+    A manifest written for an earlier version of the content file (a later
+    run without --formats shards doesn't update it) raises ValueError;
+    check=False returns it anyway.
+    """
+    try:
+        with open(shard_manifest_path(content_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if check and not _is_current(manifest, content_path):
+        raise ValueError(
+            f"Shard manifest for '{content_path}' is out of date. "
+            "Re-run the processor with --formats shards to rebuild it."
+        )
+    return manifest
+
+def _is_current(manifest, content_path):
+    try:
+        stat = os.stat(content_path)
+    except FileNotFoundError:
+        return False
+    return (stat.st_size, stat.st_mtime_ns) == (manifest.get('content_size'), manifest.get('content_mtime_ns'))
+
+def _reference(record):
+    return {'book': record.get('book'), 'chapter': record.get('chapter'), 'number': record_number(record)}
+
+class ShardWriter:
+    """
+    A write_records() sink that also writes a work's records as numbered
+    shards in <base>_shards/, plus a manifest (<base>_shards.json) giving
+    each shard's record range, its byte range in _content.jsonl, its first
+    and last reference and its SHA-256, so consumers can fan out over shards
+    without scanning the work.
+
+    Shards never split a chapter, and every book starts a new one; inside a
+    book a shard is closed at the first chapter boundary past the limits.
+    Shards are named <base>-<book number>-<part>.jsonl, so a change inside
+    one book leaves the names and contents of the other books' shards as
+    they were: a shard whose content is unchanged is not rewritten. With
+    compression on, shards are blocked gzip (.jsonl.gz) like the content.
+
+    Changed shards are written to '.tmp' files while the records stream in
+    and only moved into place by finish(), once the content file is
+    complete; abort() drops them, so a failed run leaves the old shards
+    and manifest as they were.
+    """
+
+    def __init__(self, content_path, max_records=None, max_bytes=None, compress=None):
+        default_records, default_bytes = shard_limits()
+        self.content_path = content_path
+        self.directory = shard_dir(content_path)
+        self.base = os.path.basename(content_path).replace('_content.jsonl', '')
+        self.max_records = default_records if max_records is None else max_records
+        self.max_bytes = default_bytes if max_bytes is None else max_bytes
+        self.compress = compress_content() if compress is None else compress
+        # The old shards are only compared by digest, so a stale manifest will do.
+        old_manifest = load_shard_manifest(content_path, check=False)
+        self._old_shards = {shard['filename']: shard for shard in old_manifest['shards']} if old_manifest else {}
+        self.shards = []
+        self.record_count = 0
+        self.written = 0
+        # (temp path, final path) of every shard written by this run.
+        self._pending = []
+        self._book = None
+        self._book_number = 0
+        self._part = 0
+        self._chapter = None
+        self._lines = []
+        self._size = 0
+        self._first = None
+        self._last = None
+        self._offset = None
+
+    def add(self, record, offset, length):
+        book = record.get('book')
+        chapter = record.get('chapter')
+        new_book = self._book_number == 0 or book != self._book
+        if self._lines and (new_book or (chapter != self._chapter and self._full())):
+            self._close_shard()
+        if new_book:
+            self._book = book
+            self._book_number += 1
+            self._part = 0
+        if not self._lines:
+            self._first = record
+            self._offset = offset
+        self._chapter = chapter
+        self._last = record
+        self._lines.append(json.dumps(record) + '\n')
+        self._size += length
+
+    def _full(self):
+        return (
+            (self.max_records and len(self._lines) >= self.max_records) or
+            (self.max_bytes and self._size >= self.max_bytes)
+        )
+
+    def _close_shard(self):
+        data = ''.join(self._lines).encode('utf-8')
+        filename = f"{self.base}-{self._book_number:04d}-{self._part:03d}.jsonl" + ('.gz' if self.compress else '')
+        path = os.path.join(self.directory, filename)
+        digest = hashlib.sha256(data).hexdigest()
+
+        # Unchanged shards are left alone, so consumers (and rsync) only see
+        # the ones that changed.
+        old = self._old_shards.get(filename)
+        if old is None or old['sha256'] != digest or not os.path.exists(path) or os.path.getsize(path) != old['size']:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = path + '.tmp'
+            self._pending.append((temp_path, path))
+            with open(temp_path, 'wb') as f:
+                if self.compress:
+                    writer = BlockWriter(f)
+                    for line in self._lines:
+                        writer.write(line)
+                    writer.close()
+                else:
+                    f.write(data)
+            size = os.path.getsize(temp_path)
+            self.written += 1
+            instrumentation.count('shards_written')
+        else:
+            size = old['size']
+            instrumentation.count('shards_reused')
+
+        self.shards.append({
+            'filename': filename,
+            'records': [self.record_count, self.record_count + len(self._lines)],
+            'content_offset': self._offset,
+            'content_length': len(data),
+            'size': size,
+            'sha256': digest,
+            'first': _reference(self._first),
+            'last': _reference(self._last),
+        })
+        self.record_count += len(self._lines)
+        self._part += 1
+        self._lines = []
+        self._size = 0
+
+    def abort(self):
+        """Called by write_records() when the content file could not be written: drops the new shards."""
+        for temp_path, _ in self._pending:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._pending = []
+
+    def finish(self):
+        try:
+            self._write()
+        finally:
+            self.abort()
+
+    def _write(self):
+        if self._lines:
+            self._close_shard()
+        for temp_path, path in self._pending:
+            os.replace(temp_path, path)
+        self._pending = []
+        # The content file this describes, so a reader can tell when a later
+        # run (without --formats shards) has left the shards behind.
+        stat = os.stat(self.content_path)
+        manifest = {
+            'content_filename': os.path.basename(self.content_path),
+            'content_size': stat.st_size,
+            'content_mtime_ns': stat.st_mtime_ns,
+            'directory': os.path.basename(self.directory),
+            'max_records': self.max_records,
+            'max_bytes': self.max_bytes,
+            'compressed': self.compress,
+            'record_count': self.record_count,
+            'shards': self.shards,
+        }
+        with atomic_output(shard_manifest_path(self.content_path)) as f:
+            json.dump(manifest, f, indent=2)
+
+        # Shards of books that shrank or disappeared are left over.
+        wanted = {shard['filename'] for shard in self.shards}
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename not in wanted:
+                    os.remove(os.path.join(self.directory, filename))
+        print(f"  {len(self.shards)} shard(s) in {self.directory}, {self.written} written")
+
+if __name__ == '__main__':
+    # Example: python -m scripts.shards processed_corpus/pg10_content.jsonl
+    if len(sys.argv) != 2:
+        print("Usage: python -m scripts.shards <content.jsonl>")
+        sys.exit(1)
+    try:
+        manifest = load_shard_manifest(sys.argv[1])
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if manifest is None:
+        print(f"No shard manifest for '{sys.argv[1]}'. Process it with --formats shards.")
+        sys.exit(1)
+    for shard in manifest['shards']:
+        first, last = shard['first'], shard['last']
+        print(
+            f"{shard['filename']}: records {shard['records'][0]}-{shard['records'][1] - 1}, "
+            f"{first['book']} {first['chapter']}:{first['number']} - {last['book']} {last['chapter']}:{last['number']}"
+        )
+    print(f"{len(manifest['shards'])} shard(s), {manifest['record_count']} records")
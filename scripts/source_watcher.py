@@ -0,0 +1,221 @@
+# scripts/source_watcher.py
+import os
+import sys
+import time
+import select
+import struct
+
+# A file counts as complete once its size and mtime have not changed for this
+# long, so a file that is still being copied in is not processed half-written.
+DEBOUNCE_SECONDS = 0.5
+# How often the directory is scanned when inotify isn't available.
+POLL_INTERVAL_SECONDS = 0.25
+
+# inotify constants from <sys/inotify.h>.
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+EVENT_HEADER = struct.Struct('iIII')
+
+class Inotify:
+    """
+    A minimal inotify binding through ctypes, for watching a single directory
+    on Linux. open() returns None where inotify can't be used, and the caller
+    falls back to polling.
+    """
+
+    def __init__(self, fd, libc):
+        self.fd = fd
+        self._libc = libc
+        # Set once the directory was moved or deleted: the kernel has dropped
+        # the watch, and no more events will come through this descriptor.
+        self.watch_lost = False
+
+    @classmethod
+    def open(cls, directory):
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            import ctypes
+            libc = ctypes.CDLL('libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return cls(fd, libc)
+
+    def read(self, timeout):
+        """
+        Waits up to 'timeout' seconds (None waits for ever) and returns the
+        names of the files that changed, or None if the whole directory has to
+        be rescanned (events were lost, or the directory itself went away).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        rescan = False
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self.watch_lost = True
+                rescan = True
+            elif mask & IN_Q_OVERFLOW:
+                rescan = True
+            elif name:
+                names.add(os.fsdecode(name))
+        return None if rescan else names
+
+    def close(self):
+        os.close(self.fd)
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+class SourceWatcher:
+    """
+    Watches a directory for new and changed files. The directory is
+    snapshotted when the watcher is created; batches() then yields lists of
+    the files that differ from what was last seen, each once it has stopped
+    changing for 'debounce' seconds. inotify wakes it as soon as something
+    happens; without it (or with poll=True) the directory is scanned every
+    POLL_INTERVAL_SECONDS. Hidden files, which copy tools and editors use
+    for temporary files, are ignored.
+
+    If the directory is moved away or deleted, the inotify watch goes with
+    it; the watcher then polls until a directory exists at the path again
+    and watches that one.
+    """
+
+    def __init__(self, directory, debounce=DEBOUNCE_SECONDS, poll=False):
+        self.directory = directory
+        self.debounce = debounce
+        self._inotify = None if poll else Inotify.open(directory)
+        self._use_inotify = self._inotify is not None
+        self._seen = self._scan()
+        # name -> (signature, when it was last seen to change)
+        self._pending = {}
+
+    @property
+    def mode(self):
+        return 'inotify' if self._use_inotify else 'polling'
+
+    def _scan(self):
+        signatures = {}
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return signatures
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                st = entry.stat()
+                signatures[entry.name] = (st.st_size, st.st_mtime_ns, st.st_ino)
+        return signatures
+
+    def _note(self, name, signature, now):
+        if name.startswith('.'):
+            return
+        if signature is None:
+            self._seen.pop(name, None)
+            self._pending.pop(name, None)
+            return
+        pending = self._pending.get(name)
+        if pending is not None:
+            if pending[0] != signature:
+                self._pending[name] = (signature, now)
+        elif self._seen.get(name) != signature:
+            self._pending[name] = (signature, now)
+
+    def _wait(self):
+        # Wakes up no later than the moment the next pending file could be ready.
+        now = time.monotonic()
+        timeout = None
+        if self._pending:
+            timeout = max(0.0, min(seen + self.debounce for _, seen in self._pending.values()) - now)
+        if self._inotify is None:
+            if self._use_inotify:
+                self._inotify = Inotify.open(self.directory)
+                if self._inotify is not None:
+                    # Watching again: rescan for whatever arrived unwatched.
+                    return None
+            time.sleep(POLL_INTERVAL_SECONDS if timeout is None else min(timeout, POLL_INTERVAL_SECONDS))
+            return None
+        names = self._inotify.read(timeout)
+        if self._inotify.watch_lost:
+            # Watch the directory now at the path, if there is one; otherwise
+            # poll until it comes back.
+            self._inotify.close()
+            self._inotify = Inotify.open(self.directory)
+        return names
+
+    def poll(self):
+        """Waits for the next change (or debounce deadline) and returns the files that are now ready."""
+        names = self._wait()
+        now = time.monotonic()
+        if names is None:
+            current = self._scan()
+            for name in set(self._seen) | set(self._pending) | set(current):
+                self._note(name, current.get(name), now)
+        else:
+            # inotify named the files to look at; pending ones are re-checked
+            # too, since a writer may have gone quiet without another event.
+            for name in names | set(self._pending):
+                self._note(name, _signature(os.path.join(self.directory, name)), now)
+
+        ready = []
+        for name, (signature, seen) in list(self._pending.items()):
+            if now - seen >= self.debounce:
+                del self._pending[name]
+                self._seen[name] = signature
+                ready.append(name)
+        return sorted(ready)
+
+    def batches(self):
+        """Yields a sorted list of ready files every time there is at least one."""
+        while True:
+            ready = self.poll()
+            if ready:
+                yield ready
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
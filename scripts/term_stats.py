@@ -0,0 +1,540 @@
+# scripts/term_stats.py
+import os
+import re
+import sys
+import json
+import glob
+import time
+import bisect
+import argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Only the statistics stage needs NumPy.
+    np = None
+
+from scripts.blocked_jsonl import ContentReader, open_content
+from scripts.container import map_container, padding, write_container
+from scripts.record_pipeline import atomic_output
+from scripts.reference_index import record_number
+from scripts.search_index import tokenize
+
+# A stats file is a container (see scripts/container.py) whose JSON header
+# names each array in the data area with its offset, size and NumPy dtype,
+# so a reader maps them without copying.
+MAGIC = b'SCRIBET\x01'
+STATS_SUFFIX = '.stats'
+STATS_DIRNAME = 'term_stats'
+PROCESSED_DIR = 'processed_corpus'
+
+KWIC_WIDTH = 40
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Term statistics need NumPy. Install it with 'pip install numpy'.")
+
+def stats_dir_for(processed_dir):
+    return os.path.join(processed_dir, STATS_DIRNAME)
+
+def stats_path(content_path, stats_dir=None):
+    """pg10_content.jsonl -> <stats_dir>/pg10.stats"""
+    if stats_dir is None:
+        stats_dir = stats_dir_for(os.path.dirname(content_path))
+    work_id = os.path.basename(content_path).replace('_content.jsonl', '')
+    return os.path.join(stats_dir, work_id + STATS_SUFFIX)
+
+class StatsBuilder:
+    """
+    Builds the term statistics of one work. Like SegmentBuilder it can be a
+    write_records() sink, so the stats are refreshed whenever the work is
+    reprocessed, or be fed from an existing _content.jsonl by build_stats().
+
+    Every record is a document. The file holds the vocabulary (sorted, so a
+    term's id is its rank), the token stream of every record as term ids,
+    and the document-term matrix in CSR form (per record, the ids of its
+    terms and how often each occurs), plus each record's book, chapter,
+    number and byte range in the content file.
+    """
+
+    def __init__(self, content_path, stats_dir=None):
+        _require_numpy()
+        self.content_path = content_path
+        self.path = stats_path(content_path, stats_dir)
+        self.vocabulary = {}
+        self.books = {}
+        self.chapters = {}
+        self.tokens = array('I')
+        self.token_offsets = array('Q', [0])
+        self.doc_books = array('i')
+        self.doc_chapters = array('i')
+        self.doc_numbers = array('i')
+        self.doc_offsets = array('Q')
+        self.doc_lengths = array('I')
+
+    def add(self, record, offset, length):
+        vocabulary = self.vocabulary
+        self.tokens.extend([vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(record.get('text', ''))])
+        self.token_offsets.append(len(self.tokens))
+
+        book = record.get('book')
+        chapter_key = json.dumps([book, record.get('chapter')])
+        self.doc_books.append(self.books.setdefault(json.dumps(book), len(self.books)))
+        self.doc_chapters.append(self.chapters.setdefault(chapter_key, len(self.chapters)))
+        self.doc_numbers.append(record_number(record) or 0)
+        self.doc_offsets.append(offset)
+        self.doc_lengths.append(length)
+
+    def finish(self):
+        terms = sorted(self.vocabulary)
+        term_count = len(terms)
+        doc_count = len(self.doc_offsets)
+
+        # Ids were handed out in order of first appearance; renumber them so
+        # the id of a term is its place in the sorted vocabulary.
+        remap = np.empty(term_count, dtype=np.uint32)
+        remap[[self.vocabulary[term] for term in terms]] = np.arange(term_count, dtype=np.uint32)
+        tokens = remap[np.frombuffer(self.tokens, dtype=np.uint32)]
+        token_offsets = np.frombuffer(self.token_offsets, dtype=np.uint64)
+
+        # One sort of (doc, term) keys gives the document-term matrix with
+        # each row's terms in order.
+        token_docs = np.repeat(np.arange(doc_count, dtype=np.int64), np.diff(token_offsets).astype(np.int64))
+        keys, counts = np.unique(token_docs * max(term_count, 1) + tokens, return_counts=True)
+        dt_docs = keys // max(term_count, 1)
+        dt_terms = (keys % max(term_count, 1)).astype(np.uint32)
+        dt_offsets = np.searchsorted(dt_docs, np.arange(doc_count + 1)).astype(np.uint64)
+
+        arrays = [
+            ('terms', np.frombuffer('\n'.join(terms).encode('utf-8'), dtype=np.uint8)),
+            ('term_totals', np.bincount(tokens, minlength=term_count).astype(np.uint32)),
+            ('term_doc_freqs', np.bincount(dt_terms, minlength=term_count).astype(np.uint32)),
+            ('tokens', tokens),
+            ('token_offsets', token_offsets),
+            ('dt_offsets', dt_offsets),
+            ('dt_terms', dt_terms),
+            ('dt_counts', counts.astype(np.uint32)),
+            ('doc_books', np.frombuffer(self.doc_books, dtype=np.int32)),
+            ('doc_chapters', np.frombuffer(self.doc_chapters, dtype=np.int32)),
+            ('doc_numbers', np.frombuffer(self.doc_numbers, dtype=np.int32)),
+            ('doc_offsets', np.frombuffer(self.doc_offsets, dtype=np.uint64)),
+            ('doc_lengths', np.frombuffer(self.doc_lengths, dtype=np.uint32)),
+        ]
+        layout = {}
+        position = 0
+        for name, data in arrays:
+            layout[name] = [position, data.nbytes, data.dtype.str]
+            position += data.nbytes + padding(data.nbytes)
+
+        stat = os.stat(self.content_path)
+        header = {
+            'work': os.path.basename(self.content_path).replace('_content.jsonl', ''),
+            'content_filename': os.path.basename(self.content_path),
+            'content_size': stat.st_size,
+            'content_mtime_ns': stat.st_mtime_ns,
+            'doc_count': doc_count,
+            'token_count': len(tokens),
+            'term_count': term_count,
+            'books': [json.loads(key) for key in self.books],
+            'chapters': [json.loads(key) for key in self.chapters],
+            'layout': layout,
+        }
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with atomic_output(self.path, 'wb') as f:
+            write_container(f, MAGIC, header, [data for _, data in arrays])
+
+class WorkStats:
+    """
+    The memory-mapped term statistics of one work. Queries can be narrowed
+    to a book, or a chapter of a book; book and chapter are matched against
+    the record fields, or their string form, so '1' finds chapter 1.
+    """
+
+    def __init__(self, path):
+        _require_numpy()
+        self.path = path
+        self._map, self.header, self._data_start = map_container(path, MAGIC, "SCRIBE term statistics file")
+        self._arrays = {}
+
+        self.work = self.header['work']
+        self.doc_count = self.header['doc_count']
+        self.term_count = self.header['term_count']
+        terms = self._array('terms').tobytes().decode('utf-8')
+        self.terms = terms.split('\n') if terms else []
+
+    def _array(self, name):
+        values = self._arrays.get(name)
+        if values is None:
+            at, size, dtype = self.header['layout'][name]
+            dtype = np.dtype(dtype)
+            values = np.frombuffer(self._map, dtype=dtype, count=size // dtype.itemsize, offset=self._data_start + at)
+            self._arrays[name] = values
+        return values
+
+    def _derived(self, name):
+        # The doc of every matrix entry and every token, made on first use.
+        values = self._arrays.get(name)
+        if values is None:
+            offsets = self._array('dt_offsets' if name == 'dt_docs' else 'token_offsets')
+            values = np.repeat(np.arange(self.doc_count, dtype=np.int64), np.diff(offsets).astype(np.int64))
+            self._arrays[name] = values
+        return values
+
+    def is_current(self, content_path):
+        """True if the stats were built from the content file as it is now."""
+        try:
+            stat = os.stat(content_path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (self.header['content_size'], self.header['content_mtime_ns'])
+
+    def term_id(self, term):
+        i = bisect.bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return i
+        return None
+
+    def reference(self, doc):
+        """(book, chapter, verse/paragraph) of a doc."""
+        book, chapter = self.header['chapters'][self._array('doc_chapters')[doc]]
+        return book, chapter, int(self._array('doc_numbers')[doc])
+
+    def span(self, doc):
+        """(byte offset, length) of a doc's line in the content file."""
+        return int(self._array('doc_offsets')[doc]), int(self._array('doc_lengths')[doc])
+
+    def scope(self, book=None, chapter=None):
+        """
+        A boolean mask over the docs of a book, or of one chapter of it; None
+        when neither is given, meaning the whole work.
+        """
+        if book is None and chapter is None:
+            return None
+        if chapter is None:
+            wanted = [i for i, value in enumerate(self.header['books']) if _matches(value, book)]
+            codes = self._array('doc_books')
+        else:
+            wanted = [
+                i for i, (book_value, chapter_value) in enumerate(self.header['chapters'])
+                if (book is None or _matches(book_value, book)) and _matches(chapter_value, chapter)
+            ]
+            codes = self._array('doc_chapters')
+        return np.isin(codes, wanted)
+
+    def counts(self, mask=None):
+        """Occurrences of every term id, in the whole work or in the docs of a scope() mask."""
+        if mask is None:
+            return self._array('term_totals').astype(np.int64)
+        entries = mask[self._derived('dt_docs')]
+        return np.bincount(
+            self._array('dt_terms')[entries], weights=self._array('dt_counts')[entries], minlength=self.term_count
+        ).astype(np.int64)
+
+    def occurrences(self, words, mask=None):
+        """
+        (docs, counts): the docs in which the words occur, as a term or a
+        consecutive phrase, and how often each does.
+        """
+        ids = [self.term_id(word) for word in words]
+        if not ids or None in ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        if len(ids) == 1:
+            entries = np.flatnonzero(self._array('dt_terms') == ids[0])
+            docs = self._derived('dt_docs')[entries]
+            counts = self._array('dt_counts')[entries].astype(np.int64)
+        else:
+            tokens = self._array('tokens')
+            token_docs = self._derived('token_docs')
+            starts = np.flatnonzero(tokens == ids[0])
+            for i, term_id in enumerate(ids[1:], 1):
+                starts = starts[starts + i < len(tokens)]
+                starts = starts[tokens[starts + i] == term_id]
+            # A phrase doesn't run on from one record into the next.
+            starts = starts[token_docs[starts] == token_docs[starts + len(ids) - 1]]
+            docs, counts = np.unique(token_docs[starts], return_counts=True)
+        if mask is not None:
+            keep = mask[docs]
+            docs, counts = docs[keep], counts[keep]
+        return docs, counts
+
+    def group_counts(self, docs, counts, level):
+        """Sums per-doc counts by book or by chapter, as [(book, count)] or [((book, chapter), count)]."""
+        if level == 'book':
+            labels = self.header['books']
+            codes = self._array('doc_books')
+        else:
+            labels = [tuple(pair) for pair in self.header['chapters']]
+            codes = self._array('doc_chapters')
+        sums = np.bincount(codes[docs], weights=counts, minlength=len(labels))
+        return [(labels[i], int(sums[i])) for i in np.flatnonzero(sums)]
+
+    def ngram_counts(self, n, mask=None):
+        """
+        (grams, counts) for every n-gram of consecutive tokens inside a
+        record. For n > 1, grams holds the term ids of one n-gram per row,
+        in term id order; for n = 1 it is a plain array of term ids.
+        """
+        if n < 1:
+            raise ValueError(f"An n-gram has at least one word, not {n}.")
+        if n == 1:
+            counts = self.counts(mask)
+            keys = np.flatnonzero(counts)
+            return keys, counts[keys]
+        tokens = self._array('tokens')
+        token_docs = self._derived('token_docs')
+        doc_ends = self._array('token_offsets')[1:].astype(np.int64)[token_docs]
+        valid = doc_ends - np.arange(len(tokens)) >= n
+        if mask is not None:
+            valid &= mask[token_docs]
+        starts = np.flatnonzero(valid)
+
+        # Each n-gram is packed into one int64 key, a word at a time. When
+        # the next word would overflow it, the keys so far are replaced by
+        # their rank among the distinct ones, which keeps their order and is
+        # below the number of n-grams.
+        keys = tokens[starts].astype(np.int64)
+        bound = self.term_count
+        for i in range(1, n):
+            if bound * self.term_count >= 2 ** 63:
+                distinct, keys = np.unique(keys, return_inverse=True)
+                bound = len(distinct)
+            keys = keys * self.term_count + tokens[starts + i]
+            bound *= self.term_count
+        _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        return tokens[starts[first][:, np.newaxis] + np.arange(n)], counts
+
+    def ngram(self, ids):
+        """The words of one n-gram (a row of ngram_counts()) as a tuple."""
+        return tuple(self.terms[term_id] for term_id in ids)
+
+    def close(self):
+        self._arrays.clear()
+        self._map.close()
+
+def _matches(value, wanted):
+    return value == wanted or str(value).lower() == str(wanted).lower()
+
+def _top(keys, counts, n):
+    # Highest count first; ties keep key order, which is alphabetical.
+    order = np.argsort(-counts, kind='stable')
+    if n is not None:
+        order = order[:n]
+    return keys[order], counts[order]
+
+class CorpusStats:
+    """
+    Answers frequency, top-n, n-gram and concordance queries over the term
+    statistics of every work in processed_dir, or of the one work asked for.
+
+        stats = CorpusStats('processed_corpus')
+        stats.frequency('jerusalem', by='book')
+        stats.top_terms(20, book='Genesis')
+        for line in stats.concordance('kingdom of heaven', limit=10):
+            print(line)
+    """
+
+    def __init__(self, processed_dir, stats_dir=None):
+        _require_numpy()
+        self.processed_dir = processed_dir
+        stats_dir = stats_dir_for(processed_dir) if stats_dir is None else stats_dir
+        self.works = [WorkStats(path) for path in sorted(glob.glob(os.path.join(stats_dir, '*' + STATS_SUFFIX)))]
+
+    def close(self):
+        for work in self.works:
+            work.close()
+
+    def _selected(self, work):
+        return [stats for stats in self.works if work is None or stats.work == work]
+
+    def frequency(self, text, work=None, book=None, chapter=None, by=None):
+        """
+        How often a word or phrase occurs and in how many records. With
+        by='work', 'book' or 'chapter' the counts are broken down as a list
+        of (work, label, occurrences) instead.
+        """
+        words = tokenize(text)
+        occurrences = 0
+        records = 0
+        groups = []
+        for stats in self._selected(work):
+            docs, counts = stats.occurrences(words, stats.scope(book, chapter))
+            occurrences += int(counts.sum())
+            records += len(docs)
+            if by == 'work' and len(docs):
+                groups.append((stats.work, None, int(counts.sum())))
+            elif by in ('book', 'chapter'):
+                groups.extend((stats.work, label, count) for label, count in stats.group_counts(docs, counts, by))
+        if by is not None:
+            return groups
+        return {'occurrences': occurrences, 'records': records}
+
+    def top_terms(self, n=20, work=None, book=None, chapter=None, ngram=1):
+        """The n most frequent terms (or n-grams of 'ngram' words) as [(words, count)]."""
+        selected = self._selected(work)
+        if len(selected) == 1:
+            stats = selected[0]
+            keys, counts = _top(*stats.ngram_counts(ngram, stats.scope(book, chapter)), n)
+            return [(stats.ngram(key) if ngram > 1 else stats.terms[key], int(count)) for key, count in zip(keys, counts)]
+
+        # Term ids differ from work to work, so several works are merged by the words themselves.
+        totals = {}
+        for stats in selected:
+            keys, counts = stats.ngram_counts(ngram, stats.scope(book, chapter))
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                words = stats.ngram(key) if ngram > 1 else stats.terms[key]
+                totals[words] = totals.get(words, 0) + count
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if n is None else ranked[:n]
+
+    def concordance(self, text, width=KWIC_WIDTH, limit=None, work=None, book=None, chapter=None):
+        """
+        Yields keyword-in-context lines (work, reference, left, match, right)
+        for every occurrence of a word or phrase, in corpus order, with up to
+        'width' characters of the record's text either side.
+        """
+        words = tokenize(text)
+        if not words:
+            return
+        pattern = re.compile(r'(?<!\w)' + r'\W+'.join(re.escape(word) for word in words) + r'(?!\w)', re.IGNORECASE)
+        produced = 0
+        for stats in self._selected(work):
+            docs, _ = stats.occurrences(words, stats.scope(book, chapter))
+            if not len(docs):
+                continue
+            with ContentReader(os.path.join(self.processed_dir, stats.header['content_filename'])) as content:
+                for doc in docs.tolist():
+                    record_text = json.loads(content.read(*stats.span(doc))).get('text', '')
+                    record_text = ' '.join(record_text.split())
+                    for match in pattern.finditer(record_text):
+                        left = record_text[max(0, match.start() - width):match.start()]
+                        right = record_text[match.end():match.end() + width]
+                        yield stats.work, stats.reference(doc), left, match.group(), right
+                        produced += 1
+                        if limit is not None and produced >= limit:
+                            return
+
+def build_stats(content_path, stats_dir=None):
+    """Builds the term statistics of one work from its existing _content.jsonl."""
+    builder = StatsBuilder(content_path, stats_dir)
+    offset = 0
+    with open_content(content_path, 'rb') as f:
+        for line in f:
+            builder.add(json.loads(line), offset, len(line))
+            offset += len(line)
+    builder.finish()
+    return builder.path
+
+def update_stats(processed_dir, stats_dir=None):
+    """
+    Brings the term statistics up to date with processed_dir: a work's file
+    is rebuilt only when its content file changed since it was built, and
+    files of works that no longer exist are removed. Returns the list of
+    rebuilt work ids.
+    """
+    _require_numpy()
+    if stats_dir is None:
+        stats_dir = stats_dir_for(processed_dir)
+    os.makedirs(stats_dir, exist_ok=True)
+
+    content_paths = sorted(glob.glob(os.path.join(processed_dir, '*_content.jsonl')))
+    wanted = {stats_path(path, stats_dir): path for path in content_paths}
+
+    rebuilt = []
+    for path, content_path in wanted.items():
+        current = False
+        if os.path.exists(path):
+            stats = WorkStats(path)
+            current = stats.is_current(content_path)
+            stats.close()
+        if not current:
+            build_stats(content_path, stats_dir)
+            rebuilt.append(os.path.basename(path)[:-len(STATS_SUFFIX)])
+
+    for path in glob.glob(os.path.join(stats_dir, '*' + STATS_SUFFIX)):
+        if path not in wanted:
+            os.remove(path)
+    return rebuilt
+
+def _label(label):
+    if isinstance(label, tuple):
+        return ' '.join(str(part) for part in label)
+    return str(label)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Word frequencies, n-grams and concordances over the processed corpus.")
+    parser.add_argument('--processed-dir', default=PROCESSED_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('build', help="Create or update the statistics of every work.")
+
+    def add_scope(command):
+        command.add_argument('--work', default=None, help="Only this work, e.g. pg10.")
+        command.add_argument('--book', default=None)
+        command.add_argument('--chapter', default=None)
+
+    freq_parser = commands.add_parser('freq', help="Occurrences of a word or phrase.")
+    freq_parser.add_argument('text')
+    freq_parser.add_argument('--by', choices=['work', 'book', 'chapter'], default=None, help="Break the count down.")
+    add_scope(freq_parser)
+
+    top_parser = commands.add_parser('top', help="The most frequent words or n-grams.")
+    top_parser.add_argument('-n', type=int, default=20)
+    top_parser.add_argument('--ngram', type=int, default=1, help="Words per n-gram (default 1).")
+    add_scope(top_parser)
+
+    kwic_parser = commands.add_parser('kwic', help="Keyword-in-context concordance of a word or phrase.")
+    kwic_parser.add_argument('text')
+    kwic_parser.add_argument('--width', type=int, default=KWIC_WIDTH)
+    kwic_parser.add_argument('--limit', type=int, default=50)
+    add_scope(kwic_parser)
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    # Example: python -m scripts.term_stats build
+    #          python -m scripts.term_stats kwic 'living water' --work pg10
+    args = parse_args()
+    if np is None:
+        print("Error: term statistics need NumPy. Install it with 'pip install numpy'.")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        print(f"--- Updating term statistics for '{args.processed_dir}' ---")
+        rebuilt = update_stats(args.processed_dir)
+        print(f"Rebuilt: {', '.join(rebuilt)}" if rebuilt else "Statistics are already up to date.")
+        print(f"Done in {time.perf_counter() - start:.2f}s")
+        sys.exit(0)
+
+    stats_dir = stats_dir_for(args.processed_dir)
+    if not os.path.isdir(stats_dir):
+        print(f"Error: No term statistics found at '{stats_dir}'. Run 'python -m scripts.term_stats build' first.")
+        sys.exit(1)
+    stats = CorpusStats(args.processed_dir)
+    scope = {'work': args.work, 'book': args.book, 'chapter': args.chapter}
+    if args.command == 'freq':
+        result = stats.frequency(args.text, by=args.by, **scope)
+        if args.by is None:
+            print(f"'{args.text}': {result['occurrences']} occurrence(s) in {result['records']} record(s)")
+        else:
+            for work, label, count in result:
+                print(f"{count:8d}  {work}" + (f": {_label(label)}" if label is not None else ''))
+    elif args.command == 'top':
+        try:
+            top = stats.top_terms(args.n, ngram=args.ngram, **scope)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        for words, count in top:
+            print(f"{count:8d}  {_label(words)}")
+    else:
+        lines = 0
+        for work, (book, chapter, number), left, match, right in stats.concordance(
+            args.text, width=args.width, limit=args.limit, **scope
+        ):
+            print(f"{work}: {book} {chapter}:{number}")
+            print(f"    {left.rstrip():>{args.width}} [{match}] {right.lstrip()}")
+            lines += 1
+        print(f"\n{lines} line(s)")
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    stats.close()
@@ -0,0 +1,106 @@
+# scripts/tracker_backends.py
+import sqlite3
+
+class FirestoreTracker:
+    """
+    Stores processing status in a Firestore collection, one document per
+    source file. Reads are fetched with a single get_all() round trip and
+    writes are committed in write batches.
+    """
+    name = 'Firestore'
+
+    # Firestore accepts at most 500 writes in a single batch.
+    WRITE_BATCH_SIZE = 500
+
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        self._client = None
+
+    @property
+    def client(self):
+        # The client (and the gRPC stack behind it) is only created the first
+        # time it is needed, so importing this module costs nothing.
+        # When running on Google Cloud services (like Cloud Functions or Cloud Run),
+        # authentication is handled automatically. For local development, it uses
+        # the credentials you set up with 'gcloud auth application-default login'.
+        if self._client is None:
+            from google.cloud import firestore
+            self._client = firestore.Client()
+        return self._client
+
+    def get_hashes(self, filenames):
+        """Returns {source_filename: content_hash} for every file that has a document."""
+        if not filenames:
+            return {}
+        collection = self.client.collection(self.collection_name)
+        refs = [collection.document(filename) for filename in filenames]
+        hashes = {}
+        for doc in self.client.get_all(refs):
+            if doc.exists:
+                hashes[doc.id] = doc.to_dict().get('content_hash')
+        return hashes
+
+    def set_statuses(self, updates):
+        """Writes a list of status dicts, committing them in batches."""
+        collection = self.client.collection(self.collection_name)
+        for start in range(0, len(updates), self.WRITE_BATCH_SIZE):
+            batch = self.client.batch()
+            for update in updates[start:start + self.WRITE_BATCH_SIZE]:
+                batch.set(collection.document(update['source_filename']), update)
+            batch.commit()
+
+class SQLiteTracker:
+    """
+    Stores processing status in a local SQLite database. It needs no network
+    or credentials, which makes it a good fit for local runs and tests.
+    """
+    name = 'SQLite'
+
+    # Stays well under SQLite's limit on the number of '?' parameters.
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS processed_files ("
+                "source_filename TEXT PRIMARY KEY, content_hash TEXT NOT NULL, processed_at TEXT)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get_hashes(self, filenames):
+        """Returns {source_filename: content_hash} for every file that has a row."""
+        filenames = list(filenames)
+        hashes = {}
+        for start in range(0, len(filenames), self.QUERY_CHUNK_SIZE):
+            chunk = filenames[start:start + self.QUERY_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT source_filename, content_hash FROM processed_files "
+                f"WHERE source_filename IN ({placeholders})", chunk
+            )
+            hashes.update(rows)
+        return hashes
+
+    def set_statuses(self, updates):
+        """Writes a list of status dicts in a single transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO processed_files (source_filename, content_hash, processed_at) "
+                "VALUES (?, ?, ?)",
+                [(u['source_filename'], u['content_hash'], u['processed_at'].isoformat()) for u in updates]
+            )
+
+def create_backend(backend_name, collection_name, db_path):
+    """Builds the tracker backend selected by name ('firestore' or 'sqlite')."""
+    if backend_name == 'firestore':
+        return FirestoreTracker(collection_name)
+    if backend_name == 'sqlite':
+        return SQLiteTracker(db_path)
+    raise ValueError(f"Unknown tracker backend '{backend_name}'. Use 'firestore' or 'sqlite'.")
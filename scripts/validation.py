@@ -0,0 +1,524 @@
+# scripts/validation.py
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from itertools import repeat
+
+from scripts import instrumentation
+from scripts.blocked_jsonl import open_content
+from scripts.hash_cache import open_source
+from scripts.processor_registry import load_target
+from scripts.reference_index import record_number
+
+# A report spells out this many mismatches per work; the rest are only counted.
+MAX_MISMATCHES = 10
+# A record is looked for by its first RESYNC_WORDS words, at most
+# SEARCH_WINDOW source words past where the previous record ended. A record
+# whose words differ is lined up again on its last RESYNC_WORDS words.
+SEARCH_WINDOW = 5000
+RESYNC_WORDS = 8
+# Words shown on either side of the first differing word of a record.
+CONTEXT_WORDS = 6
+
+def reference(fields):
+    """A short label for a record in reports: 'book chapter:number'."""
+    if fields is None:
+        return None
+    return f"{fields.get('book')} {fields.get('chapter')}:{record_number(fields)}"
+
+class SourceLine:
+    __slots__ = ('number', 'text', 'section', 'word_count', 'first')
+
+    def __init__(self, number, text, section, word_count):
+        self.number = number
+        self.text = text
+        self.section = section
+        self.word_count = word_count
+        # The index of the line's first word in the whole stream.
+        self.first = None
+
+class SourceWords:
+    """
+    The body of a source between its START and END markers as one stream of
+    words. Only the section headers are left out: the ones the spec declares
+    or learns from the table of contents. Nothing else of the spec is used,
+    so the stream is what the records must account for, not what the parser
+    thinks they should hold. Every word has a place: the SourceLine it is on
+    and its position in that line. Words before the first section header
+    are only counted, in 'preamble_words'.
+    """
+
+    def __init__(self, spec, source_path):
+        self._source = open_source(source_path)
+        header_metadata = {}
+        # read_front_matter() announces the structure it learns; a report doesn't need it.
+        with instrumentation.quiet():
+            section_headers, body_start, body_end = spec.read_front_matter(self._source, header_metadata, [])
+        self.section_headers = frozenset(section_headers)
+        self.preamble_words = 0
+        # Words per section, so reports can give each section's coverage.
+        self.section_words = {}
+        # The buffered words and the line of each, as two parallel lists so
+        # finding a word runs in list.index(). _base is the stream index of
+        # the first buffered word, _head the buffer index of the next one.
+        self._words = []
+        self._lines = []
+        self._base = 0
+        self._head = 0
+        self._body = self._read(body_start, body_end)
+
+    def close(self):
+        self._source.close()
+
+    def _read(self, body_start, body_end):
+        line_number = self._source.data[:body_start].count(b'\n')
+        occurrences = {}
+        section = None
+        for line in self._source.lines(body_start, body_end):
+            line_number += 1
+            stripped_line = line.strip()
+            if stripped_line in self.section_headers:
+                # Keys match split_sections(), so reports name sections the same way.
+                occurrences[stripped_line] = occurrences.get(stripped_line, 0) + 1
+                section = stripped_line
+                if occurrences[stripped_line] > 1:
+                    section = f"{stripped_line} #{occurrences[stripped_line]}"
+                self.section_words.setdefault(section, 0)
+                continue
+            words = stripped_line.split()
+            if section is None:
+                self.preamble_words += len(words)
+                continue
+            if not words:
+                continue
+            self.section_words[section] += len(words)
+            yield words, SourceLine(line_number, stripped_line, section, len(words))
+
+    def _fill(self, count):
+        """Reads ahead until 'count' words are buffered (all of them if None); returns how many are."""
+        while count is None or len(self._words) - self._head < count:
+            line = next(self._body, None)
+            if line is None:
+                break
+            words, source_line = line
+            source_line.first = self._base + len(self._words)
+            self._words.extend(words)
+            self._lines.extend(repeat(source_line, len(words)))
+        return len(self._words) - self._head
+
+    def place(self, offset=0):
+        """(SourceLine, position) of the word 'offset' words ahead, or (None, None) past the end."""
+        if self._fill(offset + 1) <= offset:
+            return None, None
+        index = self._head + offset
+        source_line = self._lines[index]
+        return source_line, self._base + index - source_line.first
+
+    def ahead(self, count):
+        """The next 'count' words (fewer at the end of the body), without taking them."""
+        self._fill(count)
+        return self._words[self._head:self._head + count]
+
+    def take(self, count=None):
+        """
+        Removes the next 'count' words (all that are left if None) and
+        returns them as a span: their lines and the position of the first.
+        """
+        if self._head > 65536:
+            del self._words[:self._head]
+            del self._lines[:self._head]
+            self._base += self._head
+            self._head = 0
+        available = self._fill(count)
+        if count is None or count > available:
+            count = available
+        span = (self._lines[self._head:self._head + count], self.place()[1])
+        self._head += count
+        return span
+
+    def find(self, words, window, start=0):
+        """The offset of the first run of 'words' starting within 'window' words after 'start', or None."""
+        self._fill(start + window + len(words))
+        buffered = self._words
+        last = min(len(buffered) - len(words), self._head + start + window - 1)
+        index = self._head + start - 1
+        while True:
+            try:
+                index = buffered.index(words[0], index + 1, last + 1)
+            except ValueError:
+                return None
+            if buffered[index:index + len(words)] == words:
+                return index - self._head
+
+def record_units(content_path):
+    """Yields (fields, words) for every record of a content file, plain or compressed."""
+    with open_content(content_path) as f:
+        for line in f:
+            record = json.loads(line)
+            text = record.pop('text', '')
+            yield record, text.split()
+
+def _lines_of(spans):
+    """Yields (SourceLine, words taken from it) for the lines some SourceWords.take() spans cover."""
+    for lines, position in spans:
+        index = 0
+        while index < len(lines):
+            count = min(lines[index].word_count - position, len(lines) - index)
+            yield lines[index], count
+            index += count
+            position = 0
+
+def _common_prefix(expected, found):
+    """The index of the first word that differs (the shorter length if none does)."""
+    shortest = min(len(expected), len(found))
+    prefix = 0
+    while prefix < shortest and expected[prefix] == found[prefix]:
+        prefix += 1
+    return prefix
+
+def _compare_words(expected, found):
+    """Returns (words matched, index of the first difference or None)."""
+    if expected == found:
+        return len(expected), None
+    shortest = min(len(expected), len(found))
+    prefix = _common_prefix(expected, found)
+    suffix = 0
+    while suffix < shortest - prefix and expected[-1 - suffix] == found[-1 - suffix]:
+        suffix += 1
+    return prefix + suffix, prefix
+
+def _context(words, index):
+    return ' '.join(words[max(0, index - CONTEXT_WORDS):index + CONTEXT_WORDS])
+
+def validate_work(spec, source_path, content_path, max_mismatches=MAX_MISMATCHES):
+    """
+    Checks a content file against the source it was parsed from. The words
+    of the records, read in order, must be the words of the source body
+    (see SourceWords) with nothing added, changed or left out, apart from
+    each record's number where its first line opens with it ('1:1', '12.')
+    and whole lines that match one of the spec's rules (chapter headings,
+    footnote markers) between records. Spacing and line breaks don't count.
+    Returns a report dict: totals, the first max_mismatches mismatches, and
+    the word coverage of every section, i.e. how much of its text turns up,
+    unchanged, in a record.
+
+    Mismatch kinds: 'text' (a record's words differ from the source's),
+    'leftover' (source text that no record holds), 'extra' (a record whose
+    text the source doesn't have at that point), 'number' (a record whose
+    verse or paragraph number isn't the one opening its first line),
+    'header' (a record that holds a line looking like a section header, so
+    a section the contents didn't list was run into the one before it) and
+    'book' (records of one section labelled with different books).
+    """
+    start = time.perf_counter()
+    sections = {}
+    not_text = {}
+    books = {}
+    mismatches = []
+    mismatch_count = 0
+    structural_lines = 0
+    records = 0
+    last_fields = None
+    structural = [re.compile(rule.pattern, re.DOTALL).match for rule in spec.rules]
+    header_like = spec.contents.entry_pattern.match if spec.contents is not None else None
+
+    def section_stats(section):
+        stats = sections.get(section)
+        if stats is None:
+            stats = sections[section] = {'section': section, 'records': 0, 'matched_words': 0}
+        return stats
+
+    def mismatch(kind, source_line, fields, expected=None, found=None, count=1):
+        nonlocal mismatch_count
+        mismatch_count += 1
+        if len(mismatches) < max_mismatches:
+            mismatches.append({
+                'kind': kind,
+                'section': source_line.section if source_line is not None else None,
+                'line': source_line.number if source_line is not None else None,
+                'reference': reference(fields),
+                'count': count,
+                'expected': expected,
+                'found': found,
+            })
+
+    def is_structural(source_line):
+        return any(match(source_line.text) for match in structural)
+
+    def skip_structural(source_line):
+        nonlocal structural_lines
+        structural_lines += 1
+        not_text[source_line.section] = not_text.get(source_line.section, 0) + source_line.word_count
+
+    def leftovers(spans):
+        # Source words that no record took. Whole structural lines are
+        # expected there; anything else is reported, one mismatch per run of
+        # lines, located after the last record before it.
+        run = []
+        for source_line, count in _lines_of(spans):
+            if count == source_line.word_count and is_structural(source_line):
+                skip_structural(source_line)
+                report_run(run)
+                run = []
+            else:
+                run.append((source_line, count))
+        report_run(run)
+
+    def report_run(run):
+        if run:
+            text = ' '.join(source_line.text for source_line, _ in run).split()
+            skipped = run[0][0].word_count - run[0][1]
+            mismatch('leftover', run[0][0], last_fields, expected=_context(text[skipped:], 0),
+                     count=sum(count for _, count in run))
+
+    source = SourceWords(spec, source_path)
+    try:
+        for fields, words in record_units(content_path):
+            records += 1
+            if not words:
+                continue
+            offset = source.find(words[:RESYNC_WORDS], SEARCH_WINDOW)
+            if offset is None and len(words) > RESYNC_WORDS:
+                # The opening differs; the record may still be there, ending
+                # in its last words.
+                end = source.find(words[-RESYNC_WORDS:], SEARCH_WINDOW + len(words))
+                if end is not None:
+                    # It starts about as far before its end as it is long:
+                    # at the nearest copy of its first word, if there is one.
+                    estimate = max(0, end + RESYNC_WORDS - len(words))
+                    before = source.ahead(end + 1)
+                    starts = [
+                        start for start in range(max(0, estimate - RESYNC_WORDS), end + 1)
+                        if before[start] == words[0]
+                    ]
+                    offset = min(starts, key=lambda start: abs(start - estimate), default=estimate)
+            if offset is None:
+                mismatch('extra', source.place()[0], fields, found=_context(words, 0))
+                continue
+
+            # The word just before the record's text, if it opens the same
+            # line, is the record's number.
+            first_line, position = source.place(offset)
+            marker = None
+            if offset and position == 1 and source.place(offset - 1)[0] is first_line:
+                leftovers([source.take(offset - 1)])
+                source.take(1)
+                marker = first_line.text.split(None, 1)[0]
+                not_text[first_line.section] = not_text.get(first_line.section, 0) + 1
+            else:
+                leftovers([source.take(offset)])
+            number = record_number(fields)
+            if number is not None and (marker is None or re.findall(r'\d+', marker)[-1:] != [str(number)]):
+                mismatch('number', first_line, fields, expected=marker, found=str(number))
+            last_fields = fields
+
+            section = first_line.section
+            book = fields.get('book')
+            if books.setdefault(section, book) != book:
+                mismatch('book', first_line, fields, expected=books[section], found=book)
+
+            matched, taken = 0, []
+            remaining = words
+            while True:
+                expected = source.ahead(len(remaining))
+                if expected == remaining:
+                    matched += len(remaining)
+                    taken.append(source.take(len(remaining)))
+                    break
+                difference = _common_prefix(expected, remaining)
+                source_line, position = source.place(difference)
+                if position == 0 and is_structural(source_line):
+                    # A structural line inside the record: the parser leaves it out.
+                    matched += difference
+                    taken.append(source.take(difference))
+                    source.take(source_line.word_count)
+                    skip_structural(source_line)
+                    remaining = remaining[difference:]
+                    continue
+                # Line up again on the record's last words; failing that, only
+                # the words before the difference count as the record's.
+                tail = remaining[-RESYNC_WORDS:]
+                end = source.find(
+                    tail, len(remaining) + SEARCH_WINDOW, max(0, min(difference, len(remaining) - len(tail)))
+                )
+                if end is not None:
+                    matched += _compare_words(source.ahead(end + len(tail)), remaining)[0]
+                    taken.append(source.take(end + len(tail)))
+                else:
+                    matched += difference
+                    taken.append(source.take(difference))
+                mismatch('text', source_line or source.place()[0], fields,
+                         expected=_context(expected, difference), found=_context(remaining, difference))
+                break
+
+            # Records run on across section boundaries, so every word counts
+            # for the section it is in; the words that differ, for the first.
+            section_stats(section)['records'] += 1
+            section_stats(section)['matched_words'] -= sum(len(lines) for lines, _ in taken) - matched
+            for source_line, count in _lines_of(taken):
+                section_stats(source_line.section)['matched_words'] += count
+            if header_like is not None:
+                for source_line, _ in _lines_of(taken):
+                    if header_like(source_line.text):
+                        mismatch('header', source_line, fields, expected=source_line.text)
+        leftovers([source.take()])
+    finally:
+        source.close()
+
+    # Sections in source order, including any that no record starts in.
+    for section, words in source.section_words.items():
+        stats = section_stats(section)
+        stats['source_words'] = words - not_text.get(section, 0)
+        stats['coverage'] = stats['matched_words'] / stats['source_words'] if stats['source_words'] else 1.0
+    section_reports = [sections[section] for section in source.section_words]
+    source_words = sum(stats['source_words'] for stats in section_reports)
+    matched_words = sum(stats['matched_words'] for stats in section_reports)
+    return {
+        'source_filename': os.path.basename(source_path),
+        'content_filename': os.path.basename(content_path),
+        'ok': mismatch_count == 0,
+        'error': None,
+        'records': records,
+        'source_words': source_words,
+        'matched_words': matched_words,
+        'coverage': matched_words / source_words if source_words else 1.0,
+        'preamble_words': source.preamble_words,
+        'structural_lines': structural_lines,
+        'mismatch_count': mismatch_count,
+        'mismatches': mismatches,
+        'sections': section_reports,
+        'seconds': time.perf_counter() - start,
+    }
+
+def validate_file(source_path, content_path, spec_target, max_mismatches=MAX_MISMATCHES):
+    """
+    Validates one work given the 'module:NAME' target of its WorkSpec, for
+    running in a worker process. An exception is returned as the report's
+    'error', so one broken work doesn't stop the others from being checked.
+    """
+    try:
+        return validate_work(load_target(spec_target), source_path, content_path, max_mismatches)
+    except Exception as e:
+        return {
+            'source_filename': os.path.basename(source_path),
+            'content_filename': os.path.basename(content_path),
+            'ok': False,
+            'error': f"{type(e).__name__}: {e}",
+        }
+
+def validate_corpus(source_dir, processed_dir, only=None, workers=1, registry=None,
+                    max_mismatches=MAX_MISMATCHES):
+    """
+    Validates every processed work in processed_dir (or only those whose
+    source filename is in 'only') against its source in source_dir, finding
+    each work's spec through the processor registry: the WorkSpec its
+    Processor names. With workers > 1 the
+    works are checked in parallel, one per worker process. Returns the
+    reports in source filename order.
+    """
+    if registry is None:
+        from scripts.processor_registry import ProcessorRegistry
+        registry = ProcessorRegistry()
+
+    jobs = []
+    reports = []
+    for filename in sorted(os.listdir(processed_dir)):
+        if not filename.endswith('_header.json'):
+            continue
+        with open(os.path.join(processed_dir, filename), 'r', encoding='utf-8') as f:
+            header_metadata = json.load(f)
+        source_filename = header_metadata.get('source_filename')
+        if source_filename is None or (only and source_filename not in only):
+            continue
+        source_path = os.path.join(source_dir, source_filename)
+        content_path = os.path.join(processed_dir, header_metadata['content_filename'])
+        processor = registry.resolve(source_filename, source_path)
+        if not os.path.exists(source_path) or processor is None or processor.spec is None:
+            if not os.path.exists(source_path):
+                problem = "source file not found"
+            elif processor is None:
+                problem = "no processor defined"
+            else:
+                problem = f"processor '{processor.target}' names no WorkSpec to check against"
+            reports.append({
+                'source_filename': source_filename, 'content_filename': header_metadata['content_filename'],
+                'ok': False, 'error': problem,
+            })
+            continue
+        jobs.append((source_path, content_path, processor.spec))
+
+    if workers > 1 and len(jobs) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            reports += executor.map(validate_file, *zip(*jobs), [max_mismatches] * len(jobs))
+    else:
+        reports += [validate_file(*job, max_mismatches) for job in jobs]
+    return sorted(reports, key=lambda report: report['source_filename'])
+
+def print_report(report):
+    """Prints a work's report: one summary line, then its mismatches and incomplete sections."""
+    name = report['source_filename']
+    if report['error']:
+        print(f"  {name}: ERROR - {report['error']}")
+        return
+    status = "OK" if report['ok'] else f"{report['mismatch_count']} mismatch(es)"
+    print(
+        f"  {name}: {status}, {report['records']} records, {report['coverage']:.2%} of "
+        f"{report['source_words']} words covered ({report['seconds']:.2f}s)"
+    )
+    for mismatch in report['mismatches']:
+        line = f"    line {mismatch['line']}, {mismatch['section']}, {mismatch['reference']}: {mismatch['kind']}"
+        if mismatch['count'] > 1:
+            line += f" x{mismatch['count']}"
+        print(line)
+        if mismatch['expected'] is not None:
+            print(f"      source:  {mismatch['expected']}")
+        if mismatch['found'] is not None:
+            print(f"      records: {mismatch['found']}")
+    if report['mismatch_count'] > len(report['mismatches']):
+        print(f"    ... and {report['mismatch_count'] - len(report['mismatches'])} more")
+    for stats in report['sections']:
+        if stats['coverage'] < 1.0:
+            print(
+                f"    section {stats['section']}: {stats['coverage']:.2%} of {stats['source_words']} words, "
+                f"{stats['records']} records"
+            )
+
+def print_summary(reports):
+    print("\n--- Validation Summary ---")
+    for report in reports:
+        print_report(report)
+    failed = sum(1 for report in reports if not report['ok'])
+    print(f"  {len(reports)} work(s), {failed} with problems")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check processed works against their sources.")
+    parser.add_argument('--source-dir', default='source_material')
+    parser.add_argument('--processed-dir', default='processed_corpus')
+    parser.add_argument(
+        '--only', action='append', default=None, metavar='FILE[,FILE...]',
+        help="Only check these source files (comma-separated; may be repeated)."
+    )
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes (default: 1).")
+    parser.add_argument(
+        '--max-mismatches', type=int, default=MAX_MISMATCHES,
+        help=f"Mismatches to list per work (default: {MAX_MISMATCHES})."
+    )
+    parser.add_argument('--json', default=None, metavar='PATH', help="Also save the reports as JSON.")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    # Example: python -m scripts.validation --workers 4
+    args = parse_args()
+    only = [name.strip() for value in args.only for name in value.split(',') if name.strip()] if args.only else None
+    reports = validate_corpus(args.source_dir, args.processed_dir, only, args.workers, max_mismatches=args.max_mismatches)
+    print_summary(reports)
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+    sys.exit(0 if all(report['ok'] for report in reports) else 1)
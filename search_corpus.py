@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import argparse
+
+from scripts.search_index import SearchIndex, update_index, index_dir_for
+
+PROCESSED_DIR = 'processed_corpus'
+
+def build(processed_dir):
+    """
+    Brings the full-text index up to date. Only works whose _content.jsonl
+    changed since their segment was built are re-indexed.
+    """
+    print(f"--- Updating search index for '{processed_dir}' ---")
+    start = time.perf_counter()
+    rebuilt = update_index(processed_dir)
+    if rebuilt:
+        print(f"Re-indexed: {', '.join(rebuilt)}")
+    else:
+        print("Index is already up to date.")
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+def query(processed_dir, query_text, limit, show_text):
+    """Runs a query against the index and prints one reference per hit."""
+    index_dir = index_dir_for(processed_dir)
+    if not os.path.isdir(index_dir):
+        print(f"Error: No search index found at '{index_dir}'. Run 'python search_corpus.py build' first.")
+        return
+
+    index = SearchIndex(index_dir)
+    start = time.perf_counter()
+    hits = index.search(query_text, limit=limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for hit in hits:
+        print(hit.reference_string())
+        if show_text:
+            print(f"    {hit.record(processed_dir).get('text', '')}")
+    print(f"\n{len(hits)} hit(s) in {elapsed_ms:.1f} ms")
+    index.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text search over the SCRIBE v2 processed corpus.")
+    parser.add_argument('--processed-dir', default=PROCESSED_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('build', help="Create or update the index.")
+
+    query_parser = commands.add_parser(
+        'query',
+        help='Search the index. Words are ANDed; use OR, -word or NOT word, and "quotes" for exact phrases.'
+    )
+    query_parser.add_argument('query')
+    query_parser.add_argument('--limit', type=int, default=None, help="Stop after this many hits.")
+    query_parser.add_argument('--show', action='store_true', help="Print the text of every hit.")
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'build':
+        build(args.processed_dir)
+    else:
+        query(args.processed_dir, args.query, args.limit, args.show)
+        sys.stdout.flush()
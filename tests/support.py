@@ -0,0 +1,30 @@
+# tests/support.py
+import os
+import shutil
+import tempfile
+import unittest
+
+from scripts import firestore_tracker, hash_cache
+
+class ProcessingTestCase(unittest.TestCase):
+    """
+    Gives each test a temporary directory, a local SQLite tracker and a hash
+    cache inside it, so processors run without network access and leave the
+    user's own databases alone. Everything is switched back afterwards.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self._saved_tracker = (firestore_tracker.TRACKER_BACKEND, firestore_tracker.TRACKER_DB_PATH)
+        self._saved_hash_cache = hash_cache.HASH_CACHE_PATH
+        self.use_tracker_db('tracker.sqlite')
+        hash_cache.use_hash_cache(os.path.join(self.temp_dir, 'hashes.sqlite'))
+
+    def tearDown(self):
+        firestore_tracker.use_tracker(*self._saved_tracker)
+        hash_cache.use_hash_cache(self._saved_hash_cache)
+        shutil.rmtree(self.temp_dir)
+
+    def use_tracker_db(self, name):
+        """Starts a fresh SQLite tracker in the file 'name' of the temporary directory."""
+        firestore_tracker.use_tracker('sqlite', os.path.join(self.temp_dir, name))
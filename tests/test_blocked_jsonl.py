@@ -0,0 +1,89 @@
+# tests/test_blocked_jsonl.py
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from scripts.blocked_jsonl import ContentReader, block_index_path, load_block_index, open_content, scan_blocks
+from scripts.record_pipeline import write_records
+
+# Short and long records, so blocks end both on the record limit and on the
+# byte limit, and text outside ASCII, which json.dumps escapes.
+RECORDS = [
+    {'book': 'Genesis', 'chapter': i // 30 + 1, 'verse': i % 30 + 1, 'text': f'Verse {i} ' + 'λόγος and word ' * (i % 7 * 40)}
+    for i in range(1000)
+]
+
+class OffsetSink:
+    """Keeps the (offset, length) write_records() reports for every line."""
+
+    def __init__(self):
+        self.spans = []
+
+    def add(self, record, offset, length):
+        self.spans.append((offset, length))
+
+    def finish(self):
+        pass
+
+class BlockedContentTest(unittest.TestCase):
+    """Writes the same records plain and as blocked gzip and reads them back both ways."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.plain_path = os.path.join(self.temp_dir, 'plain_content.jsonl')
+        self.compressed_path = os.path.join(self.temp_dir, 'compressed_content.jsonl')
+        write_records(RECORDS, self.plain_path, compress=False)
+        self.sink = OffsetSink()
+        write_records(RECORDS, self.compressed_path, [self.sink], compress=True)
+        with open(self.plain_path, 'rb') as f:
+            self.data = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_ordinary_gzip(self):
+        self.assertGreater(len(load_block_index(self.compressed_path)['compressed_offsets']), 10)
+        with gzip.open(self.compressed_path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_open_content(self):
+        for path in (self.plain_path, self.compressed_path):
+            with self.subTest(path=os.path.basename(path)):
+                with open_content(path, 'rb') as f:
+                    self.assertEqual(f.readline(), self.data.splitlines(keepends=True)[0])
+                    self.assertEqual(b''.join(f), self.data.split(b'\n', 1)[1])
+                with open_content(path) as f:
+                    self.assertEqual(list(f), self.data.decode('utf-8').splitlines(keepends=True))
+
+    def test_read_ranges(self):
+        lines = self.data.splitlines(keepends=True)
+        for path in (self.plain_path, self.compressed_path):
+            with self.subTest(path=os.path.basename(path)), ContentReader(path) as reader:
+                # Out of order, so cached and uncached blocks are both read.
+                for i in list(range(0, len(lines), 7)) + list(range(len(lines) - 1, 0, -13)):
+                    offset, length = self.sink.spans[i]
+                    self.assertEqual(reader.read(offset, length), lines[i])
+                # A range across many blocks.
+                start, _ = self.sink.spans[10]
+                end = sum(self.sink.spans[900])
+                self.assertEqual(reader.read(start, end - start), self.data[start:end])
+
+    def test_read_outside_file(self):
+        with ContentReader(self.compressed_path) as reader:
+            with self.assertRaises(ValueError):
+                reader.read(len(self.data), 10)
+
+    def test_missing_block_index(self):
+        saved = load_block_index(self.compressed_path)
+        os.remove(block_index_path(self.compressed_path))
+        scanned = scan_blocks(self.compressed_path)
+        for key in ('compressed_size', 'uncompressed_size', 'compressed_offsets', 'uncompressed_offsets'):
+            self.assertEqual(scanned[key], saved[key])
+        offset, length = self.sink.spans[500]
+        with ContentReader(self.compressed_path) as reader:
+            self.assertEqual(reader.read(offset, length), self.data.splitlines(keepends=True)[500])
+
+if __name__ == '__main__':
+    unittest.main()
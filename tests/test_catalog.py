@@ -0,0 +1,42 @@
+# tests/test_catalog.py
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from benchmarks.synthetic_corpus import write_josephus_corpus, write_kjv_corpus
+from scripts.catalog import catalog_path, load_catalog
+from scripts.process_josephus import process_josephus
+from scripts.process_kjv import process_kjv_bible
+from tests.support import ProcessingTestCase
+
+class CatalogTest(ProcessingTestCase):
+    """Processes synthetic sources into one directory and checks the catalog they leave."""
+
+    def setUp(self):
+        super().setUp()
+        self.processed_dir = os.path.join(self.temp_dir, 'processed')
+        os.makedirs(self.processed_dir)
+
+    def _process(self, processor, filename, writer):
+        source_path = os.path.join(self.temp_dir, filename)
+        writer(source_path)
+        with redirect_stdout(io.StringIO()):
+            processor(source_path, self.processed_dir)
+
+    def test_missing_catalog_keeps_earlier_works(self):
+        # A corpus with headers but no catalog, as one processed before the
+        # catalog existed: the next work must not be the only one listed.
+        self._process(process_kjv_bible, 'pg10.txt', write_kjv_corpus)
+        kjv_entry = load_catalog(self.processed_dir)['works']['pg10']
+        os.remove(catalog_path(self.processed_dir))
+
+        self._process(process_josephus, 'pg2850.txt', write_josephus_corpus)
+        works = load_catalog(self.processed_dir)['works']
+        self.assertEqual(sorted(works), ['pg10', 'pg2850'])
+        # Only the source hash is unknown until the work is processed again.
+        self.assertEqual(works['pg10'], dict(kjv_entry, source_sha256=None))
+        self.assertIsNotNone(works['pg2850']['source_sha256'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# tests/test_columnar.py
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from scripts.columnar import ColumnarCorpus, ColumnarWriter, columnar_path
+from scripts.record_pipeline import write_records
+
+# Integers, dictionary-encoded strings, None, a number too big for int32 and
+# text outside ASCII, so every way a value is stored comes back through the file.
+RECORDS = [
+    {'book': 'Preface', 'chapter': None, 'verse': None, 'text': 'To the most high and mighty Prince James.'},
+    {'book': 'Genesis', 'chapter': 1, 'verse': 1, 'text': 'In the beginning God created the heaven and the earth.'},
+    {'book': 'Genesis', 'chapter': 1, 'verse': 2, 'text': 'And the earth was without form, and void.'},
+    {'book': 'Genesis', 'chapter': 2, 'verse': 2 ** 31, 'text': 'Ἐν ἀρχῇ ἦν ὁ λόγος'},
+    {'book': 'Exodus', 'chapter': 1, 'verse': '1a', 'text': ''},
+    {'book': 'Genesis', 'chapter': 50, 'verse': 26, 'text': 'So Joseph died.'},
+]
+
+class ColumnarTest(unittest.TestCase):
+    """Writes a content file with the columnar sink and reads the records back from the columnar file."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_path = os.path.join(self.temp_dir, 'test_content.jsonl')
+        write_records(RECORDS, self.content_path, [ColumnarWriter(self.content_path)])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_records_match_content_file(self):
+        with open(self.content_path, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        with ColumnarCorpus(columnar_path(self.content_path)) as corpus:
+            self.assertEqual(len(corpus), len(lines))
+            self.assertEqual(list(corpus), lines)
+            self.assertEqual(corpus[1:3], lines[1:3])
+            self.assertEqual(corpus[-1], lines[-1])
+            self.assertEqual([list(record) for record in corpus], [list(record) for record in lines])
+
+    def test_book_runs(self):
+        with ColumnarCorpus(columnar_path(self.content_path)) as corpus:
+            self.assertEqual(corpus.book_ranges('Genesis'), [(1, 4), (5, 6)])
+            genesis = corpus.book('Genesis')
+            self.assertEqual(list(genesis), RECORDS[1:4])
+            self.assertEqual(list(genesis.column('chapter')), [1, 1, 2])
+            self.assertEqual(bytes(genesis.texts()), ''.join(r['text'] for r in RECORDS[1:4]).encode('utf-8'))
+            with self.assertRaises(KeyError):
+                corpus.book('Leviticus')
+
+    def test_refuses_changed_content(self):
+        # A later run without the columnar sink rewrites only the content file.
+        write_records(RECORDS[:-1], self.content_path)
+        with self.assertRaisesRegex(ValueError, 'out of date'):
+            ColumnarCorpus(columnar_path(self.content_path))
+        with ColumnarCorpus(columnar_path(self.content_path), check=False) as corpus:
+            self.assertEqual(list(corpus), RECORDS)
+
+if __name__ == '__main__':
+    unittest.main()
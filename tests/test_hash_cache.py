@@ -0,0 +1,78 @@
+# tests/test_hash_cache.py
+import os
+import time
+import hashlib
+import unittest
+
+from scripts import hash_cache
+from tests.support import ProcessingTestCase
+
+class HashCacheTest(ProcessingTestCase):
+    """Hashes files through the shared cache and changes them in the ways that must make it miss."""
+
+    def _write(self, name, data, age=10):
+        # Files younger than the racy window aren't cached, so most tests
+        # date theirs back.
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if age:
+            then = time.time_ns() - age * 1_000_000_000
+            os.utime(path, ns=(then, then))
+        return path
+
+    def _poison(self, path):
+        # Swaps the cached hash for a marker, so a hit shows the file wasn't read.
+        with hash_cache.get_hash_cache().conn as conn:
+            conn.execute("UPDATE file_hashes SET sha256 = 'cached' WHERE path = ?", (os.path.abspath(path),))
+
+    def test_unchanged_file_is_not_read(self):
+        path = self._write('pg10.txt', b'In the beginning')
+        self.assertIsNone(hash_cache.cached_file_hash(path))
+        self.assertEqual(hash_cache.get_file_hash(path), hashlib.sha256(b'In the beginning').hexdigest())
+        self._poison(path)
+        self.assertEqual(hash_cache.get_file_hash(path), 'cached')
+        self.assertEqual(hash_cache.cached_file_hash(path), 'cached')
+
+    def test_changed_file_is_hashed_again(self):
+        path = self._write('pg10.txt', b'In the beginning')
+        hash_cache.get_file_hash(path)
+        changes = {
+            # Same size, so only the mtime tells.
+            'mtime': lambda: self._write('pg10.txt', b'In the BEGINNING', age=20),
+            'size': lambda: self._write('pg10.txt', b'In the beginning God'),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                self._poison(path)
+                change()
+                self.assertIsNone(hash_cache.cached_file_hash(path))
+                with open(path, 'rb') as f:
+                    self.assertEqual(hash_cache.get_file_hash(path), hashlib.sha256(f.read()).hexdigest())
+
+    def test_replaced_file_is_hashed_again(self):
+        # A file moved into place with the old size and mtime is a new inode.
+        path = self._write('pg10.txt', b'In the beginning')
+        hash_cache.get_file_hash(path)
+        self._poison(path)
+        stat = os.stat(path)
+        replacement = self._write('pg10.txt.new', b'In the BEGINNING')
+        os.utime(replacement, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(replacement, path)
+        self.assertIsNone(hash_cache.cached_file_hash(path))
+        self.assertEqual(hash_cache.get_file_hash(path), hashlib.sha256(b'In the BEGINNING').hexdigest())
+
+    def test_recent_file_is_not_cached(self):
+        path = self._write('pg10.txt', b'In the beginning', age=0)
+        self.assertEqual(hash_cache.get_file_hash(path), hashlib.sha256(b'In the beginning').hexdigest())
+        self.assertIsNone(hash_cache.cached_file_hash(path))
+
+    def test_missing_file(self):
+        self.assertIsNone(hash_cache.cached_file_hash(os.path.join(self.temp_dir, 'missing.txt')))
+
+    def test_empty_file(self):
+        path = self._write('empty.txt', b'')
+        self.assertEqual(hash_cache.get_file_hash(path), hashlib.sha256(b'').hexdigest())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# tests/test_job_journal.py
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import main
+from benchmarks.synthetic_corpus import write_josephus_corpus, write_kjv_corpus
+from scripts import firestore_tracker, hash_cache, job_journal
+from tests.support import ProcessingTestCase
+
+class ResumeTest(ProcessingTestCase):
+    """
+    Leaves a main.py run unfinished the way a crash would, then checks what
+    --resume does with each file in it.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.source_dir = os.path.join(self.temp_dir, 'source')
+        os.makedirs(self.source_dir)
+        write_kjv_corpus(os.path.join(self.source_dir, 'pg10.txt'))
+        write_josephus_corpus(os.path.join(self.source_dir, 'pg2850.txt'))
+        for patcher in (
+            mock.patch.object(main, 'SOURCE_DIR', self.source_dir),
+            mock.patch.object(main, 'PROCESSED_DIR', os.path.join(self.temp_dir, 'processed')),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(job_journal.use_journal, job_journal.JOURNAL_PATH)
+        job_journal.use_journal(os.path.join(self.temp_dir, 'journal.sqlite'))
+        self.journal = job_journal.get_journal()
+
+    def _interrupted_run(self):
+        # pg10 gets as far as its outputs; the run dies before the tracker
+        # commit, with pg2850 still queued.
+        with redirect_stdout(io.StringIO()):
+            os.makedirs(main.PROCESSED_DIR)
+            run_id = self.journal.start_run(main.select_files())
+            main.process_file('pg10.txt', self.journal.jobs(run_id)[0]['target'], run_id)
+        return run_id
+
+    def _main(self, **kwargs):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            results = main.main(**kwargs)
+        return {result['filename']: result['status'] for result in results}, output.getvalue()
+
+    def _states(self, run_id):
+        return {job['source_filename']: job['state'] for job in self.journal.jobs(run_id)}
+
+    def test_resume_commits_written_files(self):
+        run_id = self._interrupted_run()
+        self.assertEqual(self._states(run_id), {'pg10.txt': job_journal.WRITTEN, 'pg2850.txt': job_journal.QUEUED})
+        self.assertEqual(self.journal.latest_run(), (run_id, False))
+
+        statuses, output = self._main(resume=True)
+        self.assertIn(f'Resuming run {run_id}: 0 file(s) already committed, 1 written but not committed, 1 to process.', output)
+        self.assertEqual(statuses, {'pg10.txt': 'recovered', 'pg2850.txt': 'processed'})
+        self.assertEqual(self._states(run_id), {'pg10.txt': job_journal.COMMITTED, 'pg2850.txt': job_journal.COMMITTED})
+        self.assertEqual(self.journal.latest_run(), (run_id, True))
+        with redirect_stdout(io.StringIO()):
+            for filename in ('pg10.txt', 'pg2850.txt'):
+                file_hash = hash_cache.get_file_hash(os.path.join(self.source_dir, filename))
+                self.assertTrue(firestore_tracker.check_if_processed(filename, file_hash))
+
+        # Nothing is left to resume, so the next run is a new one.
+        statuses, output = self._main(resume=True)
+        self.assertIn('No interrupted run to resume.', output)
+        self.assertEqual(statuses, {'pg10.txt': 'skipped', 'pg2850.txt': 'skipped'})
+        self.assertEqual(self.journal.latest_run(), (run_id + 1, True))
+
+    def test_resume_reprocesses_changed_source(self):
+        run_id = self._interrupted_run()
+        with open(os.path.join(self.source_dir, 'pg10.txt'), 'a', encoding='utf-8') as f:
+            f.write('\n')
+        statuses, output = self._main(resume=True)
+        self.assertIn('0 written but not committed, 2 to process.', output)
+        self.assertEqual(statuses, {'pg10.txt': 'processed', 'pg2850.txt': 'processed'})
+        self.assertEqual(self._states(run_id), {'pg10.txt': job_journal.COMMITTED, 'pg2850.txt': job_journal.COMMITTED})
+
+    def test_failed_file(self):
+        def load_target(target):
+            if 'josephus' in target:
+                raise RuntimeError('processor failed')
+            return load(target)
+
+        load = main.load_target
+        with mock.patch.object(main, 'load_target', load_target):
+            statuses, _ = self._main()
+        run_id, finished = self.journal.latest_run()
+        self.assertTrue(finished)
+        self.assertEqual(statuses['pg2850.txt'], 'failed')
+        self.assertEqual(self._states(run_id)['pg2850.txt'], job_journal.FAILED)
+        self.assertEqual(self.journal.jobs(run_id)[1]['error'], 'RuntimeError: processor failed')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# tests/test_processor_registry.py
+import os
+import sys
+import hashlib
+import unittest
+
+from scripts.processor_registry import ENTRY_POINT_GROUP, ProcessorRegistry
+from tests.support import ProcessingTestCase
+
+PLUGIN_MODULE = 'scribe_test_plugin'
+PHILO_TEXT = b'On the Creation of the World, by Philo.\n'
+
+class EntryPointTest(ProcessingTestCase):
+    """
+    Installs a small plugin distribution on sys.path, with processors under
+    the entry point group, and resolves source files through the registry.
+    """
+
+    def setUp(self):
+        super().setUp()
+        site_dir = os.path.join(self.temp_dir, 'site')
+        dist_info = os.path.join(site_dir, 'scribe_test_plugin-1.0.dist-info')
+        os.makedirs(dist_info)
+        with open(os.path.join(dist_info, 'METADATA'), 'w', encoding='utf-8') as f:
+            f.write('Metadata-Version: 2.1\nName: scribe-test-plugin\nVersion: 1.0\n')
+        with open(os.path.join(dist_info, 'entry_points.txt'), 'w', encoding='utf-8') as f:
+            f.write(
+                f'[{ENTRY_POINT_GROUP}]\n'
+                f'philo_*.txt = {PLUGIN_MODULE}:process_philo\n'
+                f'sha256:{hashlib.sha256(PHILO_TEXT).hexdigest()} = {PLUGIN_MODULE}:process_by_hash\n'
+                f'pg10.txt = {PLUGIN_MODULE}:process_philo\n'
+            )
+        with open(os.path.join(site_dir, PLUGIN_MODULE + '.py'), 'w', encoding='utf-8') as f:
+            f.write(
+                'def process_philo(source_path, processed_dir):\n    return "philo"\n\n'
+                'def process_by_hash(source_path, processed_dir):\n    return "hash"\n'
+            )
+        sys.path.insert(0, site_dir)
+        self.addCleanup(sys.path.remove, site_dir)
+        self.addCleanup(sys.modules.pop, PLUGIN_MODULE, None)
+
+    def test_pattern(self):
+        registry = ProcessorRegistry()
+        processor = registry.resolve('philo_on_creation.txt')
+        self.assertEqual(processor.target, f'{PLUGIN_MODULE}:process_philo')
+        self.assertNotIn(PLUGIN_MODULE, sys.modules)
+        self.assertEqual(processor.load()(None, None), 'philo')
+
+    def test_hash(self):
+        source_path = os.path.join(self.temp_dir, 'renamed.txt')
+        with open(source_path, 'wb') as f:
+            f.write(PHILO_TEXT)
+        registry = ProcessorRegistry()
+        self.assertEqual(registry.resolve('renamed.txt', source_path).target, f'{PLUGIN_MODULE}:process_by_hash')
+        self.assertIsNone(registry.resolve('renamed.txt'))
+        self.assertIsNone(registry.resolve('other.txt', os.path.join(self.temp_dir, 'missing.txt')))
+
+    def test_builtin_first(self):
+        # The plugin also claims pg10.txt, but built-in processors come first.
+        registry = ProcessorRegistry()
+        self.assertEqual(len(registry.plugins()), 3)
+        self.assertEqual(registry.resolve('pg10.txt').target, 'scripts.process_kjv:process_kjv_bible')
+
+    def test_discover_off(self):
+        registry = ProcessorRegistry(discover=False)
+        self.assertIsNone(registry.resolve('philo_on_creation.txt'))
+        registry.register(f'{PLUGIN_MODULE}:process_by_hash', patterns=['philo_*.txt'])
+        self.assertEqual(registry.resolve('philo_on_creation.txt').load()(None, None), 'hash')
+
+if __name__ == '__main__':
+    unittest.main()
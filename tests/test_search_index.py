@@ -0,0 +1,67 @@
+# tests/test_search_index.py
+import os
+import json
+import random
+import shutil
+import tempfile
+import unittest
+
+from scripts.search_index import SearchIndex, build_segment, decode_varints, encode_varints, index_dir_for
+
+RECORDS = [
+    {'book': 'Genesis', 'chapter': 1, 'verse': 1, 'text': 'In the beginning God created the heaven and the earth.'},
+    {'book': 'Genesis', 'chapter': 1, 'verse': 2, 'text': 'And the earth was without form, and void.'},
+    {'book': 'Matthew', 'chapter': 3, 'verse': 2, 'text': 'Repent ye: for the kingdom of heaven is at hand.'},
+    {'book': 'Matthew', 'chapter': 4, 'verse': 17, 'text': 'The kingdom is come; heaven and earth shall pass.'},
+]
+
+class VarintTest(unittest.TestCase):
+    def test_round_trip(self):
+        edges = [0, 1, 127, 128, 255, 16383, 16384, 2 ** 21 - 1, 2 ** 21, 2 ** 32 - 1, 2 ** 32, 2 ** 63]
+        rng = random.Random(8)
+        values = edges + [rng.getrandbits(rng.randint(1, 40)) for _ in range(2000)]
+        out = bytearray()
+        encode_varints(values, out)
+        self.assertEqual(decode_varints(out), values)
+
+    def test_encoded_sizes(self):
+        for value, size in [(0, 1), (127, 1), (128, 2), (16383, 2), (16384, 3)]:
+            out = bytearray()
+            encode_varints([value], out)
+            self.assertEqual(len(out), size, value)
+
+class SegmentTest(unittest.TestCase):
+    """Builds a segment from a small content file and checks queries against the records."""
+
+    def setUp(self):
+        self.processed_dir = tempfile.mkdtemp()
+        content_path = os.path.join(self.processed_dir, 'test_content.jsonl')
+        with open(content_path, 'w', encoding='utf-8') as f:
+            for record in RECORDS:
+                f.write(json.dumps(record) + '\n')
+        build_segment(content_path)
+        self.index = SearchIndex(index_dir_for(self.processed_dir))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.processed_dir)
+
+    def _verses(self, query):
+        return [hit.reference[2] for hit in self.index.search(query)]
+
+    def test_queries(self):
+        self.assertEqual(self._verses('earth'), [1, 2, 17])
+        self.assertEqual(self._verses('heaven earth'), [1, 17])
+        self.assertEqual(self._verses('beginning OR repent'), [1, 2])
+        self.assertEqual(self._verses('heaven -kingdom'), [1])
+        self.assertEqual(self._verses('"kingdom of heaven"'), [2])
+        self.assertEqual(self._verses('"heaven and earth"'), [17])
+        self.assertEqual(self._verses('missing'), [])
+
+    def test_hit_record(self):
+        hit = self.index.search('"kingdom of heaven"')[0]
+        self.assertEqual(hit.reference, ('Matthew', 3, 2))
+        self.assertEqual(hit.record(self.processed_dir), RECORDS[2])
+
+if __name__ == '__main__':
+    unittest.main()
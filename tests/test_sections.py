@@ -0,0 +1,86 @@
+# tests/test_sections.py
+import io
+import os
+import re
+import unittest
+from contextlib import redirect_stdout
+
+from benchmarks.synthetic_corpus import write_kjv_corpus
+from scripts.process_josephus import process_josephus
+from scripts.process_kjv import process_kjv_bible
+from tests.support import ProcessingTestCase
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'source_material')
+
+# Each edit is made to a source that was already processed once; the
+# incremental re-run must write exactly what a full run of the edited
+# source writes.
+JOSEPHUS_EDITS = {
+    'mid-section edit': lambda text: text.replace(
+        'However, Onias, one of the high priests', 'However, ONIAS, one of the high priests'),
+    'deleted paragraph': lambda text: re.sub(
+        r'\n3\. It is true, these writers.*?\n\n(?=4\. However, I will not)', '\n', text, count=1, flags=re.S),
+    'leading continuation line': lambda text: text.replace(
+        'Containing The Interval Of About One Month.', 'Containing The Interval Of About Two Months.'),
+    'edit in the last section': lambda text: text.replace(
+        'as were the towers also spared', 'as were the TOWERS also spared'),
+}
+KJV_EDITS = {
+    'mid-section edit': lambda text: text.replace('\n2:3 ', '\n2:3 edited ', 1),
+    'deleted verse': lambda text: re.sub(r'\n3:4 .*?\n\n', '\n', text, count=1, flags=re.S),
+    'leading continuation line': lambda text: text.replace(
+        'The Book of Ruth\n\n1:1', 'The Book of Ruth\nleading words\n1:1'),
+}
+
+class IncrementalRunTest(ProcessingTestCase):
+    """
+    Runs a processor on a source, edits the source and runs it again over
+    the same output, then checks the content file against a full run of the
+    edited source into an empty directory. Both use a local SQLite tracker,
+    so no network is needed.
+    """
+
+    def _process(self, processor, filename, text, run_name):
+        # Every run_name has its own output directory and tracker database.
+        source_dir = os.path.join(self.temp_dir, 'source', run_name)
+        processed_dir = os.path.join(self.temp_dir, 'processed', run_name)
+        os.makedirs(source_dir, exist_ok=True)
+        os.makedirs(processed_dir, exist_ok=True)
+        source_path = os.path.join(source_dir, filename)
+        with open(source_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        self.use_tracker_db(run_name + '.sqlite')
+        output = io.StringIO()
+        with redirect_stdout(output):
+            processor(source_path, processed_dir)
+        content_path = os.path.join(processed_dir, filename.replace('.txt', '_content.jsonl'))
+        with open(content_path, 'rb') as f:
+            return f.read(), output.getvalue()
+
+    def _check_edits(self, processor, filename, text, edits):
+        for name, edit in edits.items():
+            with self.subTest(edit=name):
+                edited = edit(text)
+                self.assertNotEqual(edited, text, f"The '{name}' edit no longer applies to the source.")
+                run_name = re.sub(r'\W+', '_', name)
+                self._process(processor, filename, text, run_name)
+                incremental, output = self._process(processor, filename, edited, run_name)
+                full, _ = self._process(processor, filename, edited, run_name + '_full')
+                self.assertIn('Reusing unchanged section', output)
+                self.assertEqual(incremental, full)
+
+    def test_josephus(self):
+        with open(os.path.join(SOURCE_DIR, 'pg2850.txt'), 'r', encoding='utf-8') as f:
+            text = f.read()
+        self._check_edits(process_josephus, 'pg2850.txt', text, JOSEPHUS_EDITS)
+
+    def test_kjv(self):
+        path = os.path.join(self.temp_dir, 'pg10.txt')
+        write_kjv_corpus(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        self._check_edits(process_kjv_bible, 'pg10.txt', text, KJV_EDITS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# tests/test_shards.py
+import io
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from scripts.record_pipeline import write_records
+from scripts.shards import ShardWriter, load_shard_manifest, shard_dir
+
+BOOKS = ['Genesis', 'Exodus', 'Ruth']
+
+def make_records(books=BOOKS, edit=None):
+    """Three books of eight chapters of five verses; 'edit' is a (book, chapter, verse) whose text changes."""
+    for book in books:
+        for chapter in range(1, 9):
+            for verse in range(1, 6):
+                text = f'{book} {chapter}:{verse} and the words of it.'
+                if (book, chapter, verse) == edit:
+                    text += ' Edited.'
+                yield {'book': book, 'chapter': chapter, 'verse': verse, 'text': text}
+
+class ShardTest(unittest.TestCase):
+    """Writes a content file with the shard sink, then runs it again over the same output."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.content_path = os.path.join(self.temp_dir, 'test_content.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, records, compress=False):
+        writer = ShardWriter(self.content_path, max_records=12, max_bytes=0, compress=compress)
+        with redirect_stdout(io.StringIO()):
+            write_records(records, self.content_path, [writer], compress=False)
+        return writer
+
+    def _shard_stats(self):
+        directory = shard_dir(self.content_path)
+        stats = {}
+        for filename in os.listdir(directory):
+            stat = os.stat(os.path.join(directory, filename))
+            stats[filename] = (stat.st_ino, stat.st_mtime_ns)
+        return stats
+
+    def test_manifest_covers_content(self):
+        self._write(make_records())
+        manifest = load_shard_manifest(self.content_path)
+        with open(self.content_path, 'rb') as f:
+            data = f.read()
+        records = list(make_records())
+
+        position = 0
+        for shard in manifest['shards']:
+            start, end = shard['records']
+            self.assertEqual(start, position)
+            position = end
+            chunk = data[shard['content_offset']:shard['content_offset'] + shard['content_length']]
+            self.assertEqual(chunk.count(b'\n'), end - start)
+            with open(os.path.join(shard_dir(self.content_path), shard['filename']), 'rb') as f:
+                self.assertEqual(f.read(), chunk)
+            # No chapter is split, and no shard holds two books.
+            first, last = records[start], records[end - 1]
+            self.assertEqual((shard['first']['book'], shard['first']['chapter']), (first['book'], first['chapter']))
+            self.assertEqual(first['verse'], 1)
+            self.assertEqual(last['verse'], 5)
+            self.assertEqual(first['book'], last['book'])
+        self.assertEqual(position, len(records))
+        self.assertEqual(manifest['record_count'], len(records))
+        self.assertEqual(sum(shard['content_length'] for shard in manifest['shards']), len(data))
+
+    def test_rerun_reuses_unchanged_shards(self):
+        self._write(make_records())
+        before = self._shard_stats()
+        writer = self._write(make_records(edit=('Exodus', 4, 2)))
+        after = self._shard_stats()
+        self.assertEqual(writer.written, 1)
+        self.assertEqual(sorted(after), sorted(before))
+        changed = [filename for filename in before if before[filename] != after[filename]]
+        self.assertEqual(changed, ['test-0002-001.jsonl'])
+
+    def test_leftover_shards_removed(self):
+        self._write(make_records())
+        writer = self._write(make_records(BOOKS[:2]))
+        self.assertEqual(writer.written, 0)
+        manifest = load_shard_manifest(self.content_path)
+        self.assertEqual(sorted(self._shard_stats()), sorted(shard['filename'] for shard in manifest['shards']))
+        self.assertFalse(any(filename.startswith('test-0003-') for filename in self._shard_stats()))
+
+    def test_failed_run_keeps_old_shards(self):
+        self._write(make_records())
+        manifest = load_shard_manifest(self.content_path)
+        before = self._shard_stats()
+
+        def failing_records():
+            for i, record in enumerate(make_records(edit=('Genesis', 1, 1))):
+                if i == 100:
+                    raise RuntimeError('parser failed')
+                yield record
+
+        with self.assertRaises(RuntimeError):
+            self._write(failing_records())
+        self.assertEqual(self._shard_stats(), before)
+        self.assertEqual(load_shard_manifest(self.content_path), manifest)
+
+    def test_compressed_shards(self):
+        self._write(make_records(), compress=True)
+        manifest = load_shard_manifest(self.content_path)
+        with open(self.content_path, 'rb') as f:
+            data = f.read()
+        for shard in manifest['shards']:
+            self.assertTrue(shard['filename'].endswith('.jsonl.gz'))
+            with gzip.open(os.path.join(shard_dir(self.content_path), shard['filename']), 'rb') as f:
+                self.assertEqual(f.read(), data[shard['content_offset']:shard['content_offset'] + shard['content_length']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# tests/test_source_watcher.py
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from scripts import source_watcher
+from scripts.source_watcher import SourceWatcher
+
+def inotify_available():
+    inotify = source_watcher.Inotify.open(tempfile.gettempdir())
+    if inotify is None:
+        return False
+    inotify.close()
+    return True
+
+class FakeClock:
+    """Stands in for the time module, so polling runs instantly and deterministically."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class DebounceTest(unittest.TestCase):
+    """Changes files under a polling watcher and checks when each one is reported."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self._write('existing.txt', 'already here\n')
+        self.clock = FakeClock()
+        patcher = mock.patch.object(source_watcher, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.watcher = SourceWatcher(self.directory, debounce=1.0, poll=True)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text, mode='w'):
+        with open(os.path.join(self.directory, name), mode, encoding='utf-8') as f:
+            f.write(text)
+
+    def _poll_for(self, seconds):
+        # Every file reported while the clock moves on by 'seconds'.
+        ready = []
+        end = self.clock.now + seconds
+        while self.clock.now < end:
+            ready += self.watcher.poll()
+        return ready
+
+    def test_existing_files_are_not_reported(self):
+        self.assertEqual(self.watcher.mode, 'polling')
+        self.assertEqual(self._poll_for(3), [])
+
+    def test_file_reported_once_it_stops_changing(self):
+        self._write('pg10.txt', 'The First Book of Moses\n')
+        # Still being written: every change restarts the wait.
+        for _ in range(4):
+            self.assertEqual(self._poll_for(0.5), [])
+            self._write('pg10.txt', 'more\n', mode='a')
+        self.assertEqual(self._poll_for(0.75), [])
+        self.assertEqual(self._poll_for(1), ['pg10.txt'])
+        self.assertEqual(self._poll_for(3), [])
+
+    def test_changed_and_deleted_files(self):
+        self._write('existing.txt', 'changed\n', mode='a')
+        self._write('pg2850.txt', 'Josephus\n')
+        self._write('.pg2850.txt.partial', 'copying\n')
+        self.assertEqual(self._poll_for(0.5), [])
+        os.remove(os.path.join(self.directory, 'pg2850.txt'))
+        self.assertEqual(self._poll_for(2), ['existing.txt'])
+
+    def test_batches(self):
+        self._write('a.txt', 'a\n')
+        self._write('b.txt', 'b\n')
+        self.assertEqual(next(self.watcher.batches()), ['a.txt', 'b.txt'])
+
+@unittest.skipUnless(inotify_available(), "inotify isn't available here.")
+class InotifyTest(unittest.TestCase):
+    """The same debouncing with inotify and the real clock."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.watcher = SourceWatcher(self.directory, debounce=0.1)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.directory)
+
+    def test_new_file(self):
+        self.assertEqual(self.watcher.mode, 'inotify')
+        with open(os.path.join(self.directory, 'pg10.txt'), 'w', encoding='utf-8') as f:
+            f.write('The First Book of Moses\n')
+        self.assertEqual(next(self.watcher.batches()), ['pg10.txt'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_term_stats.py
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+from scripts.record_pipeline import write_records
+from scripts.search_index import tokenize
+from scripts.term_stats import StatsBuilder, WorkStats, np, stats_path
+
+def make_records(vocabulary_size, record_count, seed):
+    rng = random.Random(seed)
+    words = [f'w{i}' for i in range(vocabulary_size)]
+    # A few repeated phrases, so some n-grams occur more than once.
+    phrases = [' '.join(rng.choices(words, k=6)) for _ in range(5)]
+    for i in range(record_count):
+        parts = [' '.join(rng.choices(words, k=rng.randint(0, 12))) for _ in range(3)]
+        parts.insert(rng.randint(0, 3), rng.choice(phrases))
+        yield {'book': 'Genesis' if i < record_count // 2 else 'Exodus', 'chapter': i % 5 + 1, 'verse': i + 1, 'text': ' '.join(parts)}
+
+def expected_ngrams(records, n):
+    counts = Counter()
+    for record in records:
+        tokens = tokenize(record['text'])
+        counts.update(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return counts
+
+@unittest.skipIf(np is None, "Term statistics need NumPy.")
+class NgramCountTest(unittest.TestCase):
+    """Counts n-grams from a stats file and checks them against a plain count over the records."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _stats(self, records):
+        content_path = os.path.join(self.temp_dir, 'test_content.jsonl')
+        write_records(records, content_path, [StatsBuilder(content_path)])
+        return WorkStats(stats_path(content_path))
+
+    def _check(self, stats, records, n, mask=None):
+        grams, counts = stats.ngram_counts(n, mask)
+        found = {(stats.ngram([gram]) if n == 1 else stats.ngram(gram)): int(count) for gram, count in zip(grams, counts)}
+        self.assertEqual(found, dict(expected_ngrams(records, n)))
+
+    def test_ngrams(self):
+        records = list(make_records(50, 300, seed=21))
+        stats = self._stats(records)
+        for n in range(1, 6):
+            with self.subTest(n=n):
+                self._check(stats, records, n)
+                self._check(stats, [r for r in records if r['book'] == 'Exodus'], n, stats.scope(book='Exodus'))
+        stats.close()
+
+    def test_ngrams_beyond_one_key(self):
+        # 3000 ** 6 no longer fits in an int64, so the longer n-grams have
+        # their keys renumbered on the way.
+        records = list(make_records(3000, 2000, seed=22))
+        stats = self._stats(records)
+        self.assertGreaterEqual(stats.term_count ** 6, 2 ** 63)
+        for n in (6, 8):
+            with self.subTest(n=n):
+                self._check(stats, records, n)
+        stats.close()
+
+    def test_records_shorter_than_n(self):
+        stats = self._stats([{'book': 'Genesis', 'chapter': 1, 'verse': 1, 'text': 'In the beginning'}])
+        grams, counts = stats.ngram_counts(4)
+        self.assertEqual((grams.shape, len(counts)), ((0, 4), 0))
+        with self.assertRaises(ValueError):
+            stats.ngram_counts(0)
+        stats.close()
+
+if __name__ == '__main__':
+    unittest.main()
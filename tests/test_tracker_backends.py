@@ -0,0 +1,62 @@
+# tests/test_tracker_backends.py
+import io
+import os
+import sqlite3
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+from scripts import firestore_tracker
+from scripts.tracker_backends import SQLiteTracker, create_backend
+from tests.support import ProcessingTestCase
+
+def status(filename, content_hash):
+    return {'source_filename': filename, 'content_hash': content_hash, 'processed_at': datetime.now(timezone.utc)}
+
+class SQLiteTrackerTest(ProcessingTestCase):
+    """Stores statuses in the SQLite backend and reads them back, directly and through firestore_tracker."""
+
+    def test_round_trip(self):
+        db_path = os.path.join(self.temp_dir, 'statuses.sqlite')
+        tracker = SQLiteTracker(db_path)
+        # More files than fit in one query.
+        filenames = [f'pg{i}.txt' for i in range(1200)]
+        tracker.set_statuses([status(filename, f'hash{i}') for i, filename in enumerate(filenames)])
+        tracker.set_statuses([status('pg7.txt', 'changed')])
+
+        # A new connection sees the same rows; files without one are left out.
+        hashes = SQLiteTracker(db_path).get_hashes(filenames + ['missing.txt'])
+        self.assertEqual(len(hashes), len(filenames))
+        self.assertEqual(hashes['pg7.txt'], 'changed')
+        self.assertEqual(hashes['pg1199.txt'], 'hash1199')
+        self.assertEqual(tracker.get_hashes([]), {})
+        with sqlite3.connect(db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM processed_files").fetchone(), (1200,))
+
+    def test_create_backend(self):
+        self.assertEqual(create_backend('sqlite', 'unused', ':memory:').name, 'SQLite')
+        self.assertEqual(create_backend('firestore', 'collection', None).name, 'Firestore')
+        with self.assertRaisesRegex(ValueError, "Unknown tracker backend 'redis'"):
+            create_backend('redis', 'collection', None)
+
+    def test_processing_status(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertFalse(firestore_tracker.check_if_processed('pg10.txt', 'abc'))
+            with firestore_tracker.deferred_updates() as updates:
+                firestore_tracker.update_processed_status('pg10.txt', 'abc')
+            # Deferred updates are only known to this process until committed.
+            self.assertEqual(firestore_tracker.get_tracker().get_hashes(['pg10.txt']), {})
+            firestore_tracker.commit_updates(updates)
+        self.assertIn("Updated tracking status for 'pg10.txt' in SQLite.", output.getvalue())
+
+        # A fresh process starts from what the database holds.
+        self.use_tracker_db('tracker.sqlite')
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(firestore_tracker.prefetch_statuses(['pg10.txt', 'pg2850.txt']), {'pg10.txt': 'abc'})
+            self.assertTrue(firestore_tracker.check_if_processed('pg10.txt', 'abc'))
+            self.assertFalse(firestore_tracker.check_if_processed('pg10.txt', 'def'))
+            self.assertFalse(firestore_tracker.check_if_processed('pg2850.txt', 'abc'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# tests/test_validation.py
+import io
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from benchmarks.synthetic_corpus import write_josephus_corpus, write_kjv_corpus
+from scripts.process_josephus import JOSEPHUS_SPEC, process_josephus
+from scripts.process_kjv import KJV_SPEC, process_kjv_bible
+from scripts.validation import validate_work
+from tests.support import ProcessingTestCase
+
+# Each change is made to the records of a correctly processed source and
+# must be reported as a mismatch of the given kind.
+KJV_FAULTS = {
+    'text': lambda records: records[100].update(text=records[100]['text'].replace(' ', ' changed ', 1)),
+    'leftover': lambda records: records.pop(200),
+    'number': lambda records: records[300].update(verse=99),
+    'extra': lambda records: records.insert(400, dict(records[10])),
+    'book': lambda records: records[500].update(book='Nonsense'),
+}
+
+class ValidationTest(ProcessingTestCase):
+    """
+    Processes synthetic sources with a local SQLite tracker, then checks that
+    the validator passes the output as it is and catches changes to it.
+    """
+
+    def _process(self, processor, source_path):
+        processed_dir = os.path.join(self.temp_dir, 'processed')
+        os.makedirs(processed_dir, exist_ok=True)
+        with redirect_stdout(io.StringIO()):
+            processor(source_path, processed_dir)
+        return os.path.join(processed_dir, os.path.basename(source_path).replace('.txt', '_content.jsonl'))
+
+    def test_kjv(self):
+        source_path = os.path.join(self.temp_dir, 'pg10.txt')
+        write_kjv_corpus(source_path)
+        content_path = self._process(process_kjv_bible, source_path)
+        report = validate_work(KJV_SPEC, source_path, content_path)
+        self.assertTrue(report['ok'], report['mismatches'])
+        self.assertEqual(report['coverage'], 1.0)
+
+        with open(content_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        faulty_path = os.path.join(self.temp_dir, 'faulty_content.jsonl')
+        for kind, fault in KJV_FAULTS.items():
+            with self.subTest(fault=kind):
+                records = [json.loads(line) for line in lines]
+                fault(records)
+                with open(faulty_path, 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(record) + '\n' for record in records)
+                report = validate_work(KJV_SPEC, source_path, faulty_path)
+                self.assertEqual([mismatch['kind'] for mismatch in report['mismatches']], [kind])
+
+    def test_josephus(self):
+        source_path = os.path.join(self.temp_dir, 'pg2850.txt')
+        write_josephus_corpus(source_path)
+        report = validate_work(JOSEPHUS_SPEC, source_path, self._process(process_josephus, source_path))
+        self.assertTrue(report['ok'], report['mismatches'])
+        self.assertGreater(report['structural_lines'], 0)
+
+    def test_header_missing_from_contents(self):
+        # A book the Contents lists under another name is never learned as a
+        # header, so the parser runs it into the last record of the book
+        # before; the records still hold every word of the source.
+        source_path = os.path.join(self.temp_dir, 'pg2850.txt')
+        write_josephus_corpus(source_path)
+        with open(source_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        with open(source_path, 'w', encoding='utf-8') as f:
+            f.write(text.replace(' BOOK II.\n', ' BOOK 2.\n', 1))
+        report = validate_work(JOSEPHUS_SPEC, source_path, self._process(process_josephus, source_path))
+        self.assertEqual(
+            [(mismatch['kind'], mismatch['expected']) for mismatch in report['mismatches']],
+            [('header', 'BOOK II.')]
+        )
+
+if __name__ == '__main__':
+    unittest.main()